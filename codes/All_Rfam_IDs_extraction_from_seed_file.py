@@ -3,24 +3,14 @@
 
 import pandas as pd
 
+from seed_reader import load_index
+
 def extract_rfam_ids_and_names(seed_file, output_excel="rfam_id_name_list.xlsx"):
+    # Accessions and IDs are stored in the seed index, so no family block is parsed here.
     rfam_data = []
-    current_id = None
-    current_name = None
-
-    with open(seed_file, "r", encoding="utf-8", errors="ignore") as f:
-        for line in f:
-            line = line.strip()
-
-            if line.startswith("#=GF AC"):
-                current_id = line.split()[2]
-            elif line.startswith("#=GF ID"):
-                current_name = " ".join(line.split()[2:])
-            elif line.startswith("//"):
-                if current_id and current_name:
-                    rfam_data.append({"Rfam ID": current_id, "Family Name": current_name})
-                current_id = None
-                current_name = None
+    for entry in load_index(seed_file):
+        if entry.accession and entry.name:
+            rfam_data.append({"Rfam ID": entry.accession, "Family Name": entry.name})
 
     df = pd.DataFrame(rfam_data)
     df.to_excel(output_excel, index=False)
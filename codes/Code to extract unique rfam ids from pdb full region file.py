@@ -1,17 +1,13 @@
 # Code to extract unique rfam ids from pdb_full_region.txt file
 import pandas as pd
 
-def extract_unique_rfam_ids(file_path, output_excel="unique_rfam_ids.xlsx"):
-    rfam_ids = set()
+from pdb_regions import load_regions
 
-    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                rfam_id = line.split("\t")[0]
-                rfam_ids.add(rfam_id)
+def extract_unique_rfam_ids(file_path, output_excel="unique_rfam_ids.xlsx"):
+    # Family accessions of the columnar table (sorted, from the cached <file>.npz after the first run)
+    rfam_ids = load_regions(file_path).families.tolist()
 
-    df = pd.DataFrame(sorted(rfam_ids), columns=["Unique Rfam ID"])
+    df = pd.DataFrame(rfam_ids, columns=["Unique Rfam ID"])
     df.to_excel(output_excel, index=False)
     print(f"Saved {len(df)} unique Rfam IDs to {output_excel}")
 
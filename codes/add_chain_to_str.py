@@ -1,32 +1,69 @@
 #!/usr/bin/env python3
 """
-Fill missing chain IDs in FARFAR2 PDBs using Biopython and save to a flat 'str' directory.
+Normalize predicted models: fill missing chain IDs and save them to a flat 'str'
+directory per tool.
 
-Input root:
+Input root (--in-root):
   /home/s081p868/scratch/RNA_Structure_Evaluation/farfar2/preds
 
-Output dir:
+Output dir (--out-dir):
   /home/s081p868/scratch/RNA_Structure_Evaluation/predictions/farfar2/str
 
 Each input PDB (possibly nested in subfolders) is written to the output dir with the
 same basename. Existing non-blank chain IDs are preserved; blank chains become A, B, C, ...
+
+With --config (tool layouts as in model_sources.py, see normalize_tools.json) the
+FARFAR2, RhoFold+ and AlphaFold3 models are done in the same parallel pass, each
+written to <out_root of the tool>/<URS>.pdb, i.e. <tool>/str/<URS>.pdb. AlphaFold3
+models are read straight from the fold_*.zip archives and converted from mmCIF
+in memory. Outputs that are not older than their source are skipped (--force to
+redo them).
+
+The fix is a rewrite of the chain column (byte 22) of the blank-chain ATOM/HETATM
+records (pdb_array.py); everything else in the file is kept byte for byte.
+assign_chain_ids_biopython() is the previous PDBParser/PDBIO version, kept for
+bench_chain_fix.py (it renumbers serials and drops non-coordinate records).
+
+--mode mmap (the default) scans a memory map of each input instead of reading
+it, writes fixed files with in-kernel copies plus the patched records only, and
+hard-links (--unchanged hardlink) or reflinks files that need no change instead
+of copying them (zero_copy.py). A hard-linked output shares its inode with the
+input, so do not edit outputs in place. --mode rewrite reads and writes every
+file in full as before.
+
+PDBs are handed to the workers in chunks (--chunk-size) with at most
+--max-in-flight chunks queued; only fixed files and errors are printed (all files
+with --verbose), plus a files/s, MB/s progress line every --progress-interval
+seconds. --dry-run lists the files that would be fixed and writes nothing.
+
+Usage:
+  python add_chain_to_str.py [--in-root DIR] [--out-dir DIR] [--workers 16] [--chunk-size 64] [--dry-run]
+  python add_chain_to_str.py --config normalize_tools.json --fasta .../human_seqs_non3d_rfams.fa
 """
 
+import argparse
+import mmap
 import shutil
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
-from typing import Tuple, List
+from typing import Iterator, List, Tuple
 
-from Bio.PDB import PDBParser, PDBIO
+from model_sources import DEFAULT_LAYOUTS, StructureInput, discover, load_tools_config
+from pdb_array import CHAIN_POOL, chain_patches, fix_blank_chains
+from zero_copy import LINK_MODES, link_unchanged, write_patched
 
 IN_ROOT = Path("/home/s081p868/scratch/RNA_Structure_Evaluation/farfar2/preds")
 OUT_DIR = Path("/home/s081p868/scratch/RNA_Structure_Evaluation/predictions/farfar2/str")
 
-# Adjust parallelism for your node
+# Defaults of --workers / --chunk-size (PDBs per worker task); adjust for your node
 MAX_WORKERS = 16
+CHUNK_SIZE = 64
 
-# Chain ID pool to assign for blanks
-CHAIN_POOL: List[str] = list("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789abcdefghijklmnopqrstuvwxyz")
+# Defaults of --mode ("mmap": patch in the kernel and link unchanged files; "rewrite":
+# read + write every file) and --unchanged ("hardlink", "reflink" or "copy")
+MODE = "mmap"
+UNCHANGED = "hardlink"
 
 
 def assign_chain_ids(in_pdb: Path, out_pdb: Path) -> Tuple[str, str]:
@@ -34,6 +71,56 @@ def assign_chain_ids(in_pdb: Path, out_pdb: Path) -> Tuple[str, str]:
     Fix blank chain IDs in a single PDB.
     Returns (status, message). status in {"ok", "copied", "skip", "error"}.
     """
+    try:
+        status, fixed, n_fixed = fix_blank_chains(in_pdb.read_bytes())
+        if status == "no_atoms":
+            shutil.copy2(in_pdb, out_pdb)
+            return ("copied", f"{in_pdb.name}: no atoms, copied")
+        if status == "no_blanks":
+            shutil.copy2(in_pdb, out_pdb)
+            return ("copied", f"{in_pdb.name}: no blank chains, copied")
+
+        out_pdb.parent.mkdir(parents=True, exist_ok=True)
+        out_pdb.write_bytes(fixed)
+        return ("ok", f"{in_pdb.name}: fixed {n_fixed} blank chain(s)")
+
+    except Exception as e:
+        return ("error", f"{in_pdb.name}: {e}")
+
+
+def assign_chain_ids_mmap(in_pdb: Path, out_pdb: Path, unchanged: str = UNCHANGED) -> Tuple[str, str]:
+    """assign_chain_ids() on a memory map of the input, with zero-copy output (see zero_copy.py)."""
+    try:
+        if in_pdb.stat().st_size == 0:
+            status, pos, new_ids, n_fixed = "no_atoms", None, None, 0
+        else:
+            with open(in_pdb, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                status, pos, new_ids, n_fixed = chain_patches(mm)
+                if status == "short":
+                    # A blank-chain record too short to patch in place: pad it the slow way
+                    _status, fixed, n_fixed = fix_blank_chains(mm[:])
+
+        if status in ("no_atoms", "no_blanks"):
+            how = link_unchanged(in_pdb, out_pdb, unchanged)
+            what = "no atoms" if status == "no_atoms" else "no blank chains"
+            done = {"hardlink": "hard-linked", "reflink": "reflinked", "copy": "copied"}[how]
+            return ("copied", f"{in_pdb.name}: {what}, {done}")
+
+        if status == "short":
+            out_pdb.parent.mkdir(parents=True, exist_ok=True)
+            out_pdb.write_bytes(fixed)
+        else:
+            write_patched(in_pdb, out_pdb, pos, new_ids)
+        return ("ok", f"{in_pdb.name}: fixed {n_fixed} blank chain(s)")
+
+    except Exception as e:
+        return ("error", f"{in_pdb.name}: {e}")
+
+
+def assign_chain_ids_biopython(in_pdb: Path, out_pdb: Path) -> Tuple[str, str]:
+    """assign_chain_ids() through a Biopython Structure and PDBIO (the previous implementation)."""
+    from Bio.PDB import PDBParser, PDBIO
+
     try:
         parser = PDBParser(QUIET=True)
         structure = parser.get_structure(in_pdb.stem, str(in_pdb))
@@ -87,38 +174,192 @@ def assign_chain_ids(in_pdb: Path, out_pdb: Path) -> Tuple[str, str]:
         return ("error", f"{in_pdb.name}: {e}")
 
 
+def check_chain_ids(in_pdb: Path) -> Tuple[str, str]:
+    """--dry-run: what assign_chain_ids() would do, without writing anything."""
+    try:
+        if in_pdb.stat().st_size == 0:
+            return ("copied", f"{in_pdb.name}: no atoms, unchanged")
+        with open(in_pdb, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            status, _pos, _new_ids, n_fixed = chain_patches(mm)
+        if status == "no_atoms":
+            return ("copied", f"{in_pdb.name}: no atoms, unchanged")
+        if status == "no_blanks":
+            return ("copied", f"{in_pdb.name}: no blank chains, unchanged")
+        return ("ok", f"{in_pdb.name}: would fix {n_fixed} blank chain(s)")
+    except Exception as e:
+        return ("error", f"{in_pdb.name}: {e}")
+
+
+def check_pdb_bytes(data: bytes, label: str) -> Tuple[str, str]:
+    """check_chain_ids() for PDB text that is not a plain file (e.g. converted from an AlphaFold3 mmCIF)."""
+    status, _pos, _new_ids, n_fixed = chain_patches(data)
+    if status in ("no_atoms", "no_blanks"):
+        what = "no atoms" if status == "no_atoms" else "no blank chains"
+        return ("copied", f"{label}: {what}, unchanged")
+    return ("ok", f"{label}: would fix {n_fixed} blank chain(s)")
+
+
+def write_pdb_bytes(data: bytes, out_pdb: Path, label: str) -> Tuple[str, str]:
+    """assign_chain_ids() for PDB text that is not a plain file; written via a temp name and rename."""
+    try:
+        status, fixed, n_fixed = fix_blank_chains(data)
+        out_pdb.parent.mkdir(parents=True, exist_ok=True)
+        tmp = out_pdb.with_name(f".{out_pdb.name}.tmp")
+        tmp.write_bytes(data if fixed is None else fixed)
+        tmp.replace(out_pdb)
+        if fixed is None:
+            what = "no atoms" if status == "no_atoms" else "no blank chains"
+            return ("copied", f"{label}: {what}, written")
+        return ("ok", f"{label}: fixed {n_fixed} blank chain(s)")
+    except Exception as e:
+        return ("error", f"{label}: {e}")
+
+
+def output_path(item: StructureInput) -> Path:
+    """<out_root>/<URS>.pdb: one flat directory per tool."""
+    return item.out_root / f"{item.name}.pdb"
+
+
+def up_to_date(item: StructureInput, out_pdb: Path) -> bool:
+    """The output exists and is not older than its source file (the archive, for zip members)."""
+    try:
+        return out_pdb.stat().st_mtime >= item.path.stat().st_mtime
+    except FileNotFoundError:
+        return False
+
+
+def normalize_structure(item: StructureInput, mode: str, unchanged: str, dry_run: bool,
+                        force: bool) -> Tuple[str, str, int]:
+    """Normalize one model (plain PDB or archive member) to its flat output; (status, message, input bytes)."""
+    out_pdb = output_path(item)
+    try:
+        size = item.path.stat().st_size
+    except OSError:
+        size = 0
+    if not force and up_to_date(item, out_pdb):
+        return ("skip", f"{item.key}: up to date", 0)
+
+    if item.member is None and item.fmt == "pdb":
+        if dry_run:
+            status, msg = check_chain_ids(item.path)
+        elif mode == "mmap":
+            status, msg = assign_chain_ids_mmap(item.path, out_pdb, unchanged)
+        else:
+            status, msg = assign_chain_ids(item.path, out_pdb)
+        return (status, msg, size)
+
+    # Archive members (AlphaFold3 mmCIF) are streamed out and converted in memory
+    try:
+        data = item.read_pdb()
+    except Exception as e:
+        return ("error", f"{item.key}: {e}", size)
+    if dry_run:
+        status, msg = check_pdb_bytes(data, item.key)
+    else:
+        status, msg = write_pdb_bytes(data, out_pdb, item.key)
+    return (status, msg, len(data))
+
+
+def process_chunk(items: List[StructureInput], mode: str, unchanged: str, dry_run: bool,
+                  force: bool) -> List[Tuple[str, str, int]]:
+    """Normalize a batch of models in one worker task; (status, message, input bytes) per model."""
+    return [normalize_structure(item, mode, unchanged, dry_run, force) for item in items]
+
+
+def chunked(items: List, size: int) -> Iterator[List]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class Progress:
+    """Progress line with files/s and MB/s, printed at most every `interval` seconds."""
+
+    def __init__(self, total: int, interval: float):
+        self.total = total
+        self.interval = interval
+        self.files = 0
+        self.bytes = 0
+        self._t0 = time.perf_counter()
+        self._next = self._t0 + interval
+
+    def update(self, files: int, nbytes: int, final: bool = False):
+        self.files += files
+        self.bytes += nbytes
+        now = time.perf_counter()
+        if not final and now < self._next:
+            return
+        self._next = now + self.interval
+        wall = max(now - self._t0, 1e-9)
+        label = "final" if final else "progress"
+        print(f"[{label}] {self.files}/{self.total} files  {self.files / wall:.1f} files/s  "
+              f"{self.bytes / 1e6 / wall:.1f} MB/s  wall={wall:.1f}s", flush=True)
+
+
 def main():
-    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    ap = argparse.ArgumentParser(description="Normalize predicted models (blank chain IDs filled) into flat str directories")
+    ap.add_argument("--config", help="Tool layout JSON (model_sources.py format, out_root = flat str directory "
+                                     "of the tool), e.g. normalize_tools.json; default: FARFAR2 from --in-root only")
+    ap.add_argument("--fasta", help="FASTA used to name AlphaFold3 archives by sequence (needed for af3_zip layouts)")
+    ap.add_argument("--in-root", default=str(IN_ROOT), help="FARFAR2 directory searched recursively for *.pdb")
+    ap.add_argument("--out-dir", default=str(OUT_DIR), help="Flat FARFAR2 output directory (same basenames)")
+    ap.add_argument("--workers", type=int, default=MAX_WORKERS, help="Worker processes")
+    ap.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Models per worker task")
+    ap.add_argument("--max-in-flight", type=int, default=0,
+                    help="Most tasks submitted but not finished (default 4 x workers)")
+    ap.add_argument("--mode", choices=["mmap", "rewrite"], default=MODE,
+                    help="mmap: patch in the kernel and link unchanged files; rewrite: read + write every file")
+    ap.add_argument("--unchanged", choices=list(LINK_MODES), default=UNCHANGED,
+                    help="How --mode mmap places files that need no change")
+    ap.add_argument("--force", action="store_true", help="Redo outputs that are already up to date")
+    ap.add_argument("--progress-interval", type=float, default=10.0, help="Seconds between progress lines")
+    ap.add_argument("--dry-run", action="store_true", help="Only report which files would change")
+    ap.add_argument("--verbose", action="store_true", help="Print a line for every file, not only changes/errors")
+    args = ap.parse_args()
+
+    workers = max(1, args.workers)
+    max_in_flight = args.max_in_flight if args.max_in_flight > 0 else 4 * workers
 
-    # Find all .pdb files under the input root (recursive)
-    pdb_files = sorted(IN_ROOT.rglob("*.pdb"))
-    if not pdb_files:
-        print(f"No PDBs found under {IN_ROOT}")
+    if args.config:
+        tools = load_tools_config(Path(args.config))
+    else:
+        tools = {"farfar2": dict(DEFAULT_LAYOUTS["farfar2"], root=args.in_root, out_root=args.out_dir)}
+    items = discover(tools, Path(args.fasta) if args.fasta else None)
+    if not items:
+        print(f"No models found under {', '.join(str(cfg['root']) for cfg in tools.values())}")
         return
 
-    print(f"Found {len(pdb_files)} PDB(s). Writing to {OUT_DIR}")
-
-    futures = []
-    with ProcessPoolExecutor(max_workers=MAX_WORKERS) as ex:
-        for in_pdb in pdb_files:
-            out_pdb = OUT_DIR / in_pdb.name  # flat output with same basename
-            futures.append(ex.submit(assign_chain_ids, in_pdb, out_pdb))
-
-        ok = copied = skipped = errors = 0
-        for fut in as_completed(futures):
-            status, msg = fut.result()
-            print(msg)
-            if status == "ok":
-                ok += 1
-            elif status == "copied":
-                copied += 1
-            elif status == "skip":
-                skipped += 1
-            elif status == "error":
-                errors += 1
-
-    print(f"\nSummary → fixed: {ok}, copied: {copied}, skipped: {skipped}, errors: {errors}")
-    print(f"Output dir: {OUT_DIR}")
+    out_dirs = sorted({str(item.out_root) for item in items})
+    action = "Checking (dry run)" if args.dry_run else f"Writing to {', '.join(out_dirs)}"
+    print(f"Found {len(items)} model(s). {action}")
+
+    counts = {"ok": 0, "copied": 0, "skip": 0, "error": 0}
+    progress = Progress(len(items), args.progress_interval)
+    chunks = chunked(items, max(1, args.chunk_size))
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        pending = set()
+        while True:
+            # Keep at most max_in_flight tasks queued so huge inputs do not pile up futures
+            for chunk in chunks:
+                pending.add(ex.submit(process_chunk, chunk, args.mode, args.unchanged, args.dry_run, args.force))
+                if len(pending) >= max_in_flight:
+                    break
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                results = fut.result()
+                for status, msg, _size in results:
+                    counts[status] = counts.get(status, 0) + 1
+                    if args.verbose or status in ("ok", "error"):
+                        print(msg)
+                progress.update(len(results), sum(size for _s, _m, size in results))
+    progress.update(0, 0, final=True)
+
+    fixed_label = "would fix" if args.dry_run else "fixed"
+    print(f"\nSummary → {fixed_label}: {counts['ok']}, unchanged/copied: {counts['copied']}, "
+          f"up to date: {counts['skip']}, errors: {counts['error']}")
+    if not args.dry_run:
+        print(f"Output dir(s): {', '.join(out_dirs)}")
 
 
 if __name__ == "__main__":
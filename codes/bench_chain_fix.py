@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark the chain-ID fix of add_chain_to_str.py: Biopython (PDBParser + PDBIO)
+versus the fixed-column NumPy path (pdb_array.py), reading and writing whole
+files ("numpy") or patching memory maps with zero-copy output ("mmap").
+
+Each engine processes every PDB under --in-root into their own temp directory
+(serially, so the numbers are per-file cost). The outputs are compared with the
+Biopython ones (else the "numpy" ones) atom by atom on chain, resseq, atom name
+and coordinates.
+Biopython is imported lazily; without it only the NumPy path is timed.
+
+Usage:
+  python bench_chain_fix.py --in-root /path/to/farfar2/preds [--limit 500] [--repeat 3]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from add_chain_to_str import assign_chain_ids, assign_chain_ids_biopython, assign_chain_ids_mmap
+from pdb_array import read_pdb
+
+ENGINES = [
+    ("biopython", assign_chain_ids_biopython),
+    ("numpy", assign_chain_ids),
+    ("mmap", assign_chain_ids_mmap),
+]
+
+
+def time_engine(func, pdb_files, out_dir: Path, repeat: int):
+    """Best-of-`repeat` wall time and the status counts of the last run."""
+    best = None
+    counts = {}
+    for _ in range(repeat):
+        counts = {}
+        t0 = time.perf_counter()
+        for in_pdb in pdb_files:
+            status, _msg = func(in_pdb, out_dir / in_pdb.name)
+            counts[status] = counts.get(status, 0) + 1
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, counts
+
+
+def same_atoms(a: Path, b: Path) -> bool:
+    x, y = read_pdb(a), read_pdb(b)
+    if len(x) != len(y):
+        return False
+    return (np.array_equal(x["chain"], y["chain"]) and np.array_equal(x["resseq"], y["resseq"])
+            and np.array_equal(x["name"], y["name"]) and np.allclose(x["xyz"], y["xyz"], atol=1e-3))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Time the chain-ID fix with Biopython vs pdb_array")
+    ap.add_argument("--in-root", required=True, help="Directory searched recursively for *.pdb")
+    ap.add_argument("--limit", type=int, default=0, help="Only the first N PDBs (0 = all)")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    pdb_files = sorted(Path(args.in_root).rglob("*.pdb"))
+    if args.limit:
+        pdb_files = pdb_files[:args.limit]
+    if not pdb_files:
+        raise SystemExit(f"[ERROR] no PDBs under {args.in_root}")
+    total_mb = sum(p.stat().st_size for p in pdb_files) / 1e6
+    print(f"[INFO] {len(pdb_files)} PDB(s), {total_mb:.1f} MB")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out_dirs = {}
+        print(f"{'engine':<11}{'seconds':>10}{'files/s':>10}{'MB/s':>9}  statuses")
+        for label, func in ENGINES:
+            out_dir = Path(tmp) / label
+            out_dir.mkdir()
+            try:
+                dt, counts = time_engine(func, pdb_files, out_dir, args.repeat)
+            except ImportError as e:
+                print(f"{label:<11}  not measured: {e}")
+                continue
+            out_dirs[label] = out_dir
+            status = ", ".join(f"{k}={v}" for k, v in sorted(counts.items()))
+            print(f"{label:<11}{dt:>10.3f}{len(pdb_files) / dt:>10.1f}{total_mb / dt:>9.1f}  {status}")
+
+        ref = "biopython" if "biopython" in out_dirs else "numpy"
+        for label in out_dirs:
+            if label == ref:
+                continue
+            mismatched = [p.name for p in pdb_files
+                          if (out_dirs[ref] / p.name).exists()
+                          and not same_atoms(out_dirs[ref] / p.name, out_dirs[label] / p.name)]
+            if mismatched:
+                print(f"[WARN] {label} vs {ref}: {len(mismatched)} file(s) differ, e.g. {', '.join(mismatched[:5])}")
+            else:
+                print(f"[OK] {label} vs {ref}: chain, resseq, atom names and coordinates match for every file")
+
+
+if __name__ == "__main__":
+    main()
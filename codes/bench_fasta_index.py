@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Per-lookup latency of FASTA record extraction as the file grows:
+
+  scan    read the file from the top until the record is found (what the motif
+          scan driver did for every structure, like the awk call of the old shell
+          script)
+  index   fasta_index.FastaIndex lookup (dict + slice of a memory map)
+
+Synthetic FASTA files with URS-like names and 40-200 nt sequences (60 nt lines)
+are written to a temp dir for each size. Lookups are of random names; the index
+build time (first open, writing the .fxi) is reported separately. Every lookup
+is checked against the scan result.
+
+Usage:
+  python bench_fasta_index.py [--sizes 1000 5000 20000 50000] [--lookups 200] [--scan-lookups 20]
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from fasta_index import FastaIndex
+
+
+def scan_record(fasta_path: Path, header: str) -> Optional[List[str]]:
+    """Linear-scan lookup (the former motifscan_driver.extract_fasta_record)."""
+    lines = None
+    with open(fasta_path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            if line.startswith(">"):
+                if lines is not None:
+                    break
+                tokens = line[1:].split()
+                if tokens and tokens[0] == header:
+                    lines = []
+            elif lines is not None:
+                lines.append(line.rstrip("\n"))
+    return lines
+
+
+def write_fasta(path: Path, n: int, rng: random.Random) -> List[str]:
+    names = []
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            start = rng.randint(1, 40)
+            seq = "".join(rng.choice("ACGU") for _ in range(rng.randint(40, 200)))
+            name = f"URS{i:010X}_9606_{start}-{start + len(seq) - 1}_RF{rng.randint(1, 4000):05d}"
+            names.append(name)
+            f.write(f">{name} Homo sapiens\n")
+            for j in range(0, len(seq), 60):
+                f.write(seq[j:j + 60] + "\n")
+    return names
+
+
+def main():
+    ap = argparse.ArgumentParser(description="FASTA lookup latency: linear scan vs offset index")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000, 50000])
+    ap.add_argument("--lookups", type=int, default=200, help="Random lookups timed with the index")
+    ap.add_argument("--scan-lookups", type=int, default=20, help="Random lookups timed with the linear scan")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'records':>8}{'MB':>8}{'build_ms':>10}{'scan_us':>12}{'index_us':>10}{'speedup':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            fasta = Path(tmp) / f"seqs_{n}.fa"
+            names = write_fasta(fasta, n, rng)
+            size_mb = fasta.stat().st_size / 1e6
+
+            t0 = time.perf_counter()
+            idx = FastaIndex(fasta)
+            build = time.perf_counter() - t0
+
+            queries = [rng.choice(names) for _ in range(args.lookups)]
+            t0 = time.perf_counter()
+            found = [idx.lines(q) for q in queries]
+            per_index = (time.perf_counter() - t0) / len(queries)
+
+            scan_queries = queries[:args.scan_lookups]
+            t0 = time.perf_counter()
+            scanned = [scan_record(fasta, q) for q in scan_queries]
+            per_scan = (time.perf_counter() - t0) / len(scan_queries)
+
+            if scanned != found[:len(scanned)]:
+                raise SystemExit(f"[ERROR] index and scan disagree for {n} records")
+            idx.close()
+            print(f"{n:>8}{size_mb:>8.1f}{build * 1e3:>10.1f}{per_scan * 1e6:>12.1f}"
+                  f"{per_index * 1e6:>10.2f}{per_scan / per_index:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
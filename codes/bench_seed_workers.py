@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark the seed worker pool (seed_reader.map_families) as the worker count grows.
+
+  store_build   seed_store.build_store into a fresh store directory every run
+                (fam_species_stats.py / human_seqs_with_stat_info.py only use
+                their --workers for this one-time build)
+  human_seqs    human_seqs_from_fams.extract_human_sequences, which parses the
+                families through map_families on every run
+
+Each task runs with 1..N worker processes; every run's output (the store's files
+or the text output) is checked to be byte-identical to the serial one.
+
+Usage:
+  python bench_seed_workers.py --seed-file Rfam.seed --excel-file Rfam_Final_combined_3d_List.xlsx --max-workers 8
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from human_seqs_from_fams import extract_human_sequences
+from seed_reader import load_index
+from seed_store import build_store
+
+
+def run_store_build(seed_file, excel_file, out_path: Path, workers: int):
+    if out_path.exists():
+        shutil.rmtree(out_path)  # never time a store that is already built
+    build_store(seed_file, store_dir=out_path, workers=workers)
+
+
+def run_human_seqs(seed_file, excel_file, out_path: Path, workers: int):
+    extract_human_sequences(seed_file, excel_file, str(out_path), workers=workers)
+
+
+TASKS = [
+    ("store_build", run_store_build),
+    ("human_seqs", run_human_seqs),
+]
+
+
+def output_bytes(path: Path) -> dict:
+    """{relative file: bytes} of an output file or directory."""
+    if path.is_dir():
+        return {p.relative_to(path): p.read_bytes() for p in sorted(path.rglob("*")) if p.is_file()}
+    return {path.name: path.read_bytes()}
+
+
+def time_run(func, seed_file, excel_file, out_path, workers, repeat):
+    """Best-of-`repeat` wall time in seconds; the script's own progress print is suppressed."""
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            func(seed_file, excel_file, out_path, workers)
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Time seed extraction as the worker count goes from 1 to N")
+    ap.add_argument("--seed-file", required=True)
+    ap.add_argument("--excel-file", required=True)
+    ap.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--repeat", type=int, default=3, help="Runs per setting; the best time is reported")
+    args = ap.parse_args()
+
+    # Build the index up front so the first timed run does not pay for it
+    load_index(args.seed_file)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        print(f"{'task':<15}{'workers':>8}{'seconds':>10}{'speedup':>9}  identical")
+        for name, func in TASKS:
+            serial_out = tmp / f"{name}_w1"
+            serial_t = time_run(func, args.seed_file, args.excel_file, serial_out, 1, args.repeat)
+            print(f"{name:<15}{1:>8}{serial_t:>10.3f}{1.0:>9.2f}  -")
+            for workers in range(2, args.max_workers + 1):
+                out = tmp / f"{name}_w{workers}"
+                t = time_run(func, args.seed_file, args.excel_file, out, workers, args.repeat)
+                same = list(output_bytes(out).values()) == list(output_bytes(serial_out).values())
+                print(f"{name:<15}{workers:>8}{t:>10.3f}{serial_t / t:>9.2f}  {'yes' if same else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
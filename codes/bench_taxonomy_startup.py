@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Startup-time comparison for species-name resolution in fam_species_stats.py.
+
+  before: import ete3, create NCBITaxa() (what the script used to do at import time)
+          and translate the tax IDs found in the seed file
+  after:  import taxonomy_cache and resolve the same tax IDs through the compact
+          cache (what fam_species_stats.py does now; the ete3 DB stays closed
+          unless the cache misses)
+
+Each measurement runs in a fresh interpreter so import costs are included.
+
+Usage:
+  python bench_taxonomy_startup.py --seed-file Rfam.seed [--taxonomy-cache ../data/taxid_names.tsv] [--repeat 5]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from taxonomy_cache import DEFAULT_CACHE, seed_taxids
+
+CODES_DIR = Path(__file__).resolve().parent
+
+BEFORE = """
+import json, sys, time
+t0 = time.perf_counter()
+from ete3 import NCBITaxa
+ncbi = NCBITaxa()
+t1 = time.perf_counter()
+names = ncbi.get_taxid_translator(json.loads(sys.argv[1]))
+t2 = time.perf_counter()
+print(json.dumps({"startup": t1 - t0, "resolve": t2 - t1, "resolved": len(names)}))
+"""
+
+AFTER = """
+import json, sys, time
+t0 = time.perf_counter()
+from taxonomy_cache import TaxonomyCache
+cache = TaxonomyCache(sys.argv[2])
+t1 = time.perf_counter()
+names = cache.translate(json.loads(sys.argv[1]))
+t2 = time.perf_counter()
+print(json.dumps({"startup": t1 - t0, "resolve": t2 - t1, "resolved": len(names)}))
+"""
+
+
+def run(code, *argv):
+    proc = subprocess.run([sys.executable, "-c", code, *argv], cwd=CODES_DIR,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None, proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"
+    return json.loads(proc.stdout.strip().splitlines()[-1]), None
+
+
+def best_of(code, repeat, *argv):
+    best = None
+    for _ in range(repeat):
+        res, err = run(code, *argv)
+        if res is None:
+            return None, err
+        if best is None or res["startup"] + res["resolve"] < best["startup"] + best["resolve"]:
+            best = res
+    return best, None
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Measure taxonomy startup time before/after the taxid cache")
+    ap.add_argument("--seed-file", required=True)
+    ap.add_argument("--taxonomy-cache", default=str(DEFAULT_CACHE))
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    taxids = json.dumps(sorted(seed_taxids(args.seed_file)))
+    print(f"{'mode':<8}{'startup_s':>12}{'resolve_s':>12}{'resolved':>10}")
+    for label, code, argv in (("before", BEFORE, (taxids,)),
+                              ("after", AFTER, (taxids, args.taxonomy_cache))):
+        res, err = best_of(code, args.repeat, *argv)
+        if res is None:
+            print(f"{label:<8}  not measured: {err}")
+            continue
+        print(f"{label:<8}{res['startup']:>12.4f}{res['resolve']:>12.4f}{res['resolved']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,16 @@ write per-motif breakdown CSVs.
 Scans:
   <ROOT>/URS*/Res_motifs/{c-loop_consensus,e-loop_consensus,k-turn_consensus,
                          reverse-kturn_consensus,sarcin-ricin_consensus}/result.log
+  (plus any other motif directory found under Res_motifs)
+
+Each root is walked with one os.scandir listing per directory (no per-path
+is_dir/is_file stat calls) and the logs are read by a thread pool (--workers);
+rows are streamed into the per-motif CSVs in URS order as counts come in.
+
+Counts are cached per root in <ROOT>/.motif_counts_cache.jsonl (path, size,
+mtime, count of every result.log). A rerun only reads logs that changed since
+the last run and reports how many were reused and how many recounted;
+--no-cache re-counts everything.
 
 Counts rows as non-empty, non-header (header may begin with '#' or not).
 
@@ -21,14 +31,20 @@ Also writes per-tool CSVs with columns:
   num_motifs_k-turn_consensus,
   num_motifs_reverse-kturn_consensus,
   num_motifs_sarcin-ricin_consensus,
+  [num_motifs_<other motif>, ...]
   <tool-total-column>
 """
 
 import argparse
 import csv
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
+# Always reported (in this order, 0 when missing); other motif dirs found under Res_motifs follow, sorted
 EXPECTED_MOTIFS = [
     "c-loop_consensus",
     "e-loop_consensus",
@@ -37,13 +53,21 @@ EXPECTED_MOTIFS = [
     "sarcin-ricin_consensus",
 ]
 
+RES_DIRNAME = "Res_motifs"
+LOG_NAME = "result.log"
+DEFAULT_WORKERS = 16
+CACHE_NAME = ".motif_counts_cache.jsonl"
+
 def count_results(log_path: Path) -> int:
     """Count non-header, non-blank lines in result.log (header can be '#fragment_ID...' or 'fragment_ID...')."""
     if not log_path.is_file():
         return 0
+    return _count_lines(str(log_path))
+
+def _count_lines(log_path: str) -> int:
     n = 0
     first_nonempty_seen = False
-    with log_path.open("r", encoding="utf-8", errors="ignore") as f:
+    with open(log_path, "r", encoding="utf-8", errors="ignore") as f:
         for line in f:
             s = line.strip()
             if not s:
@@ -59,51 +83,165 @@ def count_results(log_path: Path) -> int:
             n += 1
     return n
 
-def collect_counts_and_breakdown(root: Path):
+def _scandir_dirs(path: str) -> List[os.DirEntry]:
+    """Subdirectories of path from one listing (d_type, no per-entry stat); [] if path is missing."""
+    try:
+        with os.scandir(path) as it:
+            return [e for e in it if e.is_dir()]
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+def list_motif_logs(urs_dir: str) -> Optional[Dict[str, Optional[os.DirEntry]]]:
+    """
+    {motif -> result.log entry, or None if the motif dir has no log} for one structure;
+    None if it has no Res_motifs directory.
+    """
+    res = os.path.join(urs_dir, RES_DIRNAME)
+    try:
+        with os.scandir(res) as it:
+            motif_dirs = [e for e in it if e.is_dir()]
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    logs = {}
+    for d in motif_dirs:
+        with os.scandir(d.path) as it:
+            logs[d.name] = next((e for e in it if e.name == LOG_NAME and e.is_file()), None)
+    return logs
+
+class CountCache:
+    """
+    Per-root sidecar (<root>/.motif_counts_cache.jsonl) of result.log counts, one JSON
+    line per log: {"path": <relative to root>, "size": ..., "mtime_ns": ..., "count": ...}.
+    A log whose size and mtime still match its entry is not read again.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.path = root / CACHE_NAME
+        self._old: Dict[str, dict] = {}
+        self._new: Dict[str, dict] = {}
+        self.reused = 0
+        self.recounted = 0
+        self._lock = threading.Lock()
+        if self.path.is_file():
+            with self.path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn line from an interrupted write
+                    self._old[entry["path"]] = entry
+
+    def count(self, entry: os.DirEntry) -> int:
+        rel = os.path.relpath(entry.path, self.root)
+        st = entry.stat()
+        old = self._old.get(rel)
+        reuse = old is not None and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns
+        n = old["count"] if reuse else _count_lines(entry.path)
+        with self._lock:
+            if reuse:
+                self.reused += 1
+            else:
+                self.recounted += 1
+            self._new[rel] = {"path": rel, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "count": n}
+        return n
+
+    @property
+    def dropped(self) -> int:
+        """Cached logs that no longer exist."""
+        return len(self._old.keys() - self._new.keys())
+
+    def save(self):
+        """Rewrite the sidecar with the logs seen in this run (atomically)."""
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with tmp.open("w", encoding="utf-8") as f:
+                for rel in sorted(self._new):
+                    f.write(json.dumps(self._new[rel]) + "\n")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[WARN] Could not write count cache {self.path}: {e}")
+
+def order_motifs(found: Iterable[str]) -> List[str]:
+    extra = sorted(set(found) - set(EXPECTED_MOTIFS))
+    return EXPECTED_MOTIFS + extra
+
+def scan_root(root: Path, workers: int = DEFAULT_WORKERS,
+              cache: Optional[CountCache] = None) -> Tuple[List[str], Iterator[Tuple[str, Dict[str, int]]]]:
+    """
+    Walk <root>/URS*/Res_motifs/<motif>/result.log with one scandir per directory
+    and a thread pool for the listings and the reads. With a cache, only logs whose
+    size or mtime changed are read.
+
+    Returns (motifs, rows): the motif columns (EXPECTED_MOTIFS first, then any other
+    motif directories found) and an iterator of (URS, {motif -> count}) in URS order,
+    which yields while later logs are still being read.
+    """
+    if not root or not root.is_dir():
+        return list(EXPECTED_MOTIFS), iter(())
+    urs_dirs = sorted((e.name, e.path) for e in _scandir_dirs(str(root)) if e.name.startswith("URS"))
+
+    pool = ThreadPoolExecutor(max_workers=max(1, workers))
+    listings = list(pool.map(list_motif_logs, [p for _, p in urs_dirs]))
+    motifs = order_motifs(m for logs in listings if logs for m in logs)
+
+    def count_one(logs: Dict[str, Optional[os.DirEntry]]) -> Dict[str, int]:
+        if cache is None:
+            return {m: _count_lines(e.path) if e else 0 for m, e in logs.items()}
+        return {m: cache.count(e) if e else 0 for m, e in logs.items()}
+
+    def rows() -> Iterator[Tuple[str, Dict[str, int]]]:
+        try:
+            present = [(name, logs) for (name, _), logs in zip(urs_dirs, listings) if logs is not None]
+            for (name, _), counts in zip(present, pool.map(count_one, [logs for _, logs in present])):
+                yield name, {m: counts.get(m, 0) for m in motifs}
+        finally:
+            pool.shutdown()
+
+    return motifs, rows()
+
+def collect_counts_and_breakdown(root: Path, workers: int = DEFAULT_WORKERS):
     """
     Return:
       totals: {URS -> total_count}
-      per_motif: {URS -> {motif -> count}}  (for EXPECTED_MOTIFS only)
+      per_motif: {URS -> {motif -> count}}  (EXPECTED_MOTIFS plus any other motif dirs found)
     """
-    totals = defaultdict(int)
-    per_motif = defaultdict(lambda: {m: 0 for m in EXPECTED_MOTIFS})
-    if not root or not root.is_dir():
-        return {}, {}
-    for urs in sorted(p for p in root.glob("URS*") if p.is_dir()):
-        mroot = urs / "Res_motifs"
-        if not mroot.is_dir():
-            continue
-        total = 0
-        # ensure we only count the five specific motifs; missing dirs -> 0
-        for motif in EXPECTED_MOTIFS:
-            d = mroot / motif
-            c = count_results(d / "result.log") if d.is_dir() else 0
-            per_motif[urs.name][motif] = c
-            total += c
-        totals[urs.name] = total
-    return dict(totals), dict(per_motif)
-
-def write_per_motif_csv(out_path: Path, per_motif: dict, total_col: str):
+    _, rows = scan_root(root, workers)
+    per_motif = dict(rows)
+    totals = {urs: sum(counts.values()) for urs, counts in per_motif.items()}
+    return totals, per_motif
+
+def write_per_motif_csv(out_path: Path, rows: Iterable[Tuple[str, Dict[str, int]]],
+                        motifs: List[str], total_col: str) -> Dict[str, int]:
     """
-    Write CSV in the exact format requested:
+    Stream rows into a CSV in the exact format requested:
     file_name,num_motifs_c-loop_consensus,...,num_motifs_sarcin-ricin_consensus,<total_col>
+    (columns for any extra motifs come before the total). Returns {URS -> total}.
+    The file is only created once there is a row to write.
     """
-    if not per_motif:
-        return
-    header = ["file_name"] + [f"num_motifs_{m}" for m in EXPECTED_MOTIFS] + [total_col]
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    with out_path.open("w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=header)
-        w.writeheader()
-        for urs in sorted(per_motif.keys()):
+    header = ["file_name"] + [f"num_motifs_{m}" for m in motifs] + [total_col]
+    totals = {}
+    f = None
+    try:
+        for urs, counts in rows:
+            if f is None:
+                out_path.parent.mkdir(parents=True, exist_ok=True)
+                f = out_path.open("w", newline="", encoding="utf-8")
+                w = csv.DictWriter(f, fieldnames=header)
+                w.writeheader()
             row = {"file_name": urs}
             total = 0
-            for m in EXPECTED_MOTIFS:
-                v = int(per_motif[urs].get(m, 0))
+            for m in motifs:
+                v = int(counts.get(m, 0))
                 row[f"num_motifs_{m}"] = v
                 total += v
             row[total_col] = total
             w.writerow(row)
+            totals[urs] = total
+    finally:
+        if f is not None:
+            f.close()
+    return totals
 
 def main():
     ap = argparse.ArgumentParser(description="Update mapping CSV with motif totals + write per-motif CSVs")
@@ -113,6 +251,10 @@ def main():
     ap.add_argument("--farfar-root",    help="Path to farfar_pdb directory")
     ap.add_argument("--rhofold-root",   help="Path to rhofold_pdb directory")
     ap.add_argument("--alphafold-root", help="Path to alphafold_pdb directory")
+    ap.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                    help="Threads listing directories and reading result.log files")
+    ap.add_argument("--no-cache", action="store_true",
+                    help=f"Re-count every result.log and leave the {CACHE_NAME} sidecars untouched")
     args = ap.parse_args()
 
     mapping_csv = Path(args.mapping_csv).expanduser().resolve()
@@ -125,22 +267,30 @@ def main():
     rhofold_root   = Path(args.rhofold_root).expanduser().resolve()   if args.rhofold_root   else None
     alphafold_root = Path(args.alphafold_root).expanduser().resolve() if args.alphafold_root else None
 
-    f_tot, f_break = collect_counts_and_breakdown(farfar_root)    if farfar_root    else ({}, {})
-    r_tot, r_break = collect_counts_and_breakdown(rhofold_root)   if rhofold_root   else ({}, {})
-    a_tot, a_break = collect_counts_and_breakdown(alphafold_root) if alphafold_root else ({}, {})
+    # Per-motif CSVs at the requested default locations, streamed while the logs are read
+    def count_tool(root: Path, csv_name: str, total_col: str) -> Dict[str, int]:
+        if not root:
+            return {}
+        cache = None if args.no_cache else CountCache(root)
+        motifs, rows = scan_root(root, args.workers, cache)
+        extra = motifs[len(EXPECTED_MOTIFS):]
+        if extra:
+            print(f"[INFO] {root.name}: additional motif dirs found: {', '.join(extra)}")
+        totals = write_per_motif_csv(root.parent / csv_name, rows, motifs, total_col)
+        if cache is not None:
+            cache.save()
+            print(f"[INFO] {root.name}: {cache.reused} result.log reused from cache, {cache.recounted} recounted"
+                  + (f", {cache.dropped} gone" if cache.dropped else ""))
+        return totals
+
+    f_tot = count_tool(farfar_root,    "farfar2_motif_counts_1.csv",    "num_motifs_farfar2")
+    r_tot = count_tool(rhofold_root,   "rhofold_motif_counts_1.csv",    "num_motifs_rhofold")
+    a_tot = count_tool(alphafold_root, "alphafold3_motif_counts_1.csv", "num_motifs_alphafold3")
 
     print(f"[INFO] FARFAR2 URS counted:   {len(f_tot)}")
     print(f"[INFO] RhoFold  URS counted:  {len(r_tot)}")
     print(f"[INFO] AlphaFold3 URS counted:{len(a_tot)}")
 
-    # Write per-motif CSVs at the requested default locations
-    if farfar_root:
-        write_per_motif_csv(farfar_root.parent / "farfar2_motif_counts_1.csv", f_break, "num_motifs_farfar2")
-    if rhofold_root:
-        write_per_motif_csv(rhofold_root.parent / "rhofold_motif_counts_1.csv", r_break, "num_motifs_rhofold")
-    if alphafold_root:
-        write_per_motif_csv(alphafold_root.parent / "alphafold3_motif_counts_1.csv", a_break, "num_motifs_alphafold3")
-
     # Update totals in mapping CSV
     with mapping_csv.open("r", newline="", encoding="utf-8") as f:
         reader = csv.DictReader(f)
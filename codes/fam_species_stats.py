@@ -1,64 +1,53 @@
 
+import argparse
+import numpy as np
 import pandas as pd
-import re
-from collections import defaultdict
-from ete3 import NCBITaxa
 
-ncbi = NCBITaxa()
+from seed_store import open_store
+from taxonomy_cache import DEFAULT_CACHE, TaxonomyCache
 
 def load_covered_fams(excel_path):
     df = pd.read_excel(excel_path, usecols=["Rfam ID"])
     rfam_ids = set(df["Rfam ID"].dropna().astype(str).str.strip())
     return rfam_ids
 
-def resolve_species_names(tax_ids):
+def resolve_species_names(tax_ids, cache_path=DEFAULT_CACHE):
+    # The compact cache answers most IDs; the ete3 DB is only opened for IDs it does not have
     numeric_ids = [int(tid.strip("_")) for tid in tax_ids]
-    translator = ncbi.get_taxid_translator(numeric_ids)
+    translator = TaxonomyCache(cache_path).translate(numeric_ids)
     return {f"_{tid}": name for tid, name in translator.items()}
 
-def extract_species_stats(seed_path, excel_path, output_file="rfam_species_stats.txt"):
+def extract_species_stats(seed_path, excel_path, output_file="rfam_species_stats.txt", workers=1,
+                          taxonomy_cache=DEFAULT_CACHE):
     covered_fams = load_covered_fams(excel_path)
-    family_stats = {}
-    current_family = None
-    skip_family = False
-    all_tax_ids = set()
-
-    with open(seed_path, "r", encoding="utf-8", errors="ignore") as f:
-        for line in f:
-            line = line.strip()
+    # workers only matters when the columnar store has to be (re)built
+    store = open_store(seed_path, workers=workers)
 
-            if line.startswith("#=GF AC"):
-                fam_ac = line.split()[2]
-                current_family = fam_ac
-                skip_family = fam_ac in covered_fams
-                continue
+    # Rows of uncovered families that carry a tax ID, grouped by (family, tax ID)
+    rows = np.flatnonzero(store.family_mask(covered_fams) & (store.tax_id >= 0))
+    fam_idx = store.family[rows].astype(np.int64)
+    tax = store.tax_id[rows]
+    keys, first_seen, counts = np.unique((fam_idx << 32) | tax, return_index=True, return_counts=True)
+    key_fam = keys >> 32
+    key_tax = keys & 0xFFFFFFFF
 
-            if skip_family or not current_family:
-                continue
+    # Per family: species by count (descending), ties in order of first appearance
+    order = np.lexsort((first_seen, -counts, key_fam))
+    totals = np.bincount(fam_idx, minlength=len(store.families))
+    humans = np.bincount(fam_idx[tax == 9606], minlength=len(store.families))
 
-            if not line.startswith("#") and line:
-                parts = line.split()
-                if len(parts) == 2:
-                    seq_id, seq = parts
-                    tax_match = re.search(r"_(\d+)", seq_id)
-                    if tax_match:
-                        tax_id = f"_{tax_match.group(1)}"
-                        all_tax_ids.add(tax_id)
-                        fam_data = family_stats.setdefault(current_family, {
-                            "total": 0,
-                            "human": 0,
-                            "species": defaultdict(int)
-                        })
-                        fam_data["total"] += 1
-                        if tax_id == "_9606":
-                            fam_data["human"] += 1
-                        fam_data["species"][tax_id] += 1
-
-            elif line.startswith("//"):
-                current_family = None
-                skip_family = False
+    family_stats = {}
+    for k in order:
+        fam = str(store.families[key_fam[k]])
+        stats = family_stats.setdefault(fam, {
+            "total": int(totals[key_fam[k]]),
+            "human": int(humans[key_fam[k]]),
+            "species": []
+        })
+        stats["species"].append((f"_{key_tax[k]}", int(counts[k])))
 
-    species_names = resolve_species_names(all_tax_ids)
+    all_tax_ids = {f"_{t}" for t in np.unique(tax)}
+    species_names = resolve_species_names(all_tax_ids, taxonomy_cache)
 
     with open(output_file, "w", encoding="utf-8") as out:
         for fam, stats in family_stats.items():
@@ -67,12 +56,9 @@ def extract_species_stats(seed_path, excel_path, output_file="rfam_species_stats
             human_label = species_names.get("_9606", "Homo sapiens")
             out.write(f"  Human sequences ({human_label}, _9606): {stats['human']}\n")
             out.write(f"  Other species (sorted by count):\n")
-            sorted_species = sorted(
-                [(tax_id, count) for tax_id, count in stats["species"].items() if tax_id != "_9606"],
-                key=lambda x: x[1],
-                reverse=True
-            )
-            for tax_id, count in sorted_species:
+            for tax_id, count in stats["species"]:
+                if tax_id == "_9606":
+                    continue
                 species_name = species_names.get(tax_id, "Unknown species")
                 out.write(f"    {species_name} ({tax_id}): {count}\n")
             out.write("\n")
@@ -80,7 +66,13 @@ def extract_species_stats(seed_path, excel_path, output_file="rfam_species_stats
     print(f" Species breakdown written for {len(family_stats)} families. Saved to {output_file}")
 
 if __name__ == "__main__":
-    seed_file = r"C:\Users\gundl\Downloads\Rfam.seed\Rfam.seed"
-    excel_file = r"C:\Users\gundl\Downloads\Rfam\Rfam_Final_combined_3d_List.xlsx"
-    extract_species_stats(seed_file, excel_file, "rfam_species_stats.txt")
+    ap = argparse.ArgumentParser(description="Per-family species breakdown for Rfam families not covered in Excel")
+    ap.add_argument("--seed-file",  default=r"C:\Users\gundl\Downloads\Rfam.seed\Rfam.seed")
+    ap.add_argument("--excel-file", default=r"C:\Users\gundl\Downloads\Rfam\Rfam_Final_combined_3d_List.xlsx")
+    ap.add_argument("--out",        default="rfam_species_stats.txt")
+    ap.add_argument("--workers", type=int, default=1, help="Worker processes used if the seed store needs building")
+    ap.add_argument("--taxonomy-cache", default=str(DEFAULT_CACHE), help="taxid -> name cache TSV (see taxonomy_cache.py)")
+    args = ap.parse_args()
+    extract_species_stats(args.seed_file, args.excel_file, args.out, workers=args.workers,
+                          taxonomy_cache=args.taxonomy_cache)
 
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Random access to FASTA records by name through a .fai-style offset index.
+
+The index is a tab-separated sidecar next to the FASTA (<fasta>.fxi) with one
+line per record:
+
+  NAME  LENGTH  OFFSET  LINEBASES  LINEWIDTH  END
+
+The first five columns are those of a samtools .fai (LINEBASES/LINEWIDTH are
+taken from the first sequence line); END is the byte offset where the record
+stops, so records with ragged line lengths are supported too. NAME is the first
+header token. When a name occurs more than once the first record wins, as with
+a linear scan. The first line of the sidecar holds the FASTA size and mtime; the
+index is rebuilt whenever they no longer match (or kept in memory only when the
+directory is not writable).
+
+Lookups read the record straight from a memory map of the FASTA: one dict
+lookup plus one slice, whatever the size of the file.
+
+Usage:
+  python fasta_index.py human_seqs_non3d_rfams.fa [NAME ...]
+"""
+
+import mmap
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+INDEX_SUFFIX = ".fxi"
+
+
+class FastaEntry(NamedTuple):
+    name: str
+    length: int
+    offset: int
+    linebases: int
+    linewidth: int
+    end: int
+
+
+def index_path_for(fasta_path: Path) -> Path:
+    return Path(str(fasta_path) + INDEX_SUFFIX)
+
+
+def _stamp(fasta_path: Path) -> str:
+    st = os.stat(fasta_path)
+    return f"#{st.st_size}\t{st.st_mtime_ns}"
+
+
+def scan_fasta(fasta_path: Path) -> Iterator[FastaEntry]:
+    """Index entries of every record, from one binary pass over the file."""
+    name = None
+    length = offset = linebases = linewidth = 0
+    pos = 0
+    with open(fasta_path, "rb") as f:
+        for line in f:
+            if line.startswith(b">"):
+                if name is not None:
+                    yield FastaEntry(name, length, offset, linebases, linewidth, pos)
+                tokens = line[1:].split()
+                name = tokens[0].decode("utf-8", errors="ignore") if tokens else None
+                length = linebases = linewidth = 0
+                offset = pos + len(line)
+            elif name is not None:
+                bases = len(line.strip())
+                if linewidth == 0 and bases:
+                    linebases, linewidth = bases, len(line)
+                length += bases
+            pos += len(line)
+    if name is not None:
+        yield FastaEntry(name, length, offset, linebases, linewidth, pos)
+
+
+def write_index(entries: List[FastaEntry], index_path: Path, stamp: str) -> None:
+    tmp = index_path.with_name(index_path.name + f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(stamp + "\n")
+        for e in entries:
+            f.write("\t".join(str(v) for v in e) + "\n")
+    os.replace(tmp, index_path)
+
+
+def read_index(index_path: Path, stamp: str) -> Optional[List[FastaEntry]]:
+    """Entries of an index file, or None if it is missing or belongs to another version of the FASTA."""
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            if f.readline().rstrip("\n") != stamp:
+                return None
+            entries = []
+            for line in f:
+                name, *nums = line.rstrip("\n").split("\t")
+                entries.append(FastaEntry(name, *(int(v) for v in nums)))
+            return entries
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+class FastaIndex:
+    """Records of one FASTA file by first header token, read through a memory map."""
+
+    def __init__(self, fasta_path: Path, index_path: Optional[Path] = None):
+        self.path = Path(fasta_path)
+        self.index_path = Path(index_path) if index_path else index_path_for(self.path)
+        stamp = _stamp(self.path)
+        entries = read_index(self.index_path, stamp)
+        self.rebuilt = entries is None
+        if entries is None:
+            entries = list(scan_fasta(self.path))
+            try:
+                write_index(entries, self.index_path, stamp)
+            except OSError:
+                pass  # read-only location: the index stays in memory
+        self._entries: Dict[str, FastaEntry] = {}
+        for e in entries:
+            self._entries.setdefault(e.name, e)
+        self._file = open(self.path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def names(self) -> List[str]:
+        return list(self._entries)
+
+    def entry(self, name: str) -> Optional[FastaEntry]:
+        return self._entries.get(name)
+
+    def lengths(self) -> Dict[str, int]:
+        return {name: e.length for name, e in self._entries.items()}
+
+    def lines(self, name: str) -> Optional[List[str]]:
+        """Sequence lines of the record, as a text-mode read would give them (None if absent)."""
+        e = self._entries.get(name)
+        if e is None:
+            return None
+        text = self._mm[e.offset:e.end].decode("utf-8", errors="ignore")
+        lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        if lines and lines[-1] == "":
+            lines.pop()
+        return lines
+
+    def sequence(self, name: str) -> Optional[str]:
+        lines = self.lines(name)
+        return None if lines is None else "".join(l.strip() for l in lines)
+
+
+# One open index per FASTA path: (stamp it was opened at, index)
+_OPEN: Dict[str, Tuple[str, FastaIndex]] = {}
+_OPEN_LOCK = threading.Lock()
+
+
+def open_fasta(fasta_path: Path) -> FastaIndex:
+    """
+    Shared FastaIndex of a file for this process. When the file changes it is
+    reopened and the previous index (file handle and memory map) is closed, so
+    long-running callers keep one open index per file.
+    """
+    path = Path(fasta_path).resolve()
+    stamp = _stamp(path)
+    with _OPEN_LOCK:
+        cached = _OPEN.get(str(path))
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        idx = FastaIndex(path)
+        _OPEN[str(path)] = (stamp, idx)
+    if cached is not None:
+        cached[1].close()
+    return idx
+
+
+def main():
+    if len(sys.argv) < 2:
+        raise SystemExit("usage: python fasta_index.py FASTA [NAME ...]")
+    idx = FastaIndex(Path(sys.argv[1]))
+    state = "built" if idx.rebuilt else "up to date"
+    print(f"[OK] {idx.index_path}: {len(idx)} records ({state})")
+    for name in sys.argv[2:]:
+        seq = idx.sequence(name)
+        print(f">{name}\n{seq}" if seq is not None else f"[WARN] {name}: not in {idx.path}")
+
+
+if __name__ == "__main__":
+    main()
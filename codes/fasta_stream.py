@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Streaming FASTA conversion: readers are generators and writers keep at most one
+output file open, so memory does not grow with the number of records (apart
+from the set of headers already used, which header de-duplication needs).
+
+Readers
+  iter_family_text(path)   the "Family: RFxxxxx" text format (sequence lines
+                           "URS..._9606/9-93  ACGU-..." under each family line),
+                           as (family, fields of the line)
+  rnacentral_records(path) records of that format with seqs_to_multifasta.py
+                           headers: sanitize_id(URS id) + "_" + family, made
+                           unique with _bump_suffix, gaps removed
+  pipe_records(path)       records with seq_to_fasta2.py headers: "URS id|family"
+  iter_fasta(path)         plain multi-FASTA, header line and sequence lines as is
+
+Writers
+  write_fasta(records, path)             one multi-FASTA (optional line wrapping)
+  write_per_record(records, outdir)      one <safe header>.fasta per record
+  write_batches(records, outdir, size)   batch_00000.fasta, ... of `size` records
+
+Usage:
+  python fasta_stream.py family-to-fasta human_seqs_non3d_rfams.txt human_seqs_non3d_rfams.fa [--headers pipe] [--wrap 80]
+  python fasta_stream.py split human_sequences.fasta split_fa [--batch-size 500]
+"""
+
+import argparse
+import re
+from pathlib import Path
+from textwrap import wrap
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# (header without ">", sequence lines without newlines)
+Record = Tuple[str, List[str]]
+
+BUFFER_SIZE = 1 << 20
+
+_FAMILY = re.compile(r"Family:\s*(\S+)")
+
+
+def sanitize_id(s: str) -> str:
+    """Replace any non [A-Za-z0-9_.-] with underscore."""
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", s)
+
+
+def _bump_suffix(base: str, taken: set) -> str:
+    i = 1
+    while True:
+        cand = f"{base}_{i}"
+        if cand not in taken:
+            return cand
+        i += 1
+
+
+def safe_filename(header: str) -> str:
+    """File name stem for a header: '/' and '|' replaced (the split_fa/ naming RhoFold+ runs use)."""
+    return re.sub(r"[\/|]", "_", header.strip())
+
+
+def iter_family_text(path: Path) -> Iterator[Tuple[Optional[str], List[str]]]:
+    """(current family or None, whitespace-split fields) for every non-empty, non-family line."""
+    family = None
+    with open(path, "r", buffering=BUFFER_SIZE) as fin:
+        for raw_line in fin:
+            line = raw_line.strip()
+            if not line:
+                continue
+            # Family line, e.g., "Family: RF00246"
+            if line.startswith("Family:"):
+                m = _FAMILY.match(line)
+                if m:
+                    family = m.group(1).rstrip(",")
+                continue
+            yield family, line.split()
+
+
+def rnacentral_records(path: Path) -> Iterator[Record]:
+    """Records named like the PDB basenames: URS00000A7BEB_9606/9-93 in RF00246 -> URS00000A7BEB_9606_9-93_RF00246."""
+    taken = set()  # headers already used (to avoid accidental duplicates)
+    for family, parts in iter_family_text(path):
+        if not parts[0].startswith("URS") or len(parts) < 2:
+            continue
+        core = sanitize_id(parts[0])  # converts "/" -> "_", spaces -> "_", etc.
+        header_id = f"{core}_{family}" if family else core
+        if header_id in taken:
+            header_id = _bump_suffix(header_id, taken)
+        taken.add(header_id)
+        yield header_id, [parts[1].replace("-", "")]  # remove gaps
+
+
+def pipe_records(path: Path) -> Iterator[Record]:
+    """Records headed "seq_id|family" (the RhoFold+ input naming); lines outside a family are skipped."""
+    for family, parts in iter_family_text(path):
+        if len(parts) == 2 and family:
+            seq_id, seq = parts
+            yield f"{seq_id}|{family}", [seq.replace("-", "")]
+
+
+def iter_fasta(path: Path) -> Iterator[Record]:
+    """Records of a multi-FASTA with the header and sequence lines exactly as in the file."""
+    header = None
+    lines: List[str] = []
+    with open(path, "r", buffering=BUFFER_SIZE) as fin:
+        for line in fin:
+            if line.startswith(">"):
+                if header is not None:
+                    yield header, lines
+                header, lines = line[1:].rstrip("\n"), []
+            elif header is not None:
+                lines.append(line.rstrip("\n"))
+    if header is not None:
+        yield header, lines
+
+
+def _write_record(fout, header: str, lines: List[str], wrap_len: Optional[int]) -> None:
+    fout.write(f">{header}\n")
+    if wrap_len:
+        lines = wrap("".join(l.strip() for l in lines), wrap_len)
+    for line in lines:
+        fout.write(line + "\n")
+
+
+def write_fasta(records: Iterable[Record], out_path: Path, wrap_len: Optional[int] = None) -> int:
+    """Write records to one multi-FASTA; returns the number written."""
+    n = 0
+    with open(out_path, "w", buffering=BUFFER_SIZE) as fout:
+        for header, lines in records:
+            _write_record(fout, header, lines, wrap_len)
+            n += 1
+    return n
+
+
+def write_per_record(records: Iterable[Record], outdir: Path, suffix: str = ".fasta",
+                     wrap_len: Optional[int] = None) -> int:
+    """One file per record, named safe_filename(header) + suffix (later duplicates overwrite)."""
+    outdir = Path(outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    n = 0
+    for header, lines in records:
+        with open(outdir / f"{safe_filename(header)}{suffix}", "w") as fout:
+            _write_record(fout, header, lines, wrap_len)
+        n += 1
+    return n
+
+
+def write_batches(records: Iterable[Record], outdir: Path, batch_size: int, prefix: str = "batch_",
+                  suffix: str = ".fasta", wrap_len: Optional[int] = None) -> int:
+    """Consecutive runs of batch_size records per file (prefix00000.fasta, ...); returns the number of records."""
+    if batch_size < 1:
+        raise ValueError("batch_size must be >= 1")
+    outdir = Path(outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    n = 0
+    fout = None
+    try:
+        for header, lines in records:
+            if n % batch_size == 0:
+                if fout is not None:
+                    fout.close()
+                fout = open(outdir / f"{prefix}{n // batch_size:05d}{suffix}", "w", buffering=BUFFER_SIZE)
+            _write_record(fout, header, lines, wrap_len)
+            n += 1
+    finally:
+        if fout is not None:
+            fout.close()
+    return n
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Streaming FASTA conversion and splitting")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    conv = sub.add_parser("family-to-fasta", help="'Family:' text format -> multi-FASTA")
+    conv.add_argument("infile")
+    conv.add_argument("outfile")
+    conv.add_argument("--headers", choices=["rnacentral", "pipe"], default="rnacentral",
+                      help="rnacentral: URS..._9606_9-93_RF00246 (seqs_to_multifasta.py); pipe: URS.../9-93|RF00246")
+    conv.add_argument("--wrap", type=int, default=None, help="FASTA line length (default: one line)")
+
+    split = sub.add_parser("split", help="multi-FASTA -> one file per record or per batch")
+    split.add_argument("infile")
+    split.add_argument("outdir")
+    split.add_argument("--batch-size", type=int, default=0, help="Records per file (default: one file per record)")
+    args = ap.parse_args()
+
+    if args.cmd == "family-to-fasta":
+        reader = rnacentral_records if args.headers == "rnacentral" else pipe_records
+        n = write_fasta(reader(Path(args.infile)), Path(args.outfile), wrap_len=args.wrap)
+        print(f"MultiFASTA written to {args.outfile} ({n} records)")
+    else:
+        records = iter_fasta(Path(args.infile))
+        if args.batch_size > 0:
+            n = write_batches(records, Path(args.outdir), args.batch_size)
+        else:
+            n = write_per_record(records, Path(args.outdir))
+        print(f"{n} records written under {args.outdir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,24 @@
 
+import argparse
+
 import pandas as pd
-import re
+
+from seed_reader import human_rows, map_families
 
 def load_covered_fams(excel_path):
     df = pd.read_excel(excel_path, usecols=["Rfam ID"])
     rfam_ids = set(df["Rfam ID"].dropna().astype(str).str.strip())
     return rfam_ids
 
-def extract_human_sequences(file_path, excel_path, output_file="human_remaining.txt"):
+def extract_human_sequences(file_path, excel_path, output_file="human_remaining.txt", workers=1):
     covered_fams = load_covered_fams(excel_path)
     human_seqs = {}
-    current_family = None
-    skip_family = False
-
-    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-        for line in f:
-            line = line.strip()
-
-            # Detect family accession
-            if line.startswith("#=GF AC"):
-                fam_ac = line.split()[2]
-                current_family = fam_ac
-                skip_family = fam_ac in covered_fams
-                continue
-
-            if skip_family or not current_family:
-                continue
-
-            # Sequence lines
-            if not line.startswith("#") and line:
-                parts = line.split()
-                if len(parts) == 2:
-                    seq_id, seq = parts
-                    if "_9606" in seq_id:
-                        human_seqs.setdefault(current_family, []).append((seq_id, seq))
-
-            # End of family
-            elif line.startswith("//"):
-                current_family = None
-                skip_family = False
+
+    # Covered families are skipped via the seed index without being read;
+    # with workers > 1 families are filtered in parallel and merged in file order
+    for fam, seqs in map_families(file_path, human_rows, workers=workers, exclude=covered_fams):
+        if seqs:
+            human_seqs[fam] = seqs
 
     # Save results
     with open(output_file, "w", encoding="utf-8") as out:
@@ -53,9 +33,13 @@ def extract_human_sequences(file_path, excel_path, output_file="human_remaining.
 
 
 if __name__ == "__main__":
-    seed_file = r"C:\Users\gundl\Downloads\Rfam.seed\Rfam.seed"
-    excel_file = r"C:\Users\gundl\Downloads\Rfam\Rfam_Final_combined_3d_List.xlsx"
-    extract_human_sequences(seed_file, excel_file, "human_remaining_final.txt")
+    ap = argparse.ArgumentParser(description="Extract human sequences from Rfam families not covered in Excel")
+    ap.add_argument("--seed-file",  default=r"C:\Users\gundl\Downloads\Rfam.seed\Rfam.seed")
+    ap.add_argument("--excel-file", default=r"C:\Users\gundl\Downloads\Rfam\Rfam_Final_combined_3d_List.xlsx")
+    ap.add_argument("--out",        default="human_remaining_final.txt")
+    ap.add_argument("--workers", type=int, default=1, help="Worker processes for per-family parsing (1 = serial)")
+    args = ap.parse_args()
+    extract_human_sequences(args.seed_file, args.excel_file, args.out, workers=args.workers)
     
 # Extracted 770 human sequences from 535 families (excluding those listed in Excel). Saved to human_remaining_final.txt
 
@@ -1,81 +1,77 @@
 
+import argparse
+
+import numpy as np
 import pandas as pd
-import re
+
+from seed_reader import HUMAN_TAG
+from seed_store import open_store
+from seq_stats import alignment_stats
 
 def load_covered_fams(excel_path):
     df = pd.read_excel(excel_path, usecols=["Rfam ID"])
     rfam_ids = set(df["Rfam ID"].dropna().astype(str).str.strip())
     return rfam_ids
 
-def gc_content(seq):
-    ungapped = seq.replace("-", "")
-    gc = ungapped.count("G") + ungapped.count("C")
-    return round(100 * gc / len(ungapped), 2) if ungapped else 0
+def gc_percent(gc_count, ungapped_len):
+    """GC content (%) of the ungapped sequence, rounded to 2 decimals."""
+    return round(100 * int(gc_count) / int(ungapped_len), 2) if ungapped_len else 0
 
-def extract_human_sequences(file_path, excel_path, output_file="human_remaining_final.txt"):
+def extract_human_sequences(file_path, excel_path, output_file="human_remaining_final.txt", workers=1):
     covered_fams = load_covered_fams(excel_path)
-    human_seqs = {}
-    current_family = None
-    skip_family = False
-
-    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-        for line in f:
-            line = line.strip()
-
-            # Detect family accession
-            if line.startswith("#=GF AC"):
-                fam_ac = line.split()[2]
-                current_family = fam_ac
-                skip_family = fam_ac in covered_fams
-                continue
+    # workers only matters when the columnar store has to be (re)built
+    store = open_store(file_path, workers=workers)
 
-            if skip_family or not current_family:
-                continue
+    # Human rows of uncovered families; rows are stored in file order, so each family is one contiguous run
+    rows = np.flatnonzero(store.family_mask(covered_fams) & store.seq_id_contains(HUMAN_TAG))
+    raw_lengths = store.raw_lengths()[rows]
 
-            # Sequence lines
-            if not line.startswith("#") and line:
-                parts = line.split()
-                if len(parts) == 2:
-                    seq_id, seq = parts
-                    if "_9606" in seq_id:
-                        human_seqs.setdefault(current_family, []).append((seq_id, seq))
+    # All human rows are encoded once and measured in a single vectorized call ('-' is the only gap,
+    # and padding added for shorter rows is '-', so it does not change the ungapped/GC counts).
+    # GC is upper-case G/C only, as this script has always counted it.
+    stats = alignment_stats(store.rows_matrix(rows), gap_chars=b"-", case_sensitive=True)
+    ungapped_lengths = stats["ungapped_len"]
+    gc_values = [gc_percent(g, u) for g, u in zip(stats["gc_count"], ungapped_lengths)]
 
-            # End of family
-            elif line.startswith("//"):
-                current_family = None
-                skip_family = False
+    fam_ids, starts, sizes = np.unique(store.family[rows], return_index=True, return_counts=True)
+    if len(rows):
+        raw_sums = np.add.reduceat(raw_lengths, starts)
+        ungapped_sums = np.add.reduceat(ungapped_lengths, starts)
+        ungapped_min = np.minimum.reduceat(ungapped_lengths, starts)
+        ungapped_max = np.maximum.reduceat(ungapped_lengths, starts)
 
     # Save results with stats
     with open(output_file, "w", encoding="utf-8") as out:
-        for fam, seqs in human_seqs.items():
-            raw_lengths = [len(seq) for _, seq in seqs]
-            ungapped_lengths = [len(seq.replace("-", "")) for _, seq in seqs]
-            gc_values = [gc_content(seq) for _, seq in seqs]
+        for k, fam_id in enumerate(fam_ids):
+            lo, n = starts[k], sizes[k]
+            fam_gc = gc_values[lo:lo + n]
 
-            out.write(f"Family: {fam}\n")
-            out.write(f"Human sequences: {len(seqs)}\n")
-            out.write(f"  Avg length (with gaps): {sum(raw_lengths) // len(raw_lengths)} bp\n")
-            out.write(f"  Avg length (no gaps): {sum(ungapped_lengths) // len(ungapped_lengths)} bp\n")
-            out.write(f"  Min ungapped length: {min(ungapped_lengths)} bp\n")
-            out.write(f"  Max ungapped length: {max(ungapped_lengths)} bp\n")
-            out.write(f"  Avg GC content: {round(sum(gc_values) / len(gc_values), 2)}%\n\n")
+            out.write(f"Family: {store.families[fam_id]}\n")
+            out.write(f"Human sequences: {n}\n")
+            out.write(f"  Avg length (with gaps): {raw_sums[k] // n} bp\n")
+            out.write(f"  Avg length (no gaps): {ungapped_sums[k] // n} bp\n")
+            out.write(f"  Min ungapped length: {ungapped_min[k]} bp\n")
+            out.write(f"  Max ungapped length: {ungapped_max[k]} bp\n")
+            out.write(f"  Avg GC content: {round(sum(fam_gc) / len(fam_gc), 2)}%\n\n")
 
-            for seq_id, seq in seqs:
-                raw_len = len(seq)
-                ungapped_len = len(seq.replace("-", ""))
-                gc = gc_content(seq)
-                out.write(f"  {seq_id}\n")
-                out.write(f"    Length (with gaps): {raw_len} bp\n")
-                out.write(f"    Length (no gaps): {ungapped_len} bp\n")
-                out.write(f"    GC content: {gc}%\n")
-                out.write(f"    Sequence: {seq}\n\n")
+            for i in range(lo, lo + n):
+                row = rows[i]
+                out.write(f"  {store.seq_id_str(row)}\n")
+                out.write(f"    Length (with gaps): {raw_lengths[i]} bp\n")
+                out.write(f"    Length (no gaps): {ungapped_lengths[i]} bp\n")
+                out.write(f"    GC content: {gc_values[i]}%\n")
+                out.write(f"    Sequence: {store.sequence(row)}\n\n")
 
             out.write("-" * 50 + "\n")
 
-    print(f"✅ Extracted {sum(len(seqs) for seqs in human_seqs.values())} human sequences "
-          f"from {len(human_seqs)} families (excluding those listed in Excel). Saved to {output_file}")
+    print(f"✅ Extracted {len(rows)} human sequences "
+          f"from {len(fam_ids)} families (excluding those listed in Excel). Saved to {output_file}")
 
 if __name__ == "__main__":
-    seed_file = r"C:\Users\gundl\Downloads\Rfam.seed\Rfam.seed"
-    excel_file = r"C:\Users\gundl\Downloads\Rfam\Rfam_Final_combined_3d_List.xlsx"
-    extract_human_sequences(seed_file, excel_file, "human_remaining_with_stat_info.txt")
+    ap = argparse.ArgumentParser(description="Extract human sequences with length/GC stats from uncovered Rfam families")
+    ap.add_argument("--seed-file",  default=r"C:\Users\gundl\Downloads\Rfam.seed\Rfam.seed")
+    ap.add_argument("--excel-file", default=r"C:\Users\gundl\Downloads\Rfam\Rfam_Final_combined_3d_List.xlsx")
+    ap.add_argument("--out",        default="human_remaining_with_stat_info.txt")
+    ap.add_argument("--workers", type=int, default=1, help="Worker processes used if the seed store needs building")
+    args = ap.parse_args()
+    extract_human_sequences(args.seed_file, args.excel_file, args.out, workers=args.workers)
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Discovery of predicted 3D models from the three predictors, as PDB text.
+
+A tool -> input layout config (JSON) says where each tool's models live and
+where its motif-scan results go, e.g.
+
+  {
+    "farfar2":    {"root": ".../predictions/farfar2/str",            "out_root": ".../farfar_pdb"},
+    "rhofold":    {"root": ".../predictions/rhofold+/str/my_outputs", "out_root": ".../rhofold_pdb"},
+    "alphafold3": {"root": ".../predictions/alphafold3/str",          "out_root": ".../alphafold_pdb"}
+  }
+
+Known tool names get their layout from DEFAULT_LAYOUTS; any key there can be
+overridden per tool:
+
+  layout   "glob"     files matching `pattern` under root; the structure name is
+                      the file stem ("name_from": "stem") or its parent directory
+                      ("name_from": "parent", RhoFold+'s my_outputs/<URS>/ layout)
+           "af3_zip"  AlphaFold Server archives (*.zip). The mmCIF of model
+                      `model` (0 = top ranked) is read straight from the archive
+                      and converted to PDB in memory. The job name is a date, so
+                      the URS is found by matching the job's RNA sequence
+                      against the FASTA.
+
+Every model is returned as a StructureInput whose read_pdb() gives PDB bytes,
+whatever the on-disk format.
+"""
+
+import json
+import re
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_LAYOUTS: Dict[str, dict] = {
+    "farfar2": {"layout": "glob", "pattern": "**/*.pdb", "name_from": "stem"},
+    "rhofold": {"layout": "glob", "pattern": "*/relaxed_1000_model.pdb", "name_from": "parent"},
+    "alphafold3": {"layout": "af3_zip", "pattern": "*.zip", "model": 0},
+}
+
+_CIF_TOKEN = re.compile(r"""'(.*?)'(?=\s|$)|"(.*?)"(?=\s|$)|(\S+)""")
+
+
+class StructureInput:
+    """One predicted model: its tool, structure name (URS), where it comes from and where results go."""
+
+    def __init__(self, tool: str, name: str, path: Path, out_root: Path,
+                 member: Optional[str] = None, fmt: str = "pdb"):
+        self.tool = tool
+        self.name = name
+        self.path = Path(path)
+        self.out_root = Path(out_root)
+        self.member = member
+        self.fmt = fmt
+
+    @property
+    def key(self) -> str:
+        return f"{self.tool}/{self.name}"
+
+    @property
+    def source(self) -> str:
+        return f"{self.path}:{self.member}" if self.member else str(self.path)
+
+    def read_pdb(self) -> bytes:
+        if self.member is None:
+            data = self.path.read_bytes()
+        else:
+            with zipfile.ZipFile(self.path) as zf:
+                data = zf.read(self.member)
+        return cif_to_pdb(data) if self.fmt == "cif" else data
+
+
+def read_fasta_sequences(fasta_path: Path) -> Dict[str, str]:
+    """{first header token: sequence} for every record."""
+    seqs: Dict[str, List[str]] = {}
+    name = None
+    with open(fasta_path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            if line.startswith(">"):
+                tokens = line[1:].split()
+                name = tokens[0] if tokens else None
+                if name is not None:
+                    seqs.setdefault(name, [])
+            elif name is not None:
+                seqs[name].append(line.strip())
+    return {k: "".join(v) for k, v in seqs.items()}
+
+
+def normalize_rna(seq: str) -> str:
+    return seq.strip().upper().replace("T", "U")
+
+
+def _cif_tokens(line: str) -> List[str]:
+    return [next(g for g in m.groups() if g is not None) for m in _CIF_TOKEN.finditer(line)]
+
+
+def read_atom_site(cif_text: str) -> Tuple[List[str], List[List[str]]]:
+    """Column names and rows of the _atom_site loop of an mmCIF file."""
+    columns: List[str] = []
+    rows: List[List[str]] = []
+    lines = iter(cif_text.splitlines())
+    for line in lines:
+        if line.strip() != "loop_":
+            continue
+        header = []
+        for line in lines:
+            s = line.strip()
+            if s.startswith("_"):
+                header.append(s)
+            else:
+                break
+        if not header or not header[0].startswith("_atom_site."):
+            continue
+        columns = [h.split(".", 1)[1] for h in header]
+        while True:
+            s = line.strip()
+            if not s or s == "#" or s.startswith("_") or s == "loop_":
+                break
+            rows.append(_cif_tokens(s))
+            line = next(lines, "")
+        break
+    return columns, rows
+
+
+def _pdb_atom_name(name: str, element: str) -> str:
+    # PDB convention: one-letter elements start in column 14 unless the name fills all 4 columns
+    if len(name) < 4 and len(element) == 1:
+        return f" {name:<3}"
+    return f"{name:<4}"
+
+
+def cif_to_pdb(cif_bytes: bytes) -> bytes:
+    """Fixed-column PDB text for the first model of an mmCIF file (author numbering and chains)."""
+    columns, rows = read_atom_site(cif_bytes.decode("utf-8", errors="ignore"))
+    if not rows:
+        raise ValueError("no _atom_site records in mmCIF")
+    col = {c: i for i, c in enumerate(columns)}
+
+    def get(row, *names, default="?"):
+        for n in names:
+            if n in col and row[col[n]] not in (".", "?"):
+                return row[col[n]]
+        return default
+
+    out = []
+    first_model = get(rows[0], "pdbx_PDB_model_num", default="1")
+    prev_chain = None
+    serial = 0
+    for row in rows:
+        if get(row, "pdbx_PDB_model_num", default="1") != first_model:
+            break
+        chain = get(row, "auth_asym_id", "label_asym_id", default="A")[:1]
+        if prev_chain is not None and chain != prev_chain:
+            out.append("TER\n")
+        prev_chain = chain
+        serial += 1
+        element = get(row, "type_symbol", default="")
+        name = get(row, "auth_atom_id", "label_atom_id")
+        alt = get(row, "label_alt_id", default=" ")[:1]
+        resname = get(row, "auth_comp_id", "label_comp_id")
+        resseq = int(get(row, "auth_seq_id", "label_seq_id", default="0"))
+        icode = get(row, "pdbx_PDB_ins_code", default=" ")[:1]
+        x, y, z = (float(get(row, f"Cartn_{a}")) for a in "xyz")
+        occ = float(get(row, "occupancy", default="1.0"))
+        bfac = float(get(row, "B_iso_or_equiv", default="0.0"))
+        record = get(row, "group_PDB", default="ATOM")
+        out.append(f"{record:<6}{serial % 100000:>5} {_pdb_atom_name(name, element)}{alt}{resname:>3} {chain}"
+                   f"{resseq:>4}{icode}   {x:>8.3f}{y:>8.3f}{z:>8.3f}{occ:>6.2f}{bfac:>6.2f}"
+                   f"          {element:>2}  \n")
+    out.append("TER\nEND\n")
+    return "".join(out).encode("ascii")
+
+
+def af3_job_sequence(zf: zipfile.ZipFile) -> Optional[str]:
+    """RNA sequence of the (single-chain) AlphaFold Server job stored in the archive."""
+    for member in zf.namelist():
+        if member.endswith("_job_request.json"):
+            jobs = json.loads(zf.read(member))
+            for job in jobs if isinstance(jobs, list) else [jobs]:
+                for entry in job.get("sequences", []):
+                    rna = entry.get("rnaSequence")
+                    if rna and rna.get("sequence"):
+                        return rna["sequence"]
+    return None
+
+
+def _af3_model_member(zf: zipfile.ZipFile, model: int) -> Optional[str]:
+    suffix = f"_model_{model}.cif"
+    return next((m for m in zf.namelist() if m.endswith(suffix)), None)
+
+
+def iter_glob(tool: str, cfg: dict) -> Iterator[StructureInput]:
+    root = Path(cfg["root"])
+    for path in sorted(root.glob(cfg["pattern"])):
+        if not path.is_file():
+            continue
+        name = path.parent.name if cfg.get("name_from") == "parent" else path.stem
+        yield StructureInput(tool, name, path, Path(cfg["out_root"]))
+
+
+def iter_af3_zips(tool: str, cfg: dict, seq_to_name: Dict[str, List[str]]) -> Iterator[StructureInput]:
+    root = Path(cfg["root"])
+    model = int(cfg.get("model", 0))
+    for path in sorted(root.glob(cfg["pattern"])):
+        with zipfile.ZipFile(path) as zf:
+            seq = af3_job_sequence(zf)
+            member = _af3_model_member(zf, model)
+        if member is None or seq is None:
+            print(f"[WARN] {path.name}: no model_{model}.cif or job sequence — skipping")
+            continue
+        names = seq_to_name.get(normalize_rna(seq), [])
+        if not names:
+            print(f"[WARN] {path.name}: job sequence not found in the FASTA — skipping")
+            continue
+        if len(names) > 1:
+            print(f"[WARN] {path.name}: sequence matches {len(names)} records, using {names[0]}")
+        yield StructureInput(tool, names[0], path, Path(cfg["out_root"]), member=member, fmt="cif")
+
+
+def load_tools_config(path: Path) -> Dict[str, dict]:
+    """Tool configs from JSON, completed with DEFAULT_LAYOUTS for known tool names."""
+    raw = json.loads(Path(path).read_text(encoding="utf-8"))
+    tools = {}
+    for tool, cfg in raw.items():
+        merged = dict(DEFAULT_LAYOUTS.get(tool, {}))
+        merged.update(cfg)
+        for key in ("layout", "root", "out_root"):
+            if key not in merged:
+                raise ValueError(f"tool '{tool}': missing '{key}' in {path}")
+        tools[tool] = merged
+    return tools
+
+
+def discover(tools: Dict[str, dict], fasta_path: Optional[Path] = None) -> List[StructureInput]:
+    """All models of all configured tools, in (tool, name) order; duplicate names keep the first."""
+    seq_to_name: Dict[str, List[str]] = {}
+    if any(cfg["layout"] == "af3_zip" for cfg in tools.values()):
+        if fasta_path is None:
+            raise ValueError("the af3_zip layout needs a FASTA to map sequences to names")
+        for name, seq in read_fasta_sequences(fasta_path).items():
+            seq_to_name.setdefault(normalize_rna(seq), []).append(name)
+
+    items: List[StructureInput] = []
+    for tool in sorted(tools):
+        cfg = tools[tool]
+        if cfg["layout"] == "glob":
+            found = iter_glob(tool, cfg)
+        elif cfg["layout"] == "af3_zip":
+            found = iter_af3_zips(tool, cfg, seq_to_name)
+        else:
+            raise ValueError(f"tool '{tool}': unknown layout '{cfg['layout']}'")
+        seen = set()
+        for item in found:
+            if item.name in seen:
+                print(f"[WARN] {tool}: duplicate structure {item.name} ({item.source}) — keeping the first")
+                continue
+            seen.add(item.name)
+            items.append(item)
+    return items
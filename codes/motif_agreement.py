@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Cross-tool motif agreement per structure (FARFAR2 vs RhoFold+ vs AlphaFold3).
+
+Works on the hit table of motif_hits.py. For every URS scanned by all tools of a
+comparison, and for every motif (plus "all", which ignores the motif label):
+
+  residue_jaccard   |residues hit by every tool| / |residues hit by any tool|
+  hit_precision     (pairs) fraction of tool A hits sharing a residue with a tool B hit
+  hit_recall        (pairs) fraction of tool B hits sharing a residue with a tool A hit
+  hit_consensus     fraction of all hits that share a residue with a hit of every other tool
+
+Comparisons are the three pairs and the three-way set. Residue sets are built
+from the hit ranges with a sorted sweep (coverage counting over start/end
+events), and hit matching uses motif_hits.overlapping_ranges (binary search over
+sorted ranges), so all structures are compared in one near-linear pass.
+Values are left empty when undefined (no residues / no hits).
+
+Writes one row per (URS, motif, comparison) to data/motif_agreement.csv (next to
+fasta_mapping_with_length_updated.csv) and prints the mean Jaccard per comparison.
+
+Usage:
+  python motif_agreement.py --hits motif_hits.npz
+  python motif_agreement.py --farfar-root .../farfar_pdb --rhofold-root .../rhofold_pdb --alphafold-root .../alphafold_pdb
+"""
+
+import argparse
+import csv
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from motif_hits import HitTable, add_root_args, build_hit_table, overlapping_ranges, roots_from_args
+
+DEFAULT_OUT = Path(__file__).resolve().parent.parent / "data" / "motif_agreement.csv"
+ALL_MOTIFS = "all"
+
+# Residues of different chains must never touch: chain code * _CHAIN_STRIDE + residue number
+_CHAIN_STRIDE = 1_000_000
+_RES_OFFSET = 500_000
+
+HEADER = ["file_name", "motif", "tools", "hits", "residues_shared", "residues_union",
+          "residue_jaccard", "hit_precision", "hit_recall", "hit_consensus"]
+
+
+def coverage_lengths(intervals: Sequence[Tuple[np.ndarray, np.ndarray]]) -> Tuple[int, int]:
+    """
+    (shared, union) residue counts of several sets of closed ranges [start, end].
+    Each set is first merged into disjoint ranges; then one sweep over the
+    start/end events of all sets counts how many sets cover each stretch.
+    """
+    events_pos, events_delta = [], []
+    for starts, ends in intervals:
+        if not len(starts):
+            continue
+        order = np.argsort(starts, kind="stable")
+        s, e = starts[order], ends[order]
+        # Merge overlapping/adjacent ranges within one set
+        run_end = np.maximum.accumulate(e)
+        new = np.ones(len(s), dtype=bool)
+        new[1:] = s[1:] > run_end[:-1] + 1
+        group = np.cumsum(new) - 1
+        m_start = s[new]
+        m_end = np.zeros(len(m_start), dtype=np.int64)
+        np.maximum.at(m_end, group, run_end)
+        events_pos.extend([m_start, m_end + 1])
+        events_delta.extend([np.ones(len(m_start), dtype=np.int64), -np.ones(len(m_start), dtype=np.int64)])
+    if not events_pos:
+        return 0, 0
+    pos = np.concatenate(events_pos)
+    delta = np.concatenate(events_delta)
+    order = np.argsort(pos, kind="stable")
+    pos, delta = pos[order], delta[order]
+    depth = np.cumsum(delta)
+    span = np.diff(pos)
+    covered = depth[:-1]
+    shared = int(span[covered == len(intervals)].sum())
+    union = int(span[covered > 0].sum())
+    return shared, union
+
+
+def _ratio(num: int, den: int) -> str:
+    return f"{num / den:.4f}" if den else ""
+
+
+class StructureHits:
+    """Residue ranges of one tool's hits on one structure (optionally one motif)."""
+
+    def __init__(self, table: HitTable, structure: str, motif: Optional[str], tool: str,
+                 chain_codes: Dict[str, int]):
+        rows = table.hit_rows(structure, motif, tool)
+        hit, chain, start, end = table.regions(rows)
+        codes = np.array([chain_codes.setdefault(c, len(chain_codes)) for c in chain.tolist()], dtype=np.int64)
+        base = codes * _CHAIN_STRIDE + _RES_OFFSET
+        self.n_hits = len(rows)
+        self.rows = rows
+        self.hit = hit
+        self.chain = chain
+        self.start = start.astype(np.int64)
+        self.end = end.astype(np.int64)
+        self.flat_start = base + self.start
+        self.flat_end = base + self.end
+
+    def matched_rows(self, other: "StructureHits") -> np.ndarray:
+        """Rows of this tool's hits that share a residue with any hit of the other tool."""
+        i, _ = overlapping_ranges(self.chain, self.start, self.end, other.chain, other.start, other.end)
+        return np.unique(self.hit[i])
+
+
+def compare(structure: str, motif: Optional[str], tools: Sequence[str], per_tool: Sequence[StructureHits]) -> List[str]:
+    shared, union = coverage_lengths([(h.flat_start, h.flat_end) for h in per_tool])
+    n_total = sum(h.n_hits for h in per_tool)
+
+    # Hits supported by every other tool
+    supported = 0
+    matched = {}
+    for a, b in combinations(range(len(tools)), 2):
+        matched[(a, b)] = per_tool[a].matched_rows(per_tool[b])
+        matched[(b, a)] = per_tool[b].matched_rows(per_tool[a])
+    for a in range(len(tools)):
+        rows = per_tool[a].rows
+        ok = np.ones(len(rows), dtype=bool)
+        for b in range(len(tools)):
+            if b != a:
+                ok &= np.isin(rows, matched[(a, b)])
+        supported += int(ok.sum())
+
+    if len(tools) == 2:
+        precision = _ratio(len(matched[(0, 1)]), per_tool[0].n_hits)
+        recall = _ratio(len(matched[(1, 0)]), per_tool[1].n_hits)
+    else:
+        precision = recall = ""
+
+    return [structure, motif or ALL_MOTIFS, "|".join(tools), "|".join(str(h.n_hits) for h in per_tool),
+            str(shared), str(union), _ratio(shared, union), precision, recall, _ratio(supported, n_total)]
+
+
+def agreement_rows(table: HitTable, tools: Sequence[str]):
+    """
+    Rows for every pair of tools and the all-tools set, on each structure scanned
+    by every tool of the comparison. Each tool's hits are gathered once per
+    (structure, motif) and shared by all comparisons.
+    """
+    comparisons = [list(c) for c in combinations(tools, 2)]
+    if len(tools) > 2:
+        comparisons.append(list(tools))
+    motifs: List[Optional[str]] = table.motifs.tolist() + [None]
+    scanned = {t: set(table.scanned(t).tolist()) for t in tools}
+    chain_codes: Dict[str, int] = {}
+    for code, structure in enumerate(table.structures.tolist()):
+        present = [t for t in tools if code in scanned[t]]
+        active = [c for c in comparisons if all(t in present for t in c)]
+        if not active:
+            continue
+        for motif in motifs:
+            hits = {t: StructureHits(table, structure, motif, t, chain_codes) for t in present}
+            for tool_set in active:
+                yield compare(structure, motif, tool_set, [hits[t] for t in tool_set])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-URS motif agreement between FARFAR2, RhoFold+ and AlphaFold3")
+    ap.add_argument("--hits", help="Hit table from motif_hits.py build (else built from the roots below)")
+    add_root_args(ap)
+    ap.add_argument("--out", default=str(DEFAULT_OUT), help="Output CSV")
+    args = ap.parse_args()
+
+    if args.hits:
+        table = HitTable.load(Path(args.hits))
+    else:
+        roots = roots_from_args(args)
+        if not roots:
+            raise SystemExit("[ERROR] give --hits or at least two of --farfar-root/--rhofold-root/--alphafold-root")
+        table = build_hit_table(roots)
+    tools = table.tools.tolist()
+    if len(tools) < 2:
+        raise SystemExit(f"[ERROR] need hits from at least two tools, have: {', '.join(tools)}")
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    sums: Dict[Tuple[str, str], List[float]] = {}
+    n_rows = 0
+    with out.open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(HEADER)
+        for row in agreement_rows(table, tools):
+            w.writerow(row)
+            n_rows += 1
+            if row[6]:
+                acc = sums.setdefault((row[2], row[1]), [0.0, 0])
+                acc[0] += float(row[6])
+                acc[1] += 1
+
+    for (tool_set, motif), (total, n) in sorted(sums.items()):
+        if motif == ALL_MOTIFS:
+            print(f"[INFO] {tool_set:<30} mean residue Jaccard {total / n:.3f} over {n} structures")
+    print(f"[OK] Wrote {n_rows} rows to {out}")
+
+
+if __name__ == "__main__":
+    main()
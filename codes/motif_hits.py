@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Structured RNAMotifScanX hits and a columnar, indexed hit table.
+
+Every hit line of <ROOT>/URS*/Res_motifs/<motif>/result.log (the lines that
+count_motifs.py counts) becomes a record:
+
+  tool, structure (URS), motif, fragment ID, aligned residue ranges, score, P-value
+
+aligned_regions such as "A:3-7,A:10-13" are split into (chain, start, end)
+ranges. Columns are taken from the log's header when there is one
+(fragment_ID, aligned_regions, alignment_score, P-value), otherwise by position.
+
+The table is stored as one .npz of flat arrays: hits sorted by
+(structure, motif, tool), their residue ranges in CSR form (reg_offsets), and an
+index of (structure, motif) keys with hit offsets, so a lookup is one binary
+search. It also records which (tool, structure) pairs were scanned at all, so
+"scanned, no hits" can be told apart from "not scanned".
+
+Build once from the per-tool roots, then query:
+  python motif_hits.py build --farfar-root .../farfar_pdb --rhofold-root .../rhofold_pdb \\
+      --alphafold-root .../alphafold_pdb --out motif_hits.npz
+  python motif_hits.py query --hits motif_hits.npz --structure URS... --motif k-turn_consensus
+  python motif_hits.py overlap --hits motif_hits.npz --motif k-turn_consensus --tool-a rhofold --tool-b farfar2
+"""
+
+import argparse
+import math
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from count_motifs import DEFAULT_WORKERS, _scandir_dirs, list_motif_logs, order_motifs
+
+# Tool names as used for the count_motifs.py columns (num_motifs_<tool>)
+TOOLS = ["farfar2", "rhofold", "alphafold3"]
+
+_REGION = re.compile(r"^(?:(\S+?):)?(-?\d+)[A-Za-z]?(?:-(-?\d+)[A-Za-z]?)?$")
+_DEFAULT_COLUMNS = ["fragment_id", "aligned_regions", "alignment_score", "p-value"]
+
+
+def parse_regions(text: str) -> List[Tuple[str, int, int]]:
+    """'A:3-7,A:10-13' -> [('A', 3, 7), ('A', 10, 13)]; unparseable parts are skipped."""
+    regions = []
+    for part in re.split(r"[,;]", text):
+        m = _REGION.match(part.strip())
+        if not m:
+            continue
+        chain, start, end = m.group(1) or "", int(m.group(2)), int(m.group(3) or m.group(2))
+        regions.append((chain, min(start, end), max(start, end)))
+    return regions
+
+
+def _float(text: Optional[str]) -> float:
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def parse_result_log(log_path: str) -> List[Tuple[str, List[Tuple[str, int, int]], float, float]]:
+    """(fragment, regions, score, p-value) for every hit line of one result.log."""
+    hits = []
+    columns = _DEFAULT_COLUMNS
+    first_nonempty_seen = False
+    with open(log_path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            s = line.strip()
+            if not s:
+                continue
+            if not first_nonempty_seen:
+                first_nonempty_seen = True
+                head = s.lstrip("#").strip()
+                if head.lower().startswith("fragment_id"):
+                    columns = [c.lower() for c in head.split("\t" if "\t" in head else None)]
+                    continue
+            if s.startswith("#"):
+                continue
+            fields = dict(zip(columns, s.split("\t" if "\t" in s else None)))
+            hits.append((fields.get("fragment_id", ""),
+                         parse_regions(fields.get("aligned_regions", "")),
+                         _float(fields.get("alignment_score")),
+                         _float(fields.get("p-value"))))
+    return hits
+
+
+class HitTable:
+    """Columnar motif hits; see the module docstring for the layout."""
+
+    ARRAYS = ("structures", "motifs", "tools", "hit_structure", "hit_motif", "hit_tool", "fragment",
+              "score", "pvalue", "reg_offsets", "reg_chain", "reg_start", "reg_end",
+              "index_key", "index_offsets", "scanned_tool", "scanned_structure")
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self._structure_pos = {s: i for i, s in enumerate(self.structures.tolist())}
+        self._motif_pos = {m: i for i, m in enumerate(self.motifs.tolist())}
+        self._tool_pos = {t: i for i, t in enumerate(self.tools.tolist())}
+
+    def __len__(self) -> int:
+        return len(self.hit_structure)
+
+    @classmethod
+    def load(cls, path: Path) -> "HitTable":
+        with np.load(path, allow_pickle=False) as z:
+            return cls({name: z[name] for name in cls.ARRAYS})
+
+    def save(self, path: Path):
+        tmp = Path(str(path) + ".tmp.npz")
+        np.savez(tmp, **{name: getattr(self, name) for name in self.ARRAYS})
+        os.replace(tmp, path)
+
+    def tool_code(self, tool: str) -> int:
+        return self._tool_pos[tool]
+
+    def motif_code(self, motif: str) -> int:
+        return self._motif_pos[motif]
+
+    def structure_code(self, structure: str) -> Optional[int]:
+        return self._structure_pos.get(structure)
+
+    def scanned(self, tool: str) -> np.ndarray:
+        """Structure codes that have scan results (possibly no hits) for a tool."""
+        return self.scanned_structure[self.scanned_tool == self.tool_code(tool)]
+
+    def hit_rows(self, structure: str, motif: Optional[str] = None, tool: Optional[str] = None) -> np.ndarray:
+        """Row numbers of the hits on one structure (optionally one motif / one tool)."""
+        s = self.structure_code(structure)
+        if s is None or (motif is not None and motif not in self._motif_pos):
+            return np.zeros(0, dtype=np.int64)
+        n_motifs = len(self.motifs)
+        if motif is None:
+            lo_key, hi_key = s * n_motifs, (s + 1) * n_motifs
+        else:
+            lo_key = s * n_motifs + self.motif_code(motif)
+            hi_key = lo_key + 1
+        lo = np.searchsorted(self.index_key, lo_key, side="left")
+        hi = np.searchsorted(self.index_key, hi_key, side="left")
+        rows = np.arange(self.index_offsets[lo], self.index_offsets[hi], dtype=np.int64)
+        if tool is not None:
+            rows = rows[self.hit_tool[rows] == self.tool_code(tool)]
+        return rows
+
+    def regions(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """(hit row, chain, start, end) of every residue range of the given hits."""
+        starts, ends = self.reg_offsets[rows], self.reg_offsets[rows + 1]
+        counts = ends - starts
+        idx = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        return np.repeat(rows, counts), self.reg_chain[idx], self.reg_start[idx], self.reg_end[idx]
+
+    def overlaps(self, structure: str, motif: Optional[str], tool_a: str, tool_b: str) -> List[Tuple[int, int]]:
+        """Pairs (row_a, row_b) of tool_a / tool_b hits on the same structure sharing at least one residue."""
+        ha, ca, sa, ea = self.regions(self.hit_rows(structure, motif, tool_a))
+        hb, cb, sb, eb = self.regions(self.hit_rows(structure, motif, tool_b))
+        i, j = overlapping_ranges(ca, sa, ea, cb, sb, eb)
+        return sorted(set(zip(ha[i].tolist(), hb[j].tolist())))
+
+    def record(self, row: int) -> dict:
+        lo, hi = self.reg_offsets[row], self.reg_offsets[row + 1]
+        return {
+            "tool": str(self.tools[self.hit_tool[row]]),
+            "structure": str(self.structures[self.hit_structure[row]]),
+            "motif": str(self.motifs[self.hit_motif[row]]),
+            "fragment": str(self.fragment[row]),
+            "regions": ",".join(f"{c}:{s}-{e}" if c else f"{s}-{e}" for c, s, e in
+                                zip(self.reg_chain[lo:hi], self.reg_start[lo:hi], self.reg_end[lo:hi])),
+            "score": float(self.score[row]),
+            "pvalue": float(self.pvalue[row]),
+        }
+
+
+def overlapping_ranges(ca, sa, ea, cb, sb, eb) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Index pairs (i, j) with ranges a[i] and b[j] on the same chain sharing a residue.
+    Sorted sweep: b is sorted by (chain, start); for every a the candidate b ranges
+    (same chain, starting before a ends) form one contiguous block found by binary
+    search, and only those are checked against a's start. Fully vectorized.
+    """
+    if not len(sa) or not len(sb):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    _, codes = np.unique(np.concatenate([ca, cb]), return_inverse=True)
+    # One flat coordinate per residue: chain block (code * span) + offset from the smallest residue number
+    low = int(min(sa.min(), sb.min()))
+    span = int(max(ea.max(), eb.max())) - low + 1
+    block = codes.astype(np.int64) * span
+    block_a, block_b = block[:len(sa)], block[len(sa):]
+    fa_s, fa_e = block_a + (sa - low), block_a + (ea - low)
+    fb_s, fb_e = block_b + (sb - low), block_b + (eb - low)
+
+    order = np.argsort(fb_s, kind="stable")
+    fb_s, fb_e = fb_s[order], fb_e[order]
+    lo = np.searchsorted(fb_s, block_a, side="left")
+    stop = np.searchsorted(fb_s, fa_e, side="right")
+    counts = np.maximum(stop - lo, 0)
+    i = np.repeat(np.arange(len(sa)), counts)
+    j = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    keep = fb_e[j] >= fa_s[i]
+    return i[keep], order[j[keep]]
+
+
+def _collect_root(tool: str, root: Path, workers: int) -> Iterator[Tuple[str, str, str, list]]:
+    """(tool, structure, motif, hits) for every motif dir of a root; hits is None for 'scanned' markers."""
+    urs_dirs = sorted((e.name, e.path) for e in _scandir_dirs(str(root)) if e.name.startswith("URS"))
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        listings = list(pool.map(list_motif_logs, [p for _, p in urs_dirs]))
+        jobs = []
+        for (name, _), logs in zip(urs_dirs, listings):
+            if logs is None:
+                continue
+            yield tool, name, "", None
+            for motif, entry in logs.items():
+                if entry is not None:
+                    jobs.append((name, motif, entry.path))
+        for (name, motif, _), hits in zip(jobs, pool.map(parse_result_log, [j[2] for j in jobs])):
+            yield tool, name, motif, hits
+
+
+def build_hit_table(roots: Dict[str, Path], workers: int = DEFAULT_WORKERS) -> HitTable:
+    """Parse every result.log under the given {tool: root} and build the indexed table."""
+    scanned: List[Tuple[str, str]] = []
+    raw: List[Tuple[str, str, str, str, list, float, float]] = []
+    for tool in [t for t in TOOLS if t in roots] + sorted(set(roots) - set(TOOLS)):
+        for _, structure, motif, hits in _collect_root(tool, roots[tool], workers):
+            if hits is None:
+                scanned.append((tool, structure))
+                continue
+            for fragment, regions, score, pvalue in hits:
+                raw.append((tool, structure, motif, fragment, regions, score, pvalue))
+
+    tools = [t for t in TOOLS if t in roots] + sorted(set(roots) - set(TOOLS))
+    structures = sorted({s for _, s in scanned})
+    motifs = order_motifs(r[2] for r in raw)
+    t_pos = {t: i for i, t in enumerate(tools)}
+    s_pos = {s: i for i, s in enumerate(structures)}
+    m_pos = {m: i for i, m in enumerate(motifs)}
+
+    hit_tool = np.array([t_pos[r[0]] for r in raw], dtype=np.int8)
+    hit_structure = np.array([s_pos[r[1]] for r in raw], dtype=np.int32)
+    hit_motif = np.array([m_pos[r[2]] for r in raw], dtype=np.int16)
+    order = np.lexsort((np.arange(len(raw)), hit_tool, hit_motif, hit_structure))
+    raw = [raw[i] for i in order]
+    hit_tool, hit_structure, hit_motif = hit_tool[order], hit_structure[order], hit_motif[order]
+
+    n_regions = np.array([len(r[4]) for r in raw], dtype=np.int64)
+    reg_offsets = np.concatenate([[0], np.cumsum(n_regions)]).astype(np.int64)
+    flat = [reg for r in raw for reg in r[4]]
+
+    key = hit_structure.astype(np.int64) * len(motifs) + hit_motif
+    index_key, first = np.unique(key, return_index=True)
+    index_offsets = np.concatenate([first, [len(raw)]]).astype(np.int64)
+
+    return HitTable({
+        "structures": np.array(structures, dtype=str),
+        "motifs": np.array(motifs, dtype=str),
+        "tools": np.array(tools, dtype=str),
+        "hit_structure": hit_structure,
+        "hit_motif": hit_motif,
+        "hit_tool": hit_tool,
+        "fragment": np.array([r[3] for r in raw], dtype=str),
+        "score": np.array([r[5] for r in raw], dtype=np.float64),
+        "pvalue": np.array([r[6] for r in raw], dtype=np.float64),
+        "reg_offsets": reg_offsets,
+        "reg_chain": np.array([c for c, _, _ in flat], dtype="U4"),
+        "reg_start": np.array([s for _, s, _ in flat], dtype=np.int32),
+        "reg_end": np.array([e for _, _, e in flat], dtype=np.int32),
+        "index_key": index_key.astype(np.int64),
+        "index_offsets": index_offsets,
+        "scanned_tool": np.array([t_pos[t] for t, _ in scanned], dtype=np.int8),
+        "scanned_structure": np.array([s_pos[s] for _, s in scanned], dtype=np.int32),
+    })
+
+
+def roots_from_args(args) -> Dict[str, Path]:
+    roots = {}
+    for tool, value in (("farfar2", args.farfar_root), ("rhofold", args.rhofold_root),
+                        ("alphafold3", args.alphafold_root)):
+        if value:
+            roots[tool] = Path(value).expanduser().resolve()
+    return roots
+
+
+def add_root_args(ap: argparse.ArgumentParser):
+    ap.add_argument("--farfar-root",    help="Path to farfar_pdb directory")
+    ap.add_argument("--rhofold-root",   help="Path to rhofold_pdb directory")
+    ap.add_argument("--alphafold-root", help="Path to alphafold_pdb directory")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build and query the motif hit table")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_build = sub.add_parser("build", help="Parse all result.log files into a hit table")
+    add_root_args(p_build)
+    p_build.add_argument("--out", default="motif_hits.npz")
+    p_build.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    p_query = sub.add_parser("query", help="List the hits on one structure")
+    p_query.add_argument("--hits", default="motif_hits.npz")
+    p_query.add_argument("--structure", required=True)
+    p_query.add_argument("--motif")
+    p_query.add_argument("--tool")
+    p_overlap = sub.add_parser("overlap", help="Hits of one tool overlapping hits of another on the same URS")
+    p_overlap.add_argument("--hits", default="motif_hits.npz")
+    p_overlap.add_argument("--motif")
+    p_overlap.add_argument("--tool-a", required=True)
+    p_overlap.add_argument("--tool-b", required=True)
+    p_overlap.add_argument("--structure", help="Only this URS (default: every URS scanned by both tools)")
+    args = ap.parse_args()
+
+    if args.cmd == "build":
+        roots = roots_from_args(args)
+        if not roots:
+            raise SystemExit("[ERROR] give at least one of --farfar-root/--rhofold-root/--alphafold-root")
+        table = build_hit_table(roots, args.workers)
+        table.save(Path(args.out))
+        print(f"Wrote {len(table)} hits on {len(table.structures)} structures "
+              f"({', '.join(table.tools.tolist())}) to {args.out}")
+        return
+
+    table = HitTable.load(Path(args.hits))
+    if args.cmd == "query":
+        for row in table.hit_rows(args.structure, args.motif, args.tool):
+            r = table.record(row)
+            print(f"{r['tool']}\t{r['structure']}\t{r['motif']}\t{r['fragment']}\t{r['regions']}\t"
+                  f"{r['score']:g}\t{r['pvalue']:g}")
+        return
+
+    if args.structure:
+        structures = [args.structure]
+    else:
+        both = np.intersect1d(table.scanned(args.tool_a), table.scanned(args.tool_b))
+        structures = table.structures[both].tolist()
+    n_pairs = 0
+    for structure in structures:
+        for row_a, row_b in table.overlaps(structure, args.motif, args.tool_a, args.tool_b):
+            a, b = table.record(row_a), table.record(row_b)
+            print(f"{structure}\t{a['motif']}\t{args.tool_a}:{a['fragment']}:{a['regions']}\t"
+                  f"{args.tool_b}:{b['fragment']}:{b['regions']}")
+            n_pairs += 1
+    print(f"# {n_pairs} overlapping hit pair(s) on {len(structures)} structure(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Sharded (Slurm array) runs of motifscan_driver.py: plan, local stand-in, merge.
+
+All subcommands take the driver's own arguments after `--`, so they see the same
+structures, FASTA and models as the array tasks (--config multi-tool runs included).
+
+  plan   print the length-balanced shard plan and write it to OUT_ROOT/shards.tsv
+  local  run every shard as a subprocess with SLURM_ARRAY_TASK_ID set, --parallel at a
+         time (a stand-in for `sbatch --array`, for testing without a cluster), then merge
+  merge  check that every structure with a FASTA record has a finished prepare step and
+         one finished scan per model (same keys and outputs the driver checks), write
+         OUT_ROOT/merge_report.tsv, and fold all shard manifests into OUT_ROOT/manifest.jsonl
+         (for every tool's OUT_ROOT); the folded shard manifests are renamed to
+         manifest.shard-XXX.jsonl.merged.
+         Exits with 1 while anything is missing, so it can gate later steps.
+
+Shards write their results straight into OUT_ROOT/<URS>/Res_motifs/<motif>/result.log
+(structures are disjoint between shards), so after a complete merge the tree is the
+same as that of an unsharded run.
+
+Usage:
+  python3 motifscan_array.py plan  --shards 8 -- --pdb-root ... --out-root ... --fasta ... --rnamotifscanx ...
+  python3 motifscan_array.py local --shards 4 --parallel 2 -- <driver args>
+  python3 motifscan_array.py merge [--shards 8] -- <driver args>
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from motifscan_driver import (MANIFEST_NAME, PREPARE_STEP, build_parser, discover_inputs,
+                              extract_fasta_record, find_prepared_inputs, read_manifest, step_keys)
+from model_sources import StructureInput
+from motifscan_shards import fasta_lengths, plan_for_items
+
+DRIVER = Path(__file__).resolve().parent / "motifscan_driver.py"
+SHARD_MANIFEST_RE = re.compile(r"^manifest\.shard-(\d+)\.jsonl$")
+MERGED_SUFFIX = ".merged"
+
+
+def shard_manifests(out_root: Path) -> Dict[int, Path]:
+    found = {}
+    for entry in os.scandir(out_root):
+        m = SHARD_MANIFEST_RE.match(entry.name)
+        if m:
+            found[int(m.group(1))] = Path(entry.path)
+    return found
+
+
+def write_plan(path: Path, plan: List[List[str]], length_of: Dict[str, int]):
+    with path.open("w", encoding="utf-8") as f:
+        f.write("shard\tstructure\tlength\n")
+        for shard, keys in enumerate(plan):
+            for key in keys:
+                f.write(f"{shard}\t{key}\t{length_of[key]}\n")
+
+
+def cmd_plan(args, dargs):
+    _, _, items = discover_inputs(dargs)
+    lengths = fasta_lengths(Path(dargs.fasta))
+    length_of = {it.key: lengths.get(it.name, 0) for it in items}
+    plan = plan_for_items(items, Path(dargs.fasta), args.shards)
+
+    print(f"{'shard':>6}{'structures':>12}{'total_len':>12}")
+    for shard, keys in enumerate(plan):
+        print(f"{shard:>6}{len(keys):>12}{sum(length_of[k] for k in keys):>12}")
+    for out_root in sorted({it.out_root for it in items}):
+        out_root.mkdir(parents=True, exist_ok=True)
+        write_plan(out_root / "shards.tsv", plan, length_of)
+        print(f"Plan written to {out_root / 'shards.tsv'}")
+
+
+def latest_entries(out_root: Path, shard_files: Dict[int, Path]) -> Dict[Tuple[str, str], dict]:
+    """Latest entry per (structure, step) over the main manifest and every shard, by finish time."""
+    entries = read_manifest(out_root / MANIFEST_NAME)
+    for shard in sorted(shard_files):
+        entries.extend(read_manifest(shard_files[shard]))
+    entries.sort(key=lambda e: e.get("finished", ""))
+    latest: Dict[Tuple[str, str], dict] = {}
+    for entry in entries:
+        latest[(entry["structure"], entry["step"])] = entry
+    return latest
+
+
+def merge_out_root(dargs, out_root: Path, items: List[StructureInput], models: List[Path],
+                   model_bytes: Dict[Path, bytes], shard_of: Dict[str, int],
+                   shard_files: Dict[int, Path], wall: List[float]) -> Tuple[int, int, int]:
+    """Check and merge one tool's OUT_ROOT; returns (complete, incomplete, no_fasta) counts."""
+    latest = latest_entries(out_root, shard_files)
+
+    def is_done(structure, step, key):
+        entry = latest.get((structure, step))
+        return bool(entry) and entry.get("status") == "done" and entry.get("key") == key
+
+    rows = []
+    for item in items:
+        base = item.name
+        fasta_lines = extract_fasta_record(Path(dargs.fasta), base)
+        if fasta_lines is None:
+            rows.append((base, shard_of.get(item.key, -1), 0, 0, "no_fasta", ""))
+            continue
+        workdir = out_root / base
+        prepare_key, scan_keys = step_keys(item.read_pdb(), fasta_lines, models, model_bytes)
+
+        missing = []
+        if not (is_done(base, PREPARE_STEP, prepare_key) and all(find_prepared_inputs(workdir))):
+            missing.append(PREPARE_STEP)
+        for model in models:
+            log = workdir / dargs.res_dirname / model.stem / "result.log"
+            if not (is_done(base, model.stem, scan_keys[model]) and log.is_file()):
+                missing.append(model.stem)
+        expected = len(models) + 1
+        status = "complete" if not missing else "incomplete"
+        rows.append((base, shard_of[item.key], expected - len(missing), expected, status, ",".join(missing)))
+
+    with (out_root / "merge_report.tsv").open("w", encoding="utf-8") as f:
+        f.write("structure\tshard\tsteps_done\tsteps_expected\tstatus\tmissing\n")
+        for row in rows:
+            f.write("\t".join(str(v) for v in row) + "\n")
+
+    # Compacted main manifest: one (latest) line per step, written atomically
+    tmp = out_root / (MANIFEST_NAME + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        for entry in latest.values():
+            f.write(json.dumps(entry) + "\n")
+    os.replace(tmp, out_root / MANIFEST_NAME)
+
+    # The shard manifests are folded in now: move them aside, so a later run with a different shard count
+    # neither infers the old count from them nor reads their stale entries after the main manifest
+    for shard_file in shard_files.values():
+        os.replace(shard_file, shard_file.with_name(shard_file.name + MERGED_SUFFIX))
+
+    key_of = {item.name: item.key for item in items}
+    for (structure, _), entry in latest.items():
+        s = shard_of.get(key_of.get(structure))
+        if s is not None and entry.get("status") == "done":
+            wall[s] += entry.get("wall_time", 0.0)
+
+    counts = [sum(1 for r in rows if r[4] == status) for status in ("complete", "incomplete", "no_fasta")]
+    print(f"[merge] {out_root}: {counts[0]} complete, {counts[1]} incomplete, {counts[2]} without FASTA. "
+          f"Report: {out_root / 'merge_report.tsv'}")
+    return counts[0], counts[1], counts[2]
+
+
+def merge(dargs, n_shards: int = None) -> bool:
+    """Check completeness and fold the shard manifests into the main manifests; True when complete."""
+    models, model_bytes, items = discover_inputs(dargs)
+    by_root: Dict[Path, List[StructureInput]] = {}
+    for item in items:
+        by_root.setdefault(item.out_root, []).append(item)
+    shard_files = {r: shard_manifests(r) if r.is_dir() else {} for r in by_root}
+    if n_shards is None:
+        n_shards = max((max(f) + 1 for f in shard_files.values() if f), default=1)
+    plan = plan_for_items(items, Path(dargs.fasta), n_shards)
+    shard_of = {key: s for s, keys in enumerate(plan) for key in keys}
+
+    wall = [0.0] * n_shards
+    incomplete = 0
+    for out_root in sorted(by_root):
+        out_root.mkdir(parents=True, exist_ok=True)
+        _, n_incomplete, _ = merge_out_root(dargs, out_root, by_root[out_root], models, model_bytes,
+                                            shard_of, shard_files[out_root], wall)
+        incomplete += n_incomplete
+
+    # Per-shard summary, useful to judge the length balancing
+    for shard in range(n_shards):
+        present = "manifest" if any(shard in f for f in shard_files.values()) else "no manifest"
+        print(f"[merge] shard {shard:03d}: {len(plan[shard])} structure(s), step wall time {wall[shard]:.1f}s ({present})")
+    return incomplete == 0
+
+
+def cmd_local(args, driver_argv: List[str], dargs):
+    """Run all shards as local subprocesses, as `sbatch --array=0-(K-1)` would, then merge."""
+    _, _, items = discover_inputs(dargs)
+    log_dir = min(it.out_root for it in items) / "logs"
+    log_dir.mkdir(parents=True, exist_ok=True)
+
+    def run_shard(shard: int) -> int:
+        env = dict(os.environ,
+                   SLURM_ARRAY_JOB_ID="local",
+                   SLURM_ARRAY_TASK_ID=str(shard),
+                   SLURM_ARRAY_TASK_MIN="0",
+                   SLURM_ARRAY_TASK_MAX=str(args.shards - 1),
+                   SLURM_ARRAY_TASK_COUNT=str(args.shards))
+        with (log_dir / f"shard-{shard:03d}.out").open("w") as log:
+            proc = subprocess.run([sys.executable, str(DRIVER), *driver_argv, "--shards", str(args.shards)],
+                                  env=env, stdout=log, stderr=subprocess.STDOUT)
+        print(f"[local] shard {shard:03d} exited with {proc.returncode} (log: {log_dir / f'shard-{shard:03d}.out'})")
+        return proc.returncode
+
+    with ThreadPoolExecutor(max_workers=max(1, args.parallel)) as pool:
+        codes = list(pool.map(run_shard, range(args.shards)))
+    failed = sum(1 for c in codes if c != 0)
+    if failed:
+        print(f"[local] {failed} shard(s) reported failures")
+    return merge(dargs, args.shards)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Plan, run locally, or merge sharded motifscan_driver.py runs")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_plan = sub.add_parser("plan", help="Show and save the length-balanced shard plan")
+    p_plan.add_argument("--shards", type=int, required=True)
+    p_local = sub.add_parser("local", help="Run all shards as local subprocesses, then merge")
+    p_local.add_argument("--shards", type=int, required=True)
+    p_local.add_argument("--parallel", type=int, default=1, help="Shards run at the same time")
+    p_merge = sub.add_parser("merge", help="Check completeness and merge the shard manifests")
+    p_merge.add_argument("--shards", type=int,
+                         help="Shard count of the run (default: inferred from the shard manifests)")
+    for p in (p_plan, p_local, p_merge):
+        p.add_argument("driver_args", nargs=argparse.REMAINDER, help="motifscan_driver.py arguments after --")
+
+    args = ap.parse_args()
+    driver_argv = args.driver_args[1:] if args.driver_args[:1] == ["--"] else args.driver_args
+    dargs = build_parser().parse_args(driver_argv)
+    if dargs.shards is not None:
+        raise SystemExit("[ERROR] pass --shards to motifscan_array.py, not in the driver arguments")
+
+    if args.cmd == "plan":
+        cmd_plan(args, dargs)
+    elif args.cmd == "local":
+        sys.exit(0 if cmd_local(args, driver_argv, dargs) else 1)
+    else:
+        sys.exit(0 if merge(dargs, args.shards) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Resumable RNAMotifScanX driver (replaces the serial loop in run_rnamotifscanx.sh).
+
+Structures come either from one PDB directory (--pdb-root, results under
+--out-root) or from a tool -> input layout config (--config, see
+model_sources.py) covering FARFAR2, RhoFold+ and AlphaFold3 at once, each tool
+with its own OUT_ROOT; AlphaFold3 models are read from their zip archives in
+memory. All tools share one work queue.
+
+For every structure:
+  prepare  write ABCD.pdb / ABCD.fa (header >ABCD_A) into a private scratch
+           directory (tmpfs when available), run PrepareInput.py (Python 2.7)
+           there and move everything it produced into OUT_ROOT/<URS>/
+  scan     one bin/scan call per <model>.struct in the models dir, writing
+           OUT_ROOT/<URS>/Res_motifs/<model>/result.log
+
+Every finished step is appended to OUT_ROOT/manifest.jsonl with its key and
+wall time. The key of the prepare step is a SHA-1 of the input PDB and its
+FASTA record; the key of a scan step adds the model file. On a rerun a step is
+skipped when its latest manifest entry is "done" with the same key and its
+outputs are still on disk, so a restart after a crash, or after adding new
+models, only does the missing work. Failed steps are retried --retries times.
+
+Because every preparation has its own scratch directory, structures do not
+interfere with each other. All (structure x step) jobs go through one work queue
+(motifscan_scheduler.py) that keeps --cores cores busy: each scan gets a
+--num_threads value picked from the free cores (up to --threads), and node
+utilization is reported as the run progresses.
+
+With --shards K the structures are split into K length-balanced shards
+(motifscan_shards.py) and only shard --shard (default: the Slurm array task)
+is run; it records its steps in OUT_ROOT/manifest.shard-XXX.jsonl. After all
+shards finish, `motifscan_array.py merge` checks completeness and folds the
+shard manifests into OUT_ROOT/manifest.jsonl.
+
+Usage (see run_rnamotifscanx.sh for the Slurm wrapper):
+  python3 motifscan_driver.py --pdb-root .../farfar2/str --out-root .../farfar_pdb \\
+      --fasta .../human_seqs_non3d_rfams.fa --rnamotifscanx /path/to/RNAMotifScanX-release \\
+      --python2 /path/to/py27/bin/python --cores 16
+  python3 motifscan_driver.py --config motifscan_tools.json --fasta ... --rnamotifscanx ... --cores 16
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from fasta_index import open_fasta
+from motifscan_scheduler import CoreScheduler, Job
+from model_sources import StructureInput, discover, load_tools_config
+from motifscan_shards import array_task_index, plan_for_items, shard_manifest_name
+
+# Constant 4-char tag + chain A expected by PrepareInput.py
+TEMP_TAG = "ABCD"
+MANIFEST_NAME = "manifest.jsonl"
+PREPARE_STEP = "prepare"
+
+
+def sha1_of(*parts: bytes) -> str:
+    h = hashlib.sha1()
+    for part in parts:
+        h.update(part)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def extract_fasta_record(fasta_path: Path, header: str) -> Optional[List[str]]:
+    """Sequence lines of the record whose first header token equals `header` (None if absent)."""
+    return open_fasta(fasta_path).lines(header)
+
+
+def read_manifest(path: Path) -> List[dict]:
+    """All entries of a manifest file, in order (missing file -> [])."""
+    entries = []
+    if not path.is_file():
+        return entries
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue  # torn last line after a crash
+    return entries
+
+
+class Manifest:
+    """Append-only JSON-lines record of finished steps; the latest entry per (structure, step) wins."""
+
+    def __init__(self, path: Path, also_read: Tuple[Path, ...] = ()):
+        """
+        Entries are appended to path. Files in also_read (e.g. the merged manifest
+        of an earlier sharded run) are read first, so their finished steps count too.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._latest: Dict[Tuple[str, str], dict] = {}
+        for source in tuple(also_read) + (path,):
+            for entry in read_manifest(source):
+                self._latest[(entry["structure"], entry["step"])] = entry
+
+    def is_done(self, structure: str, step: str, key: str) -> bool:
+        entry = self._latest.get((structure, step))
+        return bool(entry) and entry.get("status") == "done" and entry.get("key") == key
+
+    def record(self, structure: str, step: str, key: str, status: str,
+               wall_time: float, attempts: int, **extra):
+        entry = {
+            "structure": structure,
+            "step": step,
+            "key": key,
+            "status": status,
+            "wall_time": round(wall_time, 3),
+            "attempts": attempts,
+            "finished": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        entry.update(extra)
+        with self._lock:
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._latest[(structure, step)] = entry
+
+
+def find_prepared_inputs(workdir: Path) -> Tuple[Optional[Path], Optional[Path]]:
+    """First *.rmsx.in and *.rmsx.nch written by PrepareInput.py, if any."""
+    in_files = sorted(workdir.glob("*.rmsx.in"))
+    nch_files = sorted(workdir.glob("*.rmsx.nch"))
+    return (in_files[0] if in_files else None, nch_files[0] if nch_files else None)
+
+
+def default_scratch_root() -> Path:
+    """tmpfs (/dev/shm) when writable, else $TMPDIR / the system temp dir."""
+    shm = Path("/dev/shm")
+    if shm.is_dir() and os.access(shm, os.W_OK):
+        return shm
+    return Path(tempfile.gettempdir())
+
+
+def _move_into(src_dir: Path, dst_dir: Path):
+    """Move every entry of src_dir into dst_dir, merging into existing subdirectories."""
+    dst_dir.mkdir(parents=True, exist_ok=True)
+    for entry in os.scandir(src_dir):
+        dst = dst_dir / entry.name
+        if entry.is_dir() and dst.is_dir():
+            _move_into(Path(entry.path), dst)
+        else:
+            if dst.is_dir():
+                shutil.rmtree(dst)
+            shutil.move(entry.path, str(dst))
+
+
+def prepare_structure(args, item: StructureInput, fasta_lines: List[str], workdir: Path):
+    """
+    Run PrepareInput.py on one structure in its own scratch directory and move
+    everything it produced (plus the ABCD.* inputs, for auditing) into workdir.
+    Nothing is written to OUT_ROOT itself, so several structures can be prepared at once.
+    """
+    # Drop inputs from an earlier preparation so a failed rerun cannot pass on stale files
+    if workdir.is_dir():
+        for stale in list(workdir.glob("*.rmsx.in")) + list(workdir.glob("*.rmsx.nch")):
+            stale.unlink()
+
+    scratch_root = Path(args.scratch_root) if args.scratch_root else default_scratch_root()
+    scratch = Path(tempfile.mkdtemp(prefix=f"{item.name}.", dir=scratch_root))
+    try:
+        (scratch / f"{TEMP_TAG}.fa").write_text(
+            f">{TEMP_TAG}_A\n" + "".join(l + "\n" for l in fasta_lines), encoding="utf-8")
+        # Zip members and converted mmCIF models only ever exist in memory until here
+        (scratch / f"{TEMP_TAG}.pdb").write_bytes(item.read_pdb())
+
+        proc = subprocess.run(
+            [args.python2, str(Path(args.rnamotifscanx) / "scripts" / "PrepareInput.py"),
+             f"{TEMP_TAG}.pdb", f"{TEMP_TAG}.fa"],
+            cwd=scratch, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        (scratch / "prepare.log").write_text(proc.stdout or "", encoding="utf-8")
+        _move_into(scratch, workdir)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"PrepareInput.py exited with {proc.returncode}")
+    in_file, nch_file = find_prepared_inputs(workdir)
+    if in_file is None or nch_file is None:
+        raise RuntimeError("PrepareInput.py did not produce *.rmsx.in / *.rmsx.nch")
+
+
+def scan_model(args, workdir: Path, model: Path, threads: int):
+    """Run bin/scan for one model; result.log appears only once the scan succeeded."""
+    in_file, nch_file = find_prepared_inputs(workdir)
+    if in_file is None or nch_file is None:
+        raise RuntimeError("missing *.rmsx.in / *.rmsx.nch (prepare step incomplete)")
+
+    out_dir = workdir / args.res_dirname / model.stem
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tmp_log = out_dir / "result.log.tmp"
+    scan_bin = Path(args.rnamotifscanx) / "bin" / "scan"
+    with tmp_log.open("w") as out:
+        proc = subprocess.run(
+            [str(scan_bin), str(model), str(in_file), f"--map_pdb={nch_file}", "--num_threads", str(threads)],
+            stdout=out, stderr=subprocess.PIPE, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"scan exited with {proc.returncode}: {proc.stderr.strip()[-500:]}")
+    os.replace(tmp_log, out_dir / "result.log")
+
+
+def run_step(manifest: Manifest, structure: str, step: str, key: str, retries: int, func, *func_args) -> bool:
+    """Run func with retries and record the outcome; returns True on success."""
+    attempts = 0
+    t0 = time.perf_counter()
+    while True:
+        attempts += 1
+        try:
+            func(*func_args)
+        except Exception as e:
+            if attempts <= retries:
+                print(f"[retry] {structure} {step}: {e} (attempt {attempts}/{retries + 1})")
+                time.sleep(min(30, 2 ** attempts))
+                continue
+            manifest.record(structure, step, key, "failed", time.perf_counter() - t0, attempts, error=str(e))
+            print(f"[error] {structure} {step}: {e}")
+            return False
+        manifest.record(structure, step, key, "done", time.perf_counter() - t0, attempts)
+        return True
+
+
+def step_keys(pdb_bytes: bytes, fasta_lines: List[str], models: List[Path],
+              model_bytes: Dict[Path, bytes]) -> Tuple[str, Dict[Path, str]]:
+    prepare_key = sha1_of(pdb_bytes, "\n".join(fasta_lines).encode("utf-8"))
+    scan_keys = {m: sha1_of(prepare_key.encode("ascii"), model_bytes[m]) for m in models}
+    return prepare_key, scan_keys
+
+
+def plan_structure(args, manifest: Manifest, item: StructureInput, models: List[Path],
+                   model_bytes: Dict[Path, bytes]) -> Optional[List[Job]]:
+    """
+    Jobs still needed for one structure: a prepare job (which queues the scans
+    when it succeeds) or, if already prepared, just the missing scan jobs.
+    Returns None when the structure has no FASTA record.
+    """
+    base = item.name
+    fasta_lines = extract_fasta_record(Path(args.fasta), base)
+    if fasta_lines is None:
+        print(f"WARNING: No FASTA record found for '{base}' in {args.fasta} — skipping.")
+        return None
+
+    workdir = item.out_root / base
+    prepare_key, scan_keys = step_keys(item.read_pdb(), fasta_lines, models, model_bytes)
+
+    def scan_jobs() -> List[Job]:
+        jobs = []
+        for model in models:
+            step = model.stem
+            log = workdir / args.res_dirname / step / "result.log"
+            if manifest.is_done(base, step, scan_keys[model]) and log.is_file():
+                continue
+
+            def run_scan(threads, model=model, step=step):
+                print(f"[scan] {item.key} {step} (threads={threads})")
+                if not run_step(manifest, base, step, scan_keys[model], args.retries,
+                                scan_model, args, workdir, model, threads):
+                    raise RuntimeError(f"{step} scan failed")
+
+            # Scans run before new preparations so finished structures are completed first
+            jobs.append(Job(f"{item.key}:{step}", run_scan, priority=0, max_threads=args.threads))
+        return jobs
+
+    if manifest.is_done(base, PREPARE_STEP, prepare_key) and all(find_prepared_inputs(workdir)):
+        return scan_jobs()
+
+    def run_prepare(threads):
+        print(f"[prepare] {item.key}")
+        if not run_step(manifest, base, PREPARE_STEP, prepare_key, args.retries,
+                        prepare_structure, args, item, fasta_lines, workdir):
+            raise RuntimeError("prepare failed")
+        return scan_jobs()
+
+    return [Job(f"{item.key}:{PREPARE_STEP}", run_prepare, priority=1, max_threads=1)]
+
+
+def tools_from_args(args) -> Dict[str, dict]:
+    """Tool -> layout config: --config, or a single PDB directory (--pdb-root/--out-root)."""
+    if args.config:
+        return load_tools_config(Path(args.config))
+    if not (args.pdb_root and args.out_root):
+        raise SystemExit("[ERROR] give --config, or both --pdb-root and --out-root")
+    return {"pdb": {"layout": "glob", "pattern": "**/*.pdb", "name_from": "stem",
+                    "root": args.pdb_root, "out_root": args.out_root}}
+
+
+def discover_inputs(args) -> Tuple[List[Path], Dict[Path, bytes], List[StructureInput]]:
+    """Motif models (with their bytes, for the step keys) and every structure of every tool."""
+    if not args.rnamotifscanx and not args.models_dir:
+        raise SystemExit("[ERROR] --rnamotifscanx (or $RNAMOTIFSCANX_PATH) is required")
+    models_dir = Path(args.models_dir) if args.models_dir else Path(args.rnamotifscanx) / "models"
+    models = sorted(models_dir.glob("*.struct"))
+    if not models:
+        raise SystemExit(f"[ERROR] No *.struct models in {models_dir}")
+    model_bytes = {m: m.read_bytes() for m in models}
+
+    tools = tools_from_args(args)
+    items = discover(tools, Path(args.fasta))
+    if not items:
+        raise SystemExit("No structures found under " + ", ".join(str(cfg["root"]) for cfg in tools.values()))
+    return models, model_bytes, items
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(description="Resumable RNAMotifScanX prepare + scan driver")
+    ap.add_argument("--config", help="Tool -> input layout JSON (see model_sources.py); replaces --pdb-root/--out-root")
+    ap.add_argument("--pdb-root", help="Directory searched (recursively) for *.pdb")
+    ap.add_argument("--out-root", help="Output root; one <URS>/ folder per structure")
+    ap.add_argument("--fasta", required=True, help="Multi-FASTA with one record per structure basename")
+    ap.add_argument("--rnamotifscanx", default=os.environ.get("RNAMOTIFSCANX_PATH"),
+                    help="RNAMotifScanX install (default: $RNAMOTIFSCANX_PATH)")
+    ap.add_argument("--models-dir", help="Directory of *.struct models (default: <rnamotifscanx>/models)")
+    ap.add_argument("--python2", default="python2", help="Python 2.7 interpreter for PrepareInput.py")
+    ap.add_argument("--cores", type=int, default=int(os.environ.get("SLURM_CPUS_PER_TASK", os.cpu_count() or 1)),
+                    help="Cores the scheduler may keep busy (default: $SLURM_CPUS_PER_TASK, else all)")
+    ap.add_argument("--threads", type=int, default=4,
+                    help="Upper bound for --num_threads of a single scan; the actual value follows the free cores")
+    ap.add_argument("--report-interval", type=float, default=60.0, help="Seconds between utilization reports")
+    ap.add_argument("--retries", type=int, default=2, help="Extra attempts for a failing step")
+    ap.add_argument("--res-dirname", default="Res_motifs", help="Per-structure results folder name")
+    ap.add_argument("--scratch-root", help="Where per-structure scratch dirs are made (default: /dev/shm, else $TMPDIR)")
+    ap.add_argument("--shards", type=int,
+                    help="Split the structures into this many length-balanced shards and run one of them")
+    ap.add_argument("--shard", type=int,
+                    help="0-based shard to run with --shards (default: $SLURM_ARRAY_TASK_ID)")
+    ap.add_argument("--index", type=int,
+                    help="Without --shards: process only this index of the sorted structure list "
+                         "(default: $SLURM_ARRAY_TASK_ID, else all)")
+    return ap
+
+
+def main():
+    args = build_parser().parse_args()
+    if not args.rnamotifscanx:
+        raise SystemExit("[ERROR] --rnamotifscanx (or $RNAMOTIFSCANX_PATH) is required")
+
+    models, model_bytes, items = discover_inputs(args)
+    out_roots = sorted({item.out_root for item in items})
+    for out_root in out_roots:
+        out_root.mkdir(parents=True, exist_ok=True)
+
+    if args.shards:
+        shard = args.shard if args.shard is not None else array_task_index()
+        if shard is None or not 0 <= shard < args.shards:
+            raise SystemExit(f"[ERROR] --shards {args.shards} needs --shard (or $SLURM_ARRAY_TASK_ID) in 0..{args.shards - 1}")
+        keys = set(plan_for_items(items, Path(args.fasta), args.shards)[shard])
+        selected = [item for item in items if item.key in keys]
+        print(f"[shard] {shard + 1}/{args.shards}: {len(selected)} structure(s)")
+        # Each array task appends to its own manifests; motifscan_array.py merge folds them together
+        manifests = {r: Manifest(r / shard_manifest_name(shard), also_read=(r / MANIFEST_NAME,)) for r in out_roots}
+    else:
+        index = args.index if args.index is not None else array_task_index()
+        selected = [items[index]] if index is not None else items
+        manifests = {r: Manifest(r / MANIFEST_NAME) for r in out_roots}
+
+    scheduler = CoreScheduler(args.cores, report_interval=args.report_interval)
+
+    counts: Dict[str, int] = {}
+    for item in selected:
+        jobs = plan_structure(args, manifests[item.out_root], item, models, model_bytes)
+        if jobs is None:
+            status = "no_fasta"
+        elif not jobs:
+            status = "already_done"
+        else:
+            status = "queued"
+            for job in jobs:
+                scheduler.submit(job)
+        counts[status] = counts.get(status, 0) + 1
+    print(f"[plan] {len(selected)} structure(s): " + ", ".join(f"{k}: {v}" for k, v in sorted(counts.items())))
+
+    # (structure x step) jobs run concurrently from one queue, sized by the free cores
+    scheduler.run()
+
+    failed_structures = sorted({name.split(":", 1)[0] for name in scheduler.failures})
+    for name in failed_structures:
+        print(f"[failed] {name}")
+    print(f"All done: {scheduler.done} step(s) run, {len(failed_structures)} structure(s) with failures, "
+          f"peak concurrency {scheduler.peak_running}, node utilization {100 * scheduler.utilization():.1f}%. "
+          f"Outputs under: {', '.join(str(r) for r in out_roots)}")
+    if failed_structures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Core-aware work-queue scheduler for running many small external jobs on one node.
+
+Jobs sit in a priority queue. Whenever cores are free, the dispatcher starts the
+next job with a thread count chosen from the free cores: while the queue holds
+more jobs than there are free cores every job gets its minimum (usually 1
+thread), and as the queue drains the free cores are shared out among the
+remaining jobs (up to each job's max_threads), so the tail of a run still keeps
+the node busy. A job may return follow-up jobs (e.g. a prepare step returning
+its scans), which are queued when it finishes.
+
+The scheduler tracks busy core-seconds and reports node utilization
+(busy core-seconds / (cores x wall time)) periodically and at the end.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class Job:
+    """
+    One unit of work. run(threads) does the work and returns a list of follow-up
+    Jobs (or None); an exception marks the job failed.
+    Lower priority values run first.
+    """
+
+    def __init__(self, name: str, run: Callable[[int], Optional[List["Job"]]],
+                 priority: int = 0, min_threads: int = 1, max_threads: int = 1):
+        self.name = name
+        self.run = run
+        self.priority = priority
+        self.min_threads = max(1, min_threads)
+        self.max_threads = max(self.min_threads, max_threads)
+
+
+class CoreScheduler:
+    def __init__(self, cores: int, report_interval: float = 60.0, log: Callable[[str], None] = print):
+        self.cores = max(1, cores)
+        self.report_interval = report_interval
+        self.log = log
+
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._free = self.cores
+        self._running = 0
+
+        self.done = 0
+        self.failed = 0
+        self.busy_core_seconds = 0.0
+        self.peak_running = 0
+        self.failures: Dict[str, str] = {}
+        self._t0 = None
+
+    def submit(self, job: Job):
+        with self._cond:
+            heapq.heappush(self._queue, (job.priority, next(self._seq), job))
+            self._cond.notify_all()
+
+    def _threads_for(self, job: Job) -> int:
+        # Share the free cores among everything still waiting (this job included)
+        waiting = len(self._queue) + 1
+        share = self._free // waiting
+        return max(job.min_threads, min(job.max_threads, share))
+
+    def _worker(self, job: Job, threads: int):
+        t0 = time.perf_counter()
+        follow_ups = None
+        error = None
+        try:
+            follow_ups = job.run(threads)
+        except Exception as e:
+            error = str(e)
+        except BaseException as e:
+            # SystemExit etc. from a job: a failure of that job, not a reason to leave run() waiting forever
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            dt = time.perf_counter() - t0
+            with self._cond:
+                self._free += threads
+                self._running -= 1
+                self.busy_core_seconds += threads * dt
+                if error is None:
+                    self.done += 1
+                    for fj in follow_ups or []:
+                        heapq.heappush(self._queue, (fj.priority, next(self._seq), fj))
+                else:
+                    self.failed += 1
+                    self.failures[job.name] = error
+                self._cond.notify_all()
+
+    def utilization(self) -> float:
+        wall = time.perf_counter() - self._t0 if self._t0 else 0.0
+        return self.busy_core_seconds / (self.cores * wall) if wall > 0 else 0.0
+
+    def _report(self, final: bool = False):
+        wall = time.perf_counter() - self._t0
+        label = "final" if final else "progress"
+        self.log(f"[sched] {label}: done={self.done} failed={self.failed} running={self._running} "
+                 f"queued={len(self._queue)} busy_cores={self.cores - self._free}/{self.cores} "
+                 f"wall={wall:.1f}s core_s={self.busy_core_seconds:.1f} "
+                 f"utilization={100 * self.utilization():.1f}%")
+
+    def run(self):
+        """Dispatch until the queue is empty and nothing is running."""
+        self._t0 = time.perf_counter()
+        next_report = self._t0 + self.report_interval
+        with self._cond:
+            while self._queue or self._running:
+                while self._queue:
+                    job = self._queue[0][2]
+                    if self._free < min(job.min_threads, self.cores):
+                        break
+                    heapq.heappop(self._queue)
+                    threads = max(1, min(self._threads_for(job), self._free))
+                    self._free -= threads
+                    self._running += 1
+                    self.peak_running = max(self.peak_running, self._running)
+                    threading.Thread(target=self._worker, args=(job, threads), daemon=True).start()
+
+                self._cond.wait(timeout=max(0.1, next_report - time.perf_counter()))
+                if time.perf_counter() >= next_report:
+                    self._report()
+                    next_report += self.report_interval
+            self._report(final=True)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Length-balanced sharding of the structure list for Slurm array runs of
+motifscan_driver.py.
+
+Scan time grows with sequence length, so shards are balanced by total length
+rather than by count: structures are sorted longest first and each one goes to
+the currently lightest shard (LPT greedy). The plan depends only on the sorted
+structure list and the FASTA, so every array task computes the same plan on its own.
+
+Each shard records its steps in OUT_ROOT/manifest.shard-XXX.jsonl;
+motifscan_array.py merges them once all tasks have finished.
+"""
+
+import heapq
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fasta_index import open_fasta
+
+
+def shard_manifest_name(shard: int) -> str:
+    return f"manifest.shard-{shard:03d}.jsonl"
+
+
+def fasta_lengths(fasta_path: Path) -> Dict[str, int]:
+    """Sequence length of every record, keyed by the first header token (from the FASTA index)."""
+    return open_fasta(fasta_path).lengths()
+
+
+def balance_shards(items: Sequence[Tuple[str, int]], n_shards: int) -> List[List[str]]:
+    """Split (name, length) items into n_shards lists with near-equal total length."""
+    if n_shards < 1:
+        raise ValueError("n_shards must be >= 1")
+    heap = [(0, 0, s) for s in range(n_shards)]
+    shards: List[List[str]] = [[] for _ in range(n_shards)]
+    for name, length in sorted(items, key=lambda it: (-it[1], it[0])):
+        load, count, s = heapq.heappop(heap)
+        shards[s].append(name)
+        # Every structure costs at least one unit, so records without a length still spread out
+        heapq.heappush(heap, (load + max(1, length), count + 1, s))
+    return [sorted(names) for names in shards]
+
+
+def plan_for_items(items: Sequence, fasta_path: Path, n_shards: int) -> List[List[str]]:
+    """Shards of structure keys (tool/URS, see model_sources.StructureInput), weighted by FASTA length."""
+    lengths = fasta_lengths(fasta_path)
+    return balance_shards([(it.key, lengths.get(it.name, 0)) for it in items], n_shards)
+
+
+def array_task_index() -> Optional[int]:
+    """0-based array task index from Slurm ($SLURM_ARRAY_TASK_ID - $SLURM_ARRAY_TASK_MIN)."""
+    task = os.environ.get("SLURM_ARRAY_TASK_ID")
+    if not task:
+        return None
+    return int(task) - int(os.environ.get("SLURM_ARRAY_TASK_MIN") or 0)
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Fixed-column PDB reader with a compact NumPy representation, and the blank
+chain-ID fix used by add_chain_to_str.py.
+
+read_atoms() turns the ATOM/HETATM records of a PDB file into one structured
+array (ATOM_DTYPE): record, serial, atom name, altloc, residue name, chain,
+resseq, insertion code, x/y/z, occupancy, B-factor, element, the model it
+belongs to and the byte offset of its line. No per-atom Python objects are made:
+the records are cut into an (n_atoms, 80) byte matrix and each field is a column
+slice of it.
+
+fix_blank_chains() reproduces what add_chain_to_str.py did with Biopython:
+  - chains are grouped per model (MODEL/ENDMDL; no MODEL records = one model),
+  - every non-blank chain ID of every model is reserved,
+  - each model that has a blank-chain group gets the next free ID from
+    CHAIN_POOL, in model order (so model 1 -> A, model 2 -> B, ...),
+but instead of rebuilding and re-serializing the structure it rewrites the
+chain byte (column 22) of the affected records in a copy of the file. All other
+bytes, including REMARK/TER/END lines and the original atom serials, are kept.
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Chain ID pool to assign for blanks
+CHAIN_POOL: List[str] = list("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789abcdefghijklmnopqrstuvwxyz")
+
+CHAIN_COL = 21  # 0-based byte column of the chain ID (column 22 in the PDB format)
+LINE_WIDTH = 80
+
+ATOM_DTYPE = np.dtype([
+    ("record", "S6"),
+    ("serial", "i4"),
+    ("name", "S4"),
+    ("altloc", "S1"),
+    ("resname", "S3"),
+    ("chain", "S1"),
+    ("resseq", "i4"),
+    ("icode", "S1"),
+    ("xyz", "f4", (3,)),
+    ("occupancy", "f4"),
+    ("bfactor", "f4"),
+    ("element", "S2"),
+    ("model", "i4"),
+    ("offset", "i8"),
+])
+
+
+def record_index(buf) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (starts, ends, models) of the ATOM/HETATM lines of a PDB buffer (bytes, mmap,
+    ...): byte offset of each line, the offset just past its text (before any
+    CRLF), and its model index (0 when there are no MODEL records).
+    """
+    arr = np.frombuffer(buf, dtype=np.uint8)
+    n = len(arr)
+    nl = np.flatnonzero(arr == ord("\n"))
+    starts = np.concatenate([[0], nl + 1]).astype(np.int64)
+    ends = np.concatenate([nl, [n]]).astype(np.int64)
+    keep = starts < n
+    starts, ends = starts[keep], ends[keep]
+    if not len(starts):
+        empty = np.zeros(0, np.int64)
+        return empty, empty, np.zeros(0, np.int32)
+    cr = (ends > starts) & (arr[np.maximum(ends - 1, 0)] == ord("\r"))
+    ends = ends - cr
+
+    head = _columns(arr, starts, ends, 0, 6).view("S6").ravel()
+    is_atom = (head == b"ATOM  ") | (head == b"HETATM")
+    # Atoms before the first MODEL record stay in model 0, like Biopython
+    models = np.maximum(np.cumsum(head == b"MODEL ") - 1, 0).astype(np.int32)
+    return starts[is_atom], ends[is_atom], models[is_atom]
+
+
+def _columns(arr: np.ndarray, starts: np.ndarray, ends: np.ndarray, lo: int, hi: int) -> np.ndarray:
+    """(n_lines, hi - lo) byte matrix of columns lo..hi-1 of each line, space-padded past its end."""
+    idx = starts[:, None] + np.arange(lo, hi)
+    past = idx >= ends[:, None]
+    out = arr[np.minimum(idx, len(arr) - 1)]
+    out[past] = ord(" ")
+    return np.ascontiguousarray(out)
+
+
+def _ints(col: np.ndarray) -> np.ndarray:
+    stripped = np.char.strip(col)
+    out = np.zeros(len(col), dtype=np.int32)
+    ok = stripped != b""
+    if ok.any():
+        # Hybrid-36 or otherwise non-decimal fields are left at 0
+        try:
+            out[ok] = stripped[ok].astype(np.int64)
+        except ValueError:
+            out[ok] = [int(v) if v.lstrip(b"-").isdigit() else 0 for v in stripped[ok]]
+    return out
+
+
+def _floats(col: np.ndarray) -> np.ndarray:
+    stripped = np.char.strip(col)
+    out = np.zeros(len(col), dtype=np.float32)
+    ok = stripped != b""
+    if ok.any():
+        out[ok] = stripped[ok].astype(np.float64)
+    return out
+
+
+def read_atoms(data) -> np.ndarray:
+    """ATOM/HETATM records of PDB text (bytes or any buffer) as an ATOM_DTYPE array, in file order."""
+    starts, ends, models = record_index(data)
+    atoms = np.zeros(len(starts), dtype=ATOM_DTYPE)
+    if not len(starts):
+        return atoms
+    mat = _columns(np.frombuffer(data, dtype=np.uint8), starts, ends, 0, LINE_WIDTH)
+
+    def field(lo, hi):
+        return np.ascontiguousarray(mat[:, lo:hi]).view(f"S{hi - lo}").ravel()
+
+    atoms["record"] = field(0, 6)
+    atoms["serial"] = _ints(field(6, 11))
+    atoms["name"] = np.char.strip(field(12, 16))
+    atoms["altloc"] = field(16, 17)
+    atoms["resname"] = np.char.strip(field(17, 20))
+    atoms["chain"] = field(21, 22)
+    atoms["resseq"] = _ints(field(22, 26))
+    atoms["icode"] = field(26, 27)
+    atoms["xyz"][:, 0] = _floats(field(30, 38))
+    atoms["xyz"][:, 1] = _floats(field(38, 46))
+    atoms["xyz"][:, 2] = _floats(field(46, 54))
+    atoms["occupancy"] = _floats(field(54, 60))
+    atoms["bfactor"] = _floats(field(60, 66))
+    atoms["element"] = np.char.strip(field(76, 78))
+    atoms["model"] = models
+    atoms["offset"] = starts
+    return atoms
+
+
+def read_pdb(path: Path) -> np.ndarray:
+    return read_atoms(Path(path).read_bytes())
+
+
+def plan_chain_ids(chain: np.ndarray, model: np.ndarray) -> Dict[int, bytes]:
+    """
+    {model index -> new chain ID} for every model with blank-chain records, from
+    the per-atom chain and model columns. Raises ValueError when CHAIN_POOL runs out.
+    """
+    blank = np.isin(chain, (b"", b" "))
+    used = set(np.unique(chain[~blank]).tolist())
+    plan = {}
+    pool = iter(c.encode("ascii") for c in CHAIN_POOL)
+    for m in np.unique(model[blank]).tolist():
+        new_id = next((c for c in pool if c not in used), None)
+        if new_id is None:
+            raise ValueError("ran out of chain IDs to assign")
+        plan[m] = new_id
+        used.add(new_id)
+    return plan
+
+
+def chain_patches(buf) -> Tuple[str, np.ndarray, np.ndarray, int]:
+    """
+    Blank chain-ID fix of a PDB buffer (bytes, mmap, ...) as single-byte patches.
+    Returns (status, byte positions, new byte values, number of models fixed);
+    status is "no_atoms", "no_blanks", "fixed", or "short" when a blank-chain
+    record ends before column 22 and cannot be patched in place.
+    """
+    starts, ends, models = record_index(buf)
+    empty = np.zeros(0, np.int64)
+    if not len(starts):
+        return "no_atoms", empty, empty.astype(np.uint8), 0
+    arr = np.frombuffer(buf, dtype=np.uint8)
+    chain = _columns(arr, starts, ends, CHAIN_COL, CHAIN_COL + 1).view("S1").ravel()
+    plan = plan_chain_ids(chain, models)
+    if not plan:
+        return "no_blanks", empty, empty.astype(np.uint8), 0
+    blank = np.isin(chain, (b"", b" "))
+    pos = starts[blank] + CHAIN_COL
+    new_ids = np.array([plan[m][0] for m in models[blank].tolist()], dtype=np.uint8)
+    status = "short" if (pos >= ends[blank]).any() else "fixed"
+    return status, pos, new_ids, len(plan)
+
+
+def fix_blank_chains(data: bytes) -> Tuple[str, Optional[bytes], int]:
+    """
+    Fill blank chain IDs of PDB text.
+    Returns (status, patched bytes or None, number of models fixed) with status
+    "no_atoms", "no_blanks" (nothing to change) or "fixed".
+    """
+    status, pos, new_ids, n_fixed = chain_patches(data)
+    if status in ("no_atoms", "no_blanks"):
+        return status, None, 0
+    if status == "short":
+        return "fixed", _patch_with_padding(data, pos - CHAIN_COL, new_ids), n_fixed
+    buf = np.frombuffer(bytearray(data), dtype=np.uint8)
+    buf[pos] = new_ids
+    return "fixed", buf.tobytes(), n_fixed
+
+
+def _patch_with_padding(data: bytes, offsets: np.ndarray, new_ids: np.ndarray) -> bytes:
+    """Patch chain bytes line by line, padding records too short to hold column 22 (rare)."""
+    out = bytearray()
+    prev = 0
+    for off, new_id in zip(offsets.tolist(), new_ids.tolist()):
+        end = data.find(b"\n", off)
+        end = len(data) if end < 0 else end
+        line = data[off:end]
+        cr = line.endswith(b"\r")
+        body = bytearray(line[:-1] if cr else line)
+        if len(body) <= CHAIN_COL:
+            body.extend(b" " * (CHAIN_COL + 1 - len(body)))
+        body[CHAIN_COL] = new_id
+        out += data[prev:off] + body + (b"\r" if cr else b"")
+        prev = end
+    out += data[prev:]
+    return bytes(out)
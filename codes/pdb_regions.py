@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Typed, columnar loader and query API for Rfam's pdb_full_region.txt.
+
+The file has one tab-separated line per family hit on a PDB chain:
+
+  rfam_acc  pdb_id  chain  pdb_start  pdb_end  bit_score  evalue_score  cm_start  cm_end  hex_colour  is_significant
+
+The first load parses it into flat NumPy columns and saves them next to the
+text file as <file>.npz (uncompressed), with the size/mtime of the text file it
+came from; later loads read the .npz and rebuild it only when the text file
+changes. Rows are sorted by (family, PDB ID, chain, e-value, start) and the
+table carries:
+
+  family_offsets    rows of family k are [family_offsets[k], family_offsets[k+1])
+  chain_keys        sorted b"pdb_id\\tchain" keys, chain_rows / chain_offsets list
+                    the rows of each key (a PDB ID is a contiguous key range)
+  group_*           one entry per (family, PDB chain): its family, its lowest
+                    e-value overall and among significant hits
+
+so "families with >= N chains at e-value < X" is one comparison and a
+bincount over the groups, and a PDB / chain / residue-range lookup is a binary
+search plus a slice (well under a millisecond on the ~25k rows).
+
+Usage:
+  python pdb_regions.py build    ../data/pdb_full_region.txt
+  python pdb_regions.py families ../data/pdb_full_region.txt --min-chains 10 --max-evalue 1e-20 [--significant]
+  python pdb_regions.py family   ../data/pdb_full_region.txt RF00005
+  python pdb_regions.py pdb      ../data/pdb_full_region.txt 4v6v [--chain Ba] [--range 10-60]
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+CACHE_SUFFIX = ".npz"
+CACHE_VERSION = 1
+
+FIELDS = ["rfam_acc", "pdb_id", "chain", "pdb_start", "pdb_end", "bit_score", "evalue_score",
+          "cm_start", "cm_end", "hex_colour", "is_significant"]
+
+HEADER = ["rfam_acc", "pdb_id", "chain", "pdb_start", "pdb_end", "bit_score", "evalue_score",
+          "cm_start", "cm_end", "is_significant"]
+
+
+def cache_path_for(path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + CACHE_SUFFIX)
+
+
+def _stamp(path: Path) -> np.ndarray:
+    st = path.stat()
+    return np.array([CACHE_VERSION, st.st_size, st.st_mtime_ns], dtype=np.int64)
+
+
+def _csr(keys: np.ndarray, n: int) -> np.ndarray:
+    """Offsets of the runs of sorted integer keys 0..n-1."""
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n), out=offsets[1:])
+    return offsets
+
+
+class RegionTable:
+    """Columns of pdb_full_region.txt plus the family, chain and (family, chain) indexes."""
+
+    ARRAYS = ("families", "family", "family_offsets", "pdb_id", "chain", "pdb_start", "pdb_end",
+              "bit_score", "evalue", "cm_start", "cm_end", "colour", "significant",
+              "chain_keys", "chain_rows", "chain_offsets",
+              "group_family", "group_row", "group_min_evalue", "group_min_evalue_significant", "stamp")
+
+    def __init__(self, arrays):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self._family_pos = {f: i for i, f in enumerate(self.families.tolist())}
+
+    def __len__(self) -> int:
+        return len(self.family)
+
+    @classmethod
+    def parse(cls, path: Path) -> "RegionTable":
+        """Parse the text file and build the sorted columns and indexes."""
+        path = Path(path)
+        cols: List[List[str]] = [[] for _ in FIELDS]
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            for n, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                parts = line.split("\t")
+                if len(parts) != len(FIELDS):
+                    raise ValueError(f"{path}:{n}: expected {len(FIELDS)} tab-separated fields, got {len(parts)}")
+                for col, value in zip(cols, parts):
+                    col.append(value)
+
+        acc, pdb, chain, start, end, bits, evalue, cm_start, cm_end, colour, sig = cols
+        families, family = np.unique(np.array(acc, dtype="U"), return_inverse=True)
+        pdb_id = np.char.lower(np.array(pdb, dtype="S")) if pdb else np.zeros(0, dtype="S1")
+        chain_a = np.array(chain, dtype="S") if chain else np.zeros(0, dtype="S1")
+        columns = {
+            "family": family.astype(np.int32),
+            "pdb_id": pdb_id,
+            "chain": chain_a,
+            "pdb_start": np.array(start, dtype=np.int32),
+            "pdb_end": np.array(end, dtype=np.int32),
+            "bit_score": np.array(bits, dtype=np.float64),
+            "evalue": np.array(evalue, dtype=np.float64),
+            "cm_start": np.array(cm_start, dtype=np.int32),
+            "cm_end": np.array(cm_end, dtype=np.int32),
+            "colour": np.array(colour, dtype="S") if colour else np.zeros(0, dtype="S1"),
+            "significant": np.array(sig, dtype=np.int8).astype(bool),
+        }
+        order = np.lexsort((columns["pdb_start"], columns["evalue"], columns["chain"],
+                            columns["pdb_id"], columns["family"]))
+        arrays = {name: col[order] for name, col in columns.items()}
+        arrays["families"] = families
+        arrays["family_offsets"] = _csr(arrays["family"], len(families))
+
+        # PDB chain index
+        key = np.char.add(np.char.add(arrays["pdb_id"], b"\t"), arrays["chain"]) if len(order) \
+            else np.zeros(0, dtype="S1")
+        chain_keys, key_id = np.unique(key, return_inverse=True)
+        chain_rows = np.argsort(key_id, kind="stable")
+        arrays.update(chain_keys=chain_keys, chain_rows=chain_rows.astype(np.int64),
+                      chain_offsets=_csr(key_id, len(chain_keys)))
+
+        # (family, chain) groups: rows are sorted by e-value within a group, so its first row has the minimum
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = (arrays["family"][1:] != arrays["family"][:-1]) | (key[1:] != key[:-1])
+        group_row = np.flatnonzero(first)
+        group_id = np.cumsum(first) - 1
+        sig_evalue = np.where(arrays["significant"], arrays["evalue"], np.inf)
+        min_sig = np.full(len(group_row), np.inf)
+        np.minimum.at(min_sig, group_id, sig_evalue)
+        arrays.update(group_family=arrays["family"][group_row], group_row=group_row.astype(np.int64),
+                      group_min_evalue=arrays["evalue"][group_row], group_min_evalue_significant=min_sig,
+                      stamp=_stamp(path))
+        return cls(arrays)
+
+    @classmethod
+    def load(cls, path: Path) -> "RegionTable":
+        with np.load(path, allow_pickle=False) as z:
+            return cls({name: z[name] for name in cls.ARRAYS})
+
+    def save(self, path: Path):
+        tmp = Path(str(path) + ".tmp.npz")
+        np.savez(tmp, **{name: getattr(self, name) for name in self.ARRAYS})
+        os.replace(tmp, path)
+
+    # ---- queries -------------------------------------------------------------------------
+
+    def family_rows(self, accession: str) -> np.ndarray:
+        """Row indices of one family (empty if it has no PDB hits)."""
+        k = self._family_pos.get(accession)
+        if k is None:
+            return np.zeros(0, dtype=np.int64)
+        return np.arange(self.family_offsets[k], self.family_offsets[k + 1])
+
+    def chain_rows_for(self, pdb_id: str, chain: Optional[str] = None) -> np.ndarray:
+        """Row indices of one PDB entry, or of one of its chains."""
+        pdb = pdb_id.lower().encode()
+        if chain is not None:
+            key = pdb + b"\t" + chain.encode()
+            lo = int(np.searchsorted(self.chain_keys, key))
+            hi = lo + 1 if lo < len(self.chain_keys) and self.chain_keys[lo] == key else lo
+        else:
+            lo = int(np.searchsorted(self.chain_keys, pdb + b"\t"))
+            hi = int(np.searchsorted(self.chain_keys, pdb + b"\t\xff"))
+        return self.chain_rows[self.chain_offsets[lo]:self.chain_offsets[hi]]
+
+    def overlapping(self, pdb_id: str, chain: Optional[str], start: int, end: int) -> np.ndarray:
+        """Rows of a PDB entry / chain whose [pdb_start, pdb_end] overlaps [start, end] (either order)."""
+        rows = self.chain_rows_for(pdb_id, chain)
+        lo = np.minimum(self.pdb_start[rows], self.pdb_end[rows])
+        hi = np.maximum(self.pdb_start[rows], self.pdb_end[rows])
+        return rows[(lo <= max(start, end)) & (hi >= min(start, end))]
+
+    def families_with_chains(self, min_chains: int = 1, max_evalue: float = np.inf,
+                             significant_only: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """(accessions, chain counts) of families hitting >= min_chains PDB chains with e-value < max_evalue."""
+        min_evalue = self.group_min_evalue_significant if significant_only else self.group_min_evalue
+        counts = np.bincount(self.group_family[min_evalue < max_evalue], minlength=len(self.families))
+        keep = np.flatnonzero(counts >= min_chains)
+        return self.families[keep], counts[keep]
+
+    def row(self, i: int) -> list:
+        return [self.families[self.family[i]], self.pdb_id[i].decode(), self.chain[i].decode(),
+                int(self.pdb_start[i]), int(self.pdb_end[i]), float(self.bit_score[i]),
+                float(self.evalue[i]), int(self.cm_start[i]), int(self.cm_end[i]), int(self.significant[i])]
+
+
+def load_regions(path, rebuild: bool = False) -> RegionTable:
+    """
+    Return the table for pdb_full_region.txt, from <file>.npz when it matches
+    the text file's size/mtime, else parsed and (if possible) cached.
+    """
+    path = Path(path)
+    cache = cache_path_for(path)
+    if not rebuild and cache.is_file():
+        try:
+            table = RegionTable.load(cache)
+            if np.array_equal(table.stamp, _stamp(path)):
+                return table
+        except (OSError, KeyError, ValueError):
+            pass
+    table = RegionTable.parse(path)
+    try:
+        table.save(cache)
+    except OSError as e:
+        print(f"[WARN] Could not save region cache to {cache}: {e}")
+    return table
+
+
+def _print_rows(table: RegionTable, rows: np.ndarray):
+    print("\t".join(HEADER))
+    for i in rows:
+        print("\t".join(str(v) for v in table.row(int(i))))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Columnar loader and queries for Rfam pdb_full_region.txt")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_build = sub.add_parser("build", help="Parse the text file and write the .npz cache")
+    p_fams = sub.add_parser("families", help="Families hitting >= N PDB chains at e-value < X")
+    p_fam = sub.add_parser("family", help="All hits of one family")
+    p_pdb = sub.add_parser("pdb", help="Hits on a PDB entry, chain or residue range")
+    for p in (p_build, p_fams, p_fam, p_pdb):
+        p.add_argument("region_file", help="Path to pdb_full_region.txt")
+    p_fams.add_argument("--min-chains", type=int, default=1)
+    p_fams.add_argument("--max-evalue", type=float, default=np.inf)
+    p_fams.add_argument("--significant", action="store_true", help="Only count is_significant hits")
+    p_fam.add_argument("accession")
+    p_pdb.add_argument("pdb_id")
+    p_pdb.add_argument("--chain")
+    p_pdb.add_argument("--range", help="start-end in PDB residue numbering (overlap lookup)")
+    args = ap.parse_args()
+
+    table = load_regions(args.region_file, rebuild=args.cmd == "build")
+    t0 = time.perf_counter()
+    if args.cmd == "build":
+        print(f"[OK] {len(table)} rows, {len(table.families)} families, {len(table.chain_keys)} PDB chains. "
+              f"Cache: {cache_path_for(args.region_file)}")
+        return
+    if args.cmd == "families":
+        accs, counts = table.families_with_chains(args.min_chains, args.max_evalue, args.significant)
+        elapsed = time.perf_counter() - t0
+        print("rfam_acc\tpdb_chains")
+        for acc, n in zip(accs.tolist(), counts.tolist()):
+            print(f"{acc}\t{n}")
+        print(f"[INFO] {len(accs)} famil(ies), answered in {elapsed * 1e6:.0f} us")
+        return
+    if args.cmd == "family":
+        rows = table.family_rows(args.accession)
+    elif args.range:
+        start, _, end = args.range.partition("-")
+        rows = table.overlapping(args.pdb_id, args.chain, int(start), int(end or start))
+    else:
+        rows = table.chain_rows_for(args.pdb_id, args.chain)
+    elapsed = time.perf_counter() - t0
+    _print_rows(table, rows)
+    print(f"[INFO] {len(rows)} row(s), answered in {elapsed * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+One memory-mappable store for all RhoFold+ results.npz files.
+
+Every my_outputs/<URS>/results.npz (dist_n, dist_p, dist_c, ss_prob_map, plddt)
+is a separate compressed archive. pack copies their arrays, uncompressed, into
+a single raw file with a JSON offset index next to it:
+
+  rhofold_results.bin          array data, each array 64-byte aligned
+  rhofold_results.index.json   {URS: {"source", "stamp", "arrays": {name: [offset, dtype, shape]}}}
+
+Reading a structure is then a dict lookup plus zero-copy NumPy views on a
+read-only memory map (nothing is decompressed or copied until the values are
+used). New or changed predictions are appended to the end of the .bin and the
+index is rewritten (atomically, after the data), so existing bytes are never
+rewritten; a changed structure leaves its old bytes unreferenced until
+`compact`.
+
+Usage:
+  python results_store.py pack    --results-root .../rhofold+/str/my_outputs --store rhofold_results
+  python results_store.py show    --store rhofold_results URS00002C5007_9606_9-99_RF00053
+  python results_store.py compact --store rhofold_results
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+ALIGN = 64
+INDEX_VERSION = 1
+
+
+def store_paths(store: Path) -> Tuple[Path, Path]:
+    """(.bin, .index.json) of a store given by its path without suffix."""
+    store = Path(store)
+    return store.with_name(store.name + ".bin"), store.with_name(store.name + ".index.json")
+
+
+def _stamp(path: Path) -> List[int]:
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+class ResultsStore:
+    """Packed per-structure arrays: store[URS] -> {name: read-only array view}."""
+
+    def __init__(self, store: Path):
+        self.bin_path, self.index_path = store_paths(store)
+        self.entries: Dict[str, dict] = {}
+        if self.index_path.is_file():
+            index = json.loads(self.index_path.read_text(encoding="utf-8"))
+            if index.get("version") != INDEX_VERSION:
+                raise ValueError(f"{self.index_path}: unsupported index version {index.get('version')}")
+            self.entries = index["structures"]
+        self._mm: Optional[np.memmap] = None
+
+    # ---- reading -------------------------------------------------------------------------
+
+    def _map(self, needed: int) -> np.memmap:
+        # The file only grows; remap when appended data lies past the current mapping
+        if self._mm is None or len(self._mm) < needed:
+            self._mm = np.memmap(self.bin_path, dtype=np.uint8, mode="r")
+        return self._mm
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def names(self) -> List[str]:
+        return list(self.entries)
+
+    def array(self, name: str, key: str) -> np.ndarray:
+        """One array of one structure as a zero-copy view."""
+        offset, dtype, shape = self.entries[name]["arrays"][key]
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        mm = self._map(offset + nbytes)
+        return np.ndarray(tuple(shape), dtype=dtype, buffer=mm, offset=offset)
+
+    def __getitem__(self, name: str) -> Dict[str, np.ndarray]:
+        return {key: self.array(name, key) for key in self.entries[name]["arrays"]}
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, np.ndarray]]]:
+        for name in self.entries:
+            yield name, self[name]
+
+    # ---- writing -------------------------------------------------------------------------
+
+    def is_current(self, name: str, source: Path) -> bool:
+        e = self.entries.get(name)
+        return e is not None and e.get("stamp") == _stamp(source)
+
+    def append(self, items: Iterator[Tuple[str, Path]]) -> int:
+        """
+        Append the arrays of (name, results.npz) items not already stored with
+        the same source size/mtime; returns the number appended. The index is
+        saved once at the end.
+        """
+        added = 0
+        self.bin_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.bin_path, "ab") as f:
+            pos = f.tell()
+            for name, source in items:
+                if self.is_current(name, source):
+                    continue
+                arrays = {}
+                with np.load(source) as npz:
+                    for key in npz.files:
+                        a = np.ascontiguousarray(npz[key])
+                        pad = -pos % ALIGN
+                        f.write(b"\0" * pad)
+                        pos += pad
+                        f.write(a.tobytes())
+                        arrays[key] = [pos, a.dtype.str, list(a.shape)]
+                        pos += a.nbytes
+                self.entries[name] = {"source": str(source), "stamp": _stamp(source), "arrays": arrays}
+                added += 1
+            f.flush()
+            os.fsync(f.fileno())
+        if added:
+            self.save_index()
+        return added
+
+    def save_index(self):
+        tmp = self.index_path.with_name(self.index_path.name + f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"version": INDEX_VERSION, "structures": self.entries}), encoding="utf-8")
+        os.replace(tmp, self.index_path)
+
+    def dead_bytes(self) -> int:
+        """Bytes of the .bin no longer referenced by the index (replaced structures, alignment)."""
+        if not self.bin_path.is_file():
+            return 0
+        live = 0
+        for e in self.entries.values():
+            for _offset, dtype, shape in e["arrays"].values():
+                live += int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+        return self.bin_path.stat().st_size - live
+
+    def compact(self) -> int:
+        """Rewrite the store with only the referenced arrays; returns the bytes reclaimed."""
+        before = self.bin_path.stat().st_size if self.bin_path.is_file() else 0
+        tmp_bin = self.bin_path.with_name(self.bin_path.name + f".{os.getpid()}.tmp")
+        entries = {}
+        with open(tmp_bin, "wb") as f:
+            pos = 0
+            for name in self.entries:
+                arrays = {}
+                for key, a in self[name].items():
+                    pad = -pos % ALIGN
+                    f.write(b"\0" * pad)
+                    pos += pad
+                    f.write(a.tobytes())
+                    arrays[key] = [pos, a.dtype.str, list(a.shape)]
+                    pos += a.nbytes
+                entries[name] = dict(self.entries[name], arrays=arrays)
+        self._mm = None
+        os.replace(tmp_bin, self.bin_path)
+        self.entries = entries
+        self.save_index()
+        return before - pos
+
+
+def iter_results(results_root: Path) -> Iterator[Tuple[str, Path]]:
+    """(URS, results.npz) of every finished RhoFold+ output directory."""
+    for npz in sorted(Path(results_root).glob("*/results.npz")):
+        if not npz.parent.name.startswith("."):  # skip batch_inference.py's .partial-* directories
+            yield npz.parent.name, npz
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Pack RhoFold+ results.npz files into one memory-mapped store")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    pack = sub.add_parser("pack", help="Append new/changed results.npz files to the store")
+    pack.add_argument("--results-root", required=True, help="RhoFold+ my_outputs directory")
+    pack.add_argument("--store", required=True, help="Store path without suffix (.bin / .index.json)")
+    show = sub.add_parser("show", help="Print the arrays stored for structures")
+    show.add_argument("--store", required=True)
+    show.add_argument("names", nargs="*", help="URS names (default: a summary of the store)")
+    comp = sub.add_parser("compact", help="Drop bytes of replaced structures")
+    comp.add_argument("--store", required=True)
+    args = ap.parse_args()
+
+    store = ResultsStore(Path(args.store))
+    if args.cmd == "pack":
+        added = store.append(iter_results(Path(args.results_root)))
+        size = store.bin_path.stat().st_size / 1e6 if store.bin_path.is_file() else 0.0
+        print(f"[OK] {added} structure(s) packed, {len(store)} in {store.bin_path} ({size:.1f} MB)")
+    elif args.cmd == "show":
+        if not args.names:
+            print(f"{len(store)} structure(s), {store.dead_bytes() / 1e6:.1f} MB unreferenced")
+        for name in args.names:
+            if name not in store:
+                print(f"[WARN] {name}: not in the store")
+                continue
+            for key, a in store[name].items():
+                print(f"{name}\t{key}\t{a.dtype}\t{'x'.join(map(str, a.shape))}")
+    else:
+        freed = store.compact()
+        print(f"[OK] compacted {store.bin_path}: {freed / 1e6:.1f} MB reclaimed")
+
+
+if __name__ == "__main__":
+    main()
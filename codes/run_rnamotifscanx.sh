@@ -22,10 +22,20 @@ FASTA_ALL="${DATA_DIR}/human_seqs_non3d_rfams.fa"
 export RNAMOTIFSCANX_PATH="/home/s081p868/scratch/RNAMotifScanX-release"
 export RNAVIEW="$RNAMOTIFSCANX_PATH/thirdparty/RNAVIEW"
 
-SCAN_BIN="${RNAMOTIFSCANX_PATH}/bin/scan"
 MODELS_DIR="${RNAMOTIFSCANX_PATH}/models"
 
+# Directory holding motifscan_driver.py (sbatch copies the script, so prefer the submit dir)
+SCRIPT_DIR="${SLURM_SUBMIT_DIR:-$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)}"
+
 module load anaconda3
+
+# The driver itself needs Python 3; resolve it before the py27 env shadows python
+DRIVER_PY="${DRIVER_PY:-$(command -v python3 || true)}"
+if [[ -z "${DRIVER_PY}" ]]; then
+  echo "ERROR: Could not find a Python 3 interpreter for motifscan_driver.py" >&2
+  exit 2
+fi
+
 source activate py27
 
 # Use Python 2.7 explicitly
@@ -45,165 +55,41 @@ if [[ -f "${RNAMOTIFSCANX_PATH}/set_env.sh" ]]; then
   source "${RNAMOTIFSCANX_PATH}/set_env.sh" "${RNAMOTIFSCANX_PATH}"
 fi
 
-mkdir -p "${OUT_ROOT}"
-
-# ---- Constant 4-char tag + chain A ----
-TEMP_TAG="ABCD"   # FASTA header will be >ABCD_A
-
-# Extract one record and write FASTA with header ">${TEMP_TAG}_A" into OUT_ROOT
-extract_to_temp_fa() {
-  local header="$1" outfa="$2"
-  awk -v ID="$header" -v TAG="${TEMP_TAG}" '
-    BEGIN{want=0}
-    /^>/{
-      hdr=$0; sub(/^>/,"",hdr); sub(/ .*/, "", hdr)
-      if (hdr==ID) { print ">" TAG "_A"; want=1; next } else { want=0 }
-    }
-    want{ print }
-  ' "${FASTA_ALL}" > "${outfa}"
-}
-
-# Snapshot helpers (list files/dirs at depth 1 of OUT_ROOT)
-snap_files() { find "${OUT_ROOT}" -maxdepth 1 -mindepth 1 -type f -printf '%f\n' | sort; }
-snap_dirs()  { find "${OUT_ROOT}" -maxdepth 1 -mindepth 1 -type d -printf '%f\n' | sort; }
-
-# Run RNAMotifScanX scan for a given workdir (per-case folder)
-run_scan() {
-  local workdir="$1"
-  local models_dir="${MODELS_DIR}"
-  local pdb_dir="${workdir}"
-  local out_dir="${workdir}/Res_motifs_orig"
-
-  mkdir -p "${out_dir}"
-
-  # Choose inputs produced by PrepareInput.py
-  # Use the first *.rmsx.in_ and the first *.rmsx.nch in workdir
-  # (adjust patterns if your PrepareInput names differ)
-  local in_file nch_file
-  in_file="$(ls -1 "${pdb_dir}"/*.rmsx.in 2>/dev/null | head -n1 || true)"
-  nch_file="$(ls -1 "${pdb_dir}"/*.rmsx.nch 2>/dev/null | head -n1 || true)"
-
-  if [[ -z "${in_file}" || -z "${nch_file}" ]]; then
-    echo "WARNING: Could not find .rmsx.in_ and/or .rmsx.nch in ${pdb_dir}. Skipping scan."
-    return 0
-  fi
-
-  # Loop all model .struct files
-  shopt -s nullglob
-  local struct_file base_name
-  for struct_file in "${models_dir}"/*.struct; do
-    base_name="$(basename "${struct_file}" .struct)"
-    mkdir -p "${out_dir}/${base_name}"
-    echo "[scan] ${base_name}"
-    # Prefer ${SCAN_BIN}; fallback to ./bin/scan if not found
-    if [[ -x "${SCAN_BIN}" ]]; then
-      "${SCAN_BIN}" "${struct_file}" "${in_file}" --map_pdb="${nch_file}" --num_threads "${SLURM_CPUS_PER_TASK:-1}" > "${out_dir}/${base_name}/result.log"
-    else
-      ./bin/scan "${struct_file}" "${in_file}" --map_pdb="${nch_file}" --num_threads "${SLURM_CPUS_PER_TASK:-1}" > "${out_dir}/${base_name}/result.log"
-    fi
-  done
-}
-
-# Collect PDBs
-mapfile -t all_pdbs < <(find "${PDB_ROOT}" -type f -name "*.pdb" | sort)
-if [[ ${#all_pdbs[@]} -eq 0 ]]; then
-  echo "No .pdb files found under ${PDB_ROOT}"
-  exit 1
-fi
-
-# Support array runs: if SLURM_ARRAY_TASK_ID is set, process only that index; else process all
-if [[ -n "${SLURM_ARRAY_TASK_ID:-}" ]]; then
-  start_idx="${SLURM_ARRAY_TASK_ID}"
-  end_idx="${SLURM_ARRAY_TASK_ID}"
+# Tool -> input layout config: the normalized <tool>/str/<URS>.pdb trees written by
+# add_chain_to_str.py --config normalize_tools.json -> farfar_pdb, rhofold_pdb, alphafold_pdb.
+# Set TOOLS_CONFIG="" to scan only PDB_ROOT into OUT_ROOT as before.
+TOOLS_CONFIG="${TOOLS_CONFIG-${SCRIPT_DIR}/motifscan_tools.json}"
+if [[ -n "${TOOLS_CONFIG}" ]]; then
+  INPUT_ARGS=(--config "${TOOLS_CONFIG}")
 else
-  start_idx=0
-  end_idx=$((${#all_pdbs[@]} - 1))
+  mkdir -p "${OUT_ROOT}"
+  INPUT_ARGS=(--pdb-root "${PDB_ROOT}" --out-root "${OUT_ROOT}")
 fi
 
-for (( idx=${start_idx}; idx<=${end_idx}; idx++ )); do
-  pdb="${all_pdbs[$idx]}"
-  base="$(basename "${pdb}" .pdb)"
-  echo "=== [${idx}] Processing: ${base} ==="
-
-  workdir="${OUT_ROOT}/${base}"
-  mkdir -p "${workdir}"
-
-  # Clean leftovers with our tag in OUT_ROOT
-  rm -f "${OUT_ROOT}/${TEMP_TAG}.fa" \
-        "${OUT_ROOT}/${TEMP_TAG}.pdb" \
-        "${OUT_ROOT}/${TEMP_TAG}.pdb.mca" \
-        "${OUT_ROOT}/${TEMP_TAG}.pdb.out" || true
-
-  # Create fresh ABCD.fa / ABCD.pdb in OUT_ROOT
-  tmp_fa="${OUT_ROOT}/${TEMP_TAG}.fa"
-  tmp_pdb="${OUT_ROOT}/${TEMP_TAG}.pdb"
-
-  extract_to_temp_fa "${base}" "${tmp_fa}"
-  if ! grep -q "^>${TEMP_TAG}_A$" "${tmp_fa}"; then
-    echo "WARNING: No FASTA record found for '${base}' in ${FASTA_ALL} — skipping."
-    rm -f "${tmp_fa}"
-    continue
-  fi
-  cp -f "${pdb}" "${tmp_pdb}"
-
-  # ---- Snapshot OUT_ROOT before run ----
-  before_files="$(mktemp)"; before_dirs="$(mktemp)"
-  snap_files > "${before_files}"
-  snap_dirs  > "${before_dirs}"
-
-  # ---- Run PrepareInput inside OUT_ROOT ----
-  (
-    cd "${OUT_ROOT}"
-    echo "[debug] PrepareInput in: $(pwd)"
-    ls -l "${TEMP_TAG}.pdb" "${TEMP_TAG}.fa" || true
-    rm -f "${TEMP_TAG}.pdb.mca" "${TEMP_TAG}.pdb.out" || true
-    "${PY_EXE}" "${RNAMOTIFSCANX_PATH}/scripts/PrepareInput.py" "${TEMP_TAG}.pdb" "${TEMP_TAG}.fa"
-  )
-
-  # ---- Snapshot OUT_ROOT after run ----
-  after_files="$(mktemp)"; after_dirs="$(mktemp)"
-  snap_files > "${after_files}"
-  snap_dirs  > "${after_dirs}"
-
-  # ---- Compute new items (files & dirs) ----
-  new_files="$(mktemp)"; new_dirs="$(mktemp)"
-  comm -13 "${before_files}" "${after_files}" > "${new_files}" || true
-  comm -13 "${before_dirs}"  "${after_dirs}"  > "${new_dirs}"  || true
-
-  # ---- Copy NEW FILES into workdir, then delete from OUT_ROOT ----
-  while IFS= read -r f; do
-    [[ -z "${f}" ]] && continue
-    cp -f "${OUT_ROOT}/${f}" "${workdir}/"
-    rm -f "${OUT_ROOT}/${f}"
-  done < "${new_files}"
-
-  # ---- Copy NEW DIRS into workdir, then delete from OUT_ROOT ----
-  while IFS= read -r d; do
-    [[ -z "${d}" ]] && continue
-    if [[ -d "${workdir}/${d}" ]]; then
-      cp -rf "${OUT_ROOT}/${d}/." "${workdir}/${d}/"
-      rm -rf "${OUT_ROOT}/${d}"
-    else
-      cp -r "${OUT_ROOT}/${d}" "${workdir}/"
-      rm -rf "${OUT_ROOT}/${d}"
-    fi
-  done < "${new_dirs}"
-
-  # Ensure inputs ABCD.* also land in workdir (for auditing), then remove from OUT_ROOT
-  cp -f "${OUT_ROOT}/${TEMP_TAG}.fa"  "${workdir}/${TEMP_TAG}.fa"  || true
-  cp -f "${OUT_ROOT}/${TEMP_TAG}.pdb" "${workdir}/${TEMP_TAG}.pdb" || true
-  rm -f "${OUT_ROOT}/${TEMP_TAG}.fa" "${OUT_ROOT}/${TEMP_TAG}.pdb" || true
-
-  # Cleanup temp lists
-  rm -f "${before_files}" "${before_dirs}" "${after_files}" "${after_dirs}" "${new_files}" "${new_dirs}"
-
-  # =============== RUN SCAN for this case ===============
-  echo "[scan] models_dir=${MODELS_DIR}"
-  echo "[scan] pdb_dir=${workdir}"
-  echo "[scan] output_dir=${workdir}/Res_motifs"
-  run_scan "${workdir}"
-
-  echo "Done: ${base} → results in ${workdir}"
-done
+DRIVER_ARGS=(
+  "${INPUT_ARGS[@]}"
+  --fasta "${FASTA_ALL}"
+  --rnamotifscanx "${RNAMOTIFSCANX_PATH}"
+  --models-dir "${MODELS_DIR}"
+  --python2 "${PY_EXE}"
+  --cores "${SLURM_CPUS_PER_TASK:-1}"
+)
+
+# Merge stage of a sharded run (submit after the array finishes):
+#   sbatch --dependency=afterany:<array job id> run_rnamotifscanx.sh merge
+# Checks that every structure has all its steps and folds the shard manifests
+# into ${OUT_ROOT}/manifest.jsonl; exits non-zero while anything is missing.
+if [[ "${1:-}" == "merge" ]]; then
+  "${DRIVER_PY}" "${SCRIPT_DIR}/motifscan_array.py" merge -- "${DRIVER_ARGS[@]}"
+  exit $?
+fi
 
-echo "All done. Outputs under: ${OUT_ROOT}"
+# Prepare + scan every structure through the resumable driver. Completed steps are
+# recorded in ${OUT_ROOT}/manifest.jsonl, so a resubmitted job only does the missing work.
+# As an array job (sbatch --array=0-7 run_rnamotifscanx.sh) each task runs one of
+# SLURM_ARRAY_TASK_COUNT length-balanced shards and records it in manifest.shard-XXX.jsonl.
+NUM_SHARDS="${NUM_SHARDS:-${SLURM_ARRAY_TASK_COUNT:-}}"
+if [[ -n "${NUM_SHARDS}" ]]; then
+  DRIVER_ARGS+=(--shards "${NUM_SHARDS}")
+fi
+"${DRIVER_PY}" "${SCRIPT_DIR}/motifscan_driver.py" "${DRIVER_ARGS[@]}"
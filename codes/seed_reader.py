@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Shared, indexed reader for the Rfam.seed Stockholm alignment file.
+
+The first time a seed file is opened, one pass over it records where every
+family block starts and ends (byte offsets), together with the family
+accession (#=GF AC), ID (#=GF ID) and the number of sequence rows. The index is
+saved next to the seed file as <seed>.idx and reused for as long as the seed
+file's size and mtime are unchanged.
+
+Scripts then either use the index alone (accession/ID listing) or seek straight
+to the families they need and parse only those blocks, skipping covered
+families without tokenizing them.
+
+map_families() applies a per-family function either serially or across a
+process pool: the index is cut into contiguous, family-aligned byte ranges of
+roughly equal size, each worker reads and parses its own ranges, and results
+are handed back in index (accession) order so the output does not depend on
+the worker count.
+
+Usage:
+  python seed_reader.py /path/to/Rfam.seed            # build/refresh the index
+  python seed_reader.py /path/to/Rfam.seed --rebuild  # force a rebuild
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 1
+
+# Substring used throughout the project to pick human rows out of a family
+HUMAN_TAG = "_9606"
+
+
+class FamilyEntry(NamedTuple):
+    """One family block in the seed file: [start, end) byte range plus metadata."""
+    accession: str
+    name: str
+    start: int
+    end: int
+    n_seqs: int
+
+
+class SeedFamily(NamedTuple):
+    """Parsed family block: accession, ID, (seq_id, aligned_seq) rows in file order and the #=GC SS_cons line."""
+    accession: str
+    name: str
+    sequences: List[Tuple[str, str]]
+    ss_cons: str = ""
+
+
+def index_path_for(seed_path) -> Path:
+    seed_path = Path(seed_path)
+    return seed_path.with_name(seed_path.name + INDEX_SUFFIX)
+
+
+def _seed_signature(seed_path: Path) -> Tuple[int, int]:
+    st = seed_path.stat()
+    return st.st_size, st.st_mtime_ns
+
+
+def build_index(seed_path) -> List[FamilyEntry]:
+    """Scan the whole seed file once and return one FamilyEntry per '//'-terminated block."""
+    entries = []
+    offset = 0
+    start = 0
+    accession = None
+    name = ""
+    n_seqs = 0
+
+    with open(seed_path, "rb") as f:
+        for raw in f:
+            offset += len(raw)
+            line = raw.strip()
+
+            if line.startswith(b"#=GF AC"):
+                accession = line.split()[2].decode("utf-8", errors="ignore")
+            elif line.startswith(b"#=GF ID"):
+                name = b" ".join(line.split()[2:]).decode("utf-8", errors="ignore")
+            elif line.startswith(b"//"):
+                if accession:
+                    entries.append(FamilyEntry(accession, name, start, offset, n_seqs))
+                start = offset
+                accession = None
+                name = ""
+                n_seqs = 0
+            elif line and not line.startswith(b"#"):
+                n_seqs += 1
+
+    return entries
+
+
+def _write_index(idx_path: Path, entries: List[FamilyEntry], size: int, mtime_ns: int):
+    tmp = idx_path.with_name(idx_path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as out:
+        out.write(f"#seed_index\tversion={INDEX_VERSION}\tsize={size}\tmtime_ns={mtime_ns}\n")
+        for e in entries:
+            out.write(f"{e.accession}\t{e.name}\t{e.start}\t{e.end}\t{e.n_seqs}\n")
+    os.replace(tmp, idx_path)
+
+
+def _read_index(idx_path: Path, size: int, mtime_ns: int) -> Optional[List[FamilyEntry]]:
+    """Return the stored entries, or None if the index is missing or stale."""
+    if not idx_path.is_file():
+        return None
+    with idx_path.open("r", encoding="utf-8") as f:
+        header = f.readline().rstrip("\n").split("\t")
+        if not header or header[0] != "#seed_index":
+            return None
+        meta = dict(field.split("=", 1) for field in header[1:] if "=" in field)
+        if (meta.get("version") != str(INDEX_VERSION)
+                or meta.get("size") != str(size)
+                or meta.get("mtime_ns") != str(mtime_ns)):
+            return None
+        entries = []
+        for line in f:
+            acc, name, start, end, n_seqs = line.rstrip("\n").split("\t")
+            entries.append(FamilyEntry(acc, name, int(start), int(end), int(n_seqs)))
+    return entries
+
+
+def load_index(seed_path, rebuild: bool = False) -> List[FamilyEntry]:
+    """
+    Return the family index for seed_path, building and saving it if needed.
+    If the index cannot be written (e.g. read-only directory) it is kept in memory only.
+    """
+    seed_path = Path(seed_path)
+    size, mtime_ns = _seed_signature(seed_path)
+    idx_path = index_path_for(seed_path)
+
+    if not rebuild:
+        entries = _read_index(idx_path, size, mtime_ns)
+        if entries is not None:
+            return entries
+
+    entries = build_index(seed_path)
+    try:
+        _write_index(idx_path, entries, size, mtime_ns)
+    except OSError as e:
+        print(f"[WARN] Could not save seed index to {idx_path}: {e}")
+    return entries
+
+
+def parse_family_block(entry: FamilyEntry, block: bytes) -> SeedFamily:
+    """Tokenize one family block into (seq_id, aligned_seq) rows and the consensus structure."""
+    sequences = []
+    ss_cons = []
+    for line in block.decode("utf-8", errors="ignore").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("#"):
+            if line.startswith("#=GC SS_cons"):
+                ss_cons.append(line.split()[2])  # one piece per alignment block if interleaved
+            continue
+        parts = line.split()
+        if len(parts) == 2:
+            sequences.append((parts[0], parts[1]))
+    return SeedFamily(entry.accession, entry.name, sequences, "".join(ss_cons))
+
+
+def read_family(f, entry: FamilyEntry) -> SeedFamily:
+    """Seek to a family's block in an open binary seed file and parse it."""
+    f.seek(entry.start)
+    return parse_family_block(entry, f.read(entry.end - entry.start))
+
+
+def human_rows(family: SeedFamily) -> List[Tuple[str, str]]:
+    """(seq_id, aligned_seq) rows of a family whose ID carries the human tax ID."""
+    return [(seq_id, seq) for seq_id, seq in family.sequences if HUMAN_TAG in seq_id]
+
+
+def select_entries(entries: List[FamilyEntry],
+                   include: Optional[Iterable[str]] = None,
+                   exclude: Optional[Iterable[str]] = None) -> List[FamilyEntry]:
+    """Filter index entries by accession, keeping file order."""
+    include = set(include) if include is not None else None
+    exclude = set(exclude) if exclude is not None else set()
+    return [e for e in entries
+            if e.accession not in exclude and (include is None or e.accession in include)]
+
+
+def iter_families(seed_path,
+                  include: Optional[Iterable[str]] = None,
+                  exclude: Optional[Iterable[str]] = None) -> Iterator[SeedFamily]:
+    """
+    Yield parsed families in file order.
+      include: if given, only these accessions are read
+      exclude: accessions to skip (their blocks are never read)
+    """
+    entries = select_entries(load_index(seed_path), include, exclude)
+
+    with open(seed_path, "rb") as f:
+        for entry in entries:
+            yield read_family(f, entry)
+
+
+def plan_chunks(entries: List[FamilyEntry], n_chunks: int) -> List[List[FamilyEntry]]:
+    """
+    Split entries into at most n_chunks runs of consecutive families with
+    roughly equal byte totals. Order is preserved within and across chunks.
+    """
+    if not entries:
+        return []
+    n_chunks = max(1, min(n_chunks, len(entries)))
+    total = sum(e.end - e.start for e in entries)
+    target = total / n_chunks
+
+    chunks = []
+    current = []
+    current_bytes = 0
+    for e in entries:
+        current.append(e)
+        current_bytes += e.end - e.start
+        if current_bytes >= target and len(chunks) < n_chunks - 1:
+            chunks.append(current)
+            current = []
+            current_bytes = 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _process_chunk(seed_path: str, chunk: List[FamilyEntry],
+                   func: Callable[[SeedFamily], Any]) -> List[Tuple[str, Any]]:
+    """Worker: read the chunk's byte range in one go and apply func to each family in it."""
+    base = chunk[0].start
+    with open(seed_path, "rb") as f:
+        f.seek(base)
+        data = f.read(chunk[-1].end - base)
+    results = []
+    for e in chunk:
+        block = data[e.start - base:e.end - base]
+        results.append((e.accession, func(parse_family_block(e, block))))
+    return results
+
+
+def map_families(seed_path, func: Callable[[SeedFamily], Any], workers: int = 1,
+                 include: Optional[Iterable[str]] = None,
+                 exclude: Optional[Iterable[str]] = None,
+                 chunks_per_worker: int = 4) -> Iterator[Tuple[str, Any]]:
+    """
+    Yield (accession, func(family)) for the selected families, in file order.
+
+    With workers <= 1 everything runs in this process. Otherwise func must be
+    picklable (a module-level function); families are processed in
+    family-aligned chunks across a ProcessPoolExecutor and the results are
+    merged back in index order, so the output is identical to the serial path.
+    """
+    entries = select_entries(load_index(seed_path), include, exclude)
+
+    if workers <= 1:
+        with open(seed_path, "rb") as f:
+            for entry in entries:
+                yield entry.accession, func(read_family(f, entry))
+        return
+
+    chunks = plan_chunks(entries, workers * chunks_per_worker)
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futures = [ex.submit(_process_chunk, str(seed_path), chunk, func) for chunk in chunks]
+        # Futures are consumed in submission order, which is index order
+        for fut in futures:
+            yield from fut.result()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build or refresh the byte-offset index for an Rfam.seed file")
+    ap.add_argument("seed_file", help="Path to Rfam.seed")
+    ap.add_argument("--rebuild", action="store_true", help="Ignore any existing index and rebuild it")
+    args = ap.parse_args()
+
+    entries = load_index(args.seed_file, rebuild=args.rebuild)
+    total = sum(e.n_seqs for e in entries)
+    print(f"Indexed {len(entries)} families ({total} sequences). Index: {index_path_for(args.seed_file)}")
+
+
+if __name__ == "__main__":
+    main()
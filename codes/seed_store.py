@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Columnar, memory-mapped cache of the sequence rows in Rfam.seed.
+
+One conversion pass (through seed_reader) turns the seed file into a directory
+of NumPy arrays next to it (<seed>.store/), loaded later with mmap_mode="r":
+
+  families.npy       accession of every family, in file order
+  family_offsets.npy row range of family k is [family_offsets[k], family_offsets[k+1])
+  family.npy         family index of every row
+  seq_id.npy         sequence ID (bytes), e.g. b"URS00002C5007_9606/9-99"
+  tax_id.npy         first "_<digits>" group of the sequence ID, -1 if none
+  seq_offsets.npy    aligned sequence of row i is seq_data[seq_offsets[i]:seq_offsets[i+1]]
+  seq_data.npy       all aligned sequences concatenated (uint8, ASCII)
+  ungapped_len.npy   sequence length without '-' gaps
+  meta.json          seed size, mtime and SHA-1 the store was built from
+
+The store is rebuilt automatically when the seed file changes: a size/mtime
+mismatch triggers a hash check, and only a different hash forces a rebuild
+(a plain touch just refreshes the stored mtime).
+
+Usage:
+  python seed_store.py /path/to/Rfam.seed [--rebuild] [--workers N]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+from seed_reader import map_families
+
+STORE_SUFFIX = ".store"
+STORE_VERSION = 1
+
+# Gap symbol removed for ungapped lengths (same convention as human_seqs_with_stat_info.py)
+GAP_CHAR = "-"
+
+COLUMNS = ["families", "family_offsets", "family", "seq_id", "tax_id",
+           "seq_offsets", "seq_data", "ungapped_len"]
+
+_TAX_RE = re.compile(r"_(\d+)")
+
+
+def store_path_for(seed_path) -> Path:
+    seed_path = Path(seed_path)
+    return seed_path.with_name(seed_path.name + STORE_SUFFIX)
+
+
+def file_sha1(path, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _family_columns(family):
+    """Worker: per-family column fragments (seq_ids, tax_ids, concatenated sequences, lengths, ungapped lengths)."""
+    seq_ids = []
+    tax_ids = []
+    lengths = []
+    ungapped = []
+    for seq_id, seq in family.sequences:
+        seq_ids.append(seq_id.encode("utf-8"))
+        m = _TAX_RE.search(seq_id)
+        tax_ids.append(int(m.group(1)) if m else -1)
+        lengths.append(len(seq))
+        ungapped.append(len(seq) - seq.count(GAP_CHAR))
+    data = "".join(seq for _, seq in family.sequences).encode("ascii", errors="replace")
+    return seq_ids, tax_ids, data, lengths, ungapped
+
+
+def build_store(seed_path, store_dir: Optional[Path] = None, workers: int = 1) -> Path:
+    """Convert the seed file into the columnar store and return the store directory."""
+    seed_path = Path(seed_path)
+    store_dir = Path(store_dir) if store_dir else store_path_for(seed_path)
+    st = seed_path.stat()
+
+    families = []
+    family_counts = []
+    seq_ids = []
+    tax_ids = []
+    chunks = []
+    lengths = []
+    ungapped = []
+    for acc, (ids, taxes, data, lens, ungs) in map_families(seed_path, _family_columns, workers=workers):
+        families.append(acc)
+        family_counts.append(len(ids))
+        seq_ids.extend(ids)
+        tax_ids.extend(taxes)
+        chunks.append(data)
+        lengths.extend(lens)
+        ungapped.extend(ungs)
+
+    family_offsets = np.zeros(len(families) + 1, dtype=np.int64)
+    np.cumsum(family_counts, out=family_offsets[1:])
+    seq_offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=seq_offsets[1:])
+
+    arrays = {
+        "families": np.array(families, dtype="U"),
+        "family_offsets": family_offsets,
+        "family": np.repeat(np.arange(len(families), dtype=np.int32), family_counts),
+        "seq_id": np.array(seq_ids, dtype="S") if seq_ids else np.zeros(0, dtype="S1"),
+        "tax_id": np.array(tax_ids, dtype=np.int64),
+        "seq_offsets": seq_offsets,
+        "seq_data": np.frombuffer(b"".join(chunks), dtype=np.uint8),
+        "ungapped_len": np.array(ungapped, dtype=np.int32),
+    }
+
+    # Write into a sibling temp dir and swap it in, so a crash never leaves a half-built store
+    tmp_dir = store_dir.with_name(store_dir.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+    for name in COLUMNS:
+        np.save(tmp_dir / f"{name}.npy", arrays[name])
+    meta = {
+        "version": STORE_VERSION,
+        "seed_size": st.st_size,
+        "seed_mtime_ns": st.st_mtime_ns,
+        "seed_sha1": file_sha1(seed_path),
+        "n_families": len(families),
+        "n_rows": len(lengths),
+    }
+    (tmp_dir / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+    if store_dir.exists():
+        shutil.rmtree(store_dir)
+    os.replace(tmp_dir, store_dir)
+    return store_dir
+
+
+def _store_is_current(seed_path: Path, store_dir: Path) -> bool:
+    meta_path = store_dir / "meta.json"
+    if not meta_path.is_file() or not all((store_dir / f"{c}.npy").is_file() for c in COLUMNS):
+        return False
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    if meta.get("version") != STORE_VERSION:
+        return False
+
+    st = seed_path.stat()
+    if meta.get("seed_size") == st.st_size and meta.get("seed_mtime_ns") == st.st_mtime_ns:
+        return True
+    if meta.get("seed_size") != st.st_size or file_sha1(seed_path) != meta.get("seed_sha1"):
+        return False
+
+    # Same content, new mtime: remember the new mtime so the hash is not recomputed next time
+    meta["seed_mtime_ns"] = st.st_mtime_ns
+    meta_path.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    return True
+
+
+class SeedStore:
+    """Memory-mapped view of a built store directory."""
+
+    def __init__(self, store_dir):
+        self.store_dir = Path(store_dir)
+        for name in COLUMNS:
+            setattr(self, name, np.load(self.store_dir / f"{name}.npy", mmap_mode="r"))
+        self._family_index = {acc: k for k, acc in enumerate(self.families.tolist())}
+
+    def __len__(self) -> int:
+        return len(self.seq_id)
+
+    def family_index(self, accession: str) -> int:
+        return self._family_index[accession]
+
+    def family_rows(self, accession: str) -> Tuple[int, int]:
+        """[start, end) row range of a family."""
+        k = self._family_index[accession]
+        return int(self.family_offsets[k]), int(self.family_offsets[k + 1])
+
+    def raw_lengths(self) -> np.ndarray:
+        return np.diff(self.seq_offsets)
+
+    def sequence(self, row: int) -> str:
+        return self.seq_data[self.seq_offsets[row]:self.seq_offsets[row + 1]].tobytes().decode("ascii")
+
+    def seq_id_str(self, row: int) -> str:
+        return self.seq_id[row].decode("utf-8")
+
+    def family_mask(self, exclude=()) -> np.ndarray:
+        """Boolean row mask that is False for rows of the excluded families."""
+        keep = ~np.isin(self.families, list(exclude)) if exclude else np.ones(len(self.families), dtype=bool)
+        return keep[self.family]
+
+    def rows_matrix(self, rows: np.ndarray, pad: bytes = b"-") -> np.ndarray:
+        """
+        Aligned sequences of the selected rows as an (n, L) uint8 matrix.
+        Rows of one family share a length, so a contiguous family range is a
+        reshape of seq_data; otherwise shorter rows are padded with `pad`.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = self.seq_offsets[rows]
+        lengths = self.seq_offsets[rows + 1] - starts
+        width = int(lengths.max()) if len(rows) else 0
+        if (len(rows) and (lengths == width).all()
+                and (np.diff(rows) == 1).all()):
+            return np.asarray(self.seq_data[starts[0]:starts[0] + width * len(rows)]).reshape(len(rows), width)
+
+        matrix = np.full((len(rows), width), pad[0], dtype=np.uint8)
+        row_idx = np.repeat(np.arange(len(rows)), lengths)
+        seg_starts = np.cumsum(lengths) - lengths
+        col_idx = np.arange(int(lengths.sum())) - np.repeat(seg_starts, lengths)
+        matrix[row_idx, col_idx] = self.seq_data[np.repeat(starts, lengths) + col_idx]
+        return matrix
+
+    def seq_id_contains(self, needle: str) -> np.ndarray:
+        """Boolean row mask of seq_ids containing needle (e.g. "_9606")."""
+        return np.char.find(self.seq_id, needle.encode("utf-8")) >= 0
+
+
+def open_store(seed_path, store_dir: Optional[Path] = None, rebuild: bool = False, workers: int = 1) -> SeedStore:
+    """Load the store for seed_path, (re)building it first if missing or out of date."""
+    seed_path = Path(seed_path)
+    store_dir = Path(store_dir) if store_dir else store_path_for(seed_path)
+    if rebuild or not _store_is_current(seed_path, store_dir):
+        print(f"[INFO] Building seed store {store_dir} ...")
+        build_store(seed_path, store_dir, workers=workers)
+    return SeedStore(store_dir)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build or refresh the columnar store for an Rfam.seed file")
+    ap.add_argument("seed_file", help="Path to Rfam.seed")
+    ap.add_argument("--store-dir", help="Store directory (default: <seed>.store next to the seed file)")
+    ap.add_argument("--rebuild", action="store_true", help="Rebuild even if the store is current")
+    ap.add_argument("--workers", type=int, default=1, help="Worker processes used while building")
+    args = ap.parse_args()
+
+    store = open_store(args.seed_file, args.store_dir, rebuild=args.rebuild, workers=args.workers)
+    print(f"Store {store.store_dir}: {len(store.families)} families, {len(store)} sequences")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Vectorized per-sequence statistics for aligned RNA sequences.
+
+An alignment block is encoded once as an (n_rows, n_cols) uint8 matrix of
+ASCII codes. alignment_stats() then classifies every cell through a 256-entry
+lookup table and returns, for all rows in one call:
+
+  length        aligned length (columns)
+  ungapped_len  number of non-gap cells
+  gc_count      number of G/C cells
+  gc_pct        100 * gc_count / ungapped_len (0 for all-gap rows)
+  gap_frac      gap cells / aligned length
+  composition   (n_rows, 5) counts of A, C, G, U, other (non-gap, non-ACGU)
+
+Lower-case letters count as their upper-case base and T counts as U; with
+case_sensitive=True only upper-case letters are bases and lower-case ones count
+as "other" (the upper-case-only GC count of the older scripts).
+
+Streaming mode walks the seed store (seed_store.py) one family at a time, in
+row blocks of at most --max-rows sequences, so memory stays bounded by one
+block regardless of seed size. Results are written as one TSV row per sequence.
+
+Usage:
+  python seq_stats.py /path/to/Rfam.seed --out seed_seq_stats.tsv [--max-rows 4096]
+"""
+
+import argparse
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from seed_store import open_store
+
+# Default gap symbols in Rfam alignments; pass gap_chars=b"-" to match the older '-'-only scripts
+GAP_CHARS = b"-."
+
+BASES = "ACGU"
+BASES_AND_OTHER: List[str] = list(BASES) + ["other"]
+_A, _C, _G, _U, _OTHER, _GAP = range(6)
+
+
+def _class_table(gap_chars: bytes, case_sensitive: bool = False) -> np.ndarray:
+    lut = np.full(256, _OTHER, dtype=np.uint8)
+    for cls, chars in ((_A, b"A"), (_C, b"C"), (_G, b"G"), (_U, b"UT")):
+        if not case_sensitive:
+            chars += chars.lower()
+        lut[np.frombuffer(chars, dtype=np.uint8)] = cls
+    lut[np.frombuffer(gap_chars, dtype=np.uint8)] = _GAP
+    return lut
+
+
+def encode_alignment(seqs: Iterable[str], pad: bytes = b"-") -> np.ndarray:
+    """Encode aligned sequences as an (n, L) uint8 matrix; shorter rows are padded with `pad`."""
+    encoded = [s.encode("ascii", errors="replace") for s in seqs]
+    width = max((len(s) for s in encoded), default=0)
+    if all(len(s) == width for s in encoded):
+        return np.frombuffer(b"".join(encoded), dtype=np.uint8).reshape(len(encoded), width)
+    matrix = np.full((len(encoded), width), pad[0], dtype=np.uint8)
+    for i, s in enumerate(encoded):
+        matrix[i, :len(s)] = np.frombuffer(s, dtype=np.uint8)
+    return matrix
+
+
+def alignment_stats(matrix: np.ndarray, gap_chars: bytes = GAP_CHARS,
+                    case_sensitive: bool = False) -> Dict[str, np.ndarray]:
+    """Per-row length, ungapped length, GC count/%, gap fraction and base composition."""
+    n_rows, n_cols = matrix.shape
+    classes = _class_table(gap_chars, case_sensitive)[matrix]
+
+    # One bincount over (row, class) pairs gives the whole composition table
+    flat = (np.arange(n_rows, dtype=np.int64)[:, None] * 6 + classes).ravel()
+    counts = np.bincount(flat, minlength=n_rows * 6).reshape(n_rows, 6)
+
+    gaps = counts[:, _GAP]
+    ungapped = n_cols - gaps
+    gc = counts[:, _C] + counts[:, _G]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gc_pct = np.where(ungapped > 0, 100.0 * gc / ungapped, 0.0)
+        gap_frac = gaps / n_cols if n_cols else np.zeros(n_rows)
+
+    return {
+        "length": np.full(n_rows, n_cols, dtype=np.int64),
+        "ungapped_len": ungapped,
+        "gc_count": gc,
+        "gc_pct": gc_pct,
+        "gap_frac": gap_frac,
+        "composition": counts[:, :_GAP],
+    }
+
+
+def iter_family_stats(store, max_rows: int = 4096,
+                      gap_chars: bytes = GAP_CHARS) -> Iterator[Tuple[str, np.ndarray, Dict[str, np.ndarray]]]:
+    """
+    Stream (accession, rows, stats) over every family in a SeedStore, in file order.
+    Large families are split into blocks of at most max_rows rows.
+    """
+    for k, accession in enumerate(store.families):
+        lo, hi = int(store.family_offsets[k]), int(store.family_offsets[k + 1])
+        for start in range(lo, hi, max_rows):
+            rows = np.arange(start, min(start + max_rows, hi))
+            yield str(accession), rows, alignment_stats(store.rows_matrix(rows), gap_chars)
+
+
+def write_stats_tsv(store, out_path: Path, max_rows: int = 4096, gap_chars: bytes = GAP_CHARS) -> int:
+    """Write one TSV line per sequence in the store; returns the number of rows written."""
+    header = ["family", "seq_id", "length", "ungapped_len", "gc_pct", "gap_frac"] + BASES_AND_OTHER
+    n = 0
+    with open(out_path, "w", encoding="utf-8") as out:
+        out.write("\t".join(header) + "\n")
+        for accession, rows, st in iter_family_stats(store, max_rows, gap_chars):
+            comp = st["composition"]
+            for i, row in enumerate(rows):
+                fields = [
+                    accession,
+                    store.seq_id_str(row),
+                    str(st["length"][i]),
+                    str(st["ungapped_len"][i]),
+                    f"{st['gc_pct'][i]:.2f}",
+                    f"{st['gap_frac'][i]:.4f}",
+                ] + [str(c) for c in comp[i]]
+                out.write("\t".join(fields) + "\n")
+            n += len(rows)
+    return n
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-sequence length/GC/gap/composition stats for the whole seed")
+    ap.add_argument("seed_file", help="Path to Rfam.seed")
+    ap.add_argument("--out", default="seed_seq_stats.tsv", help="Output TSV")
+    ap.add_argument("--max-rows", type=int, default=4096, help="Max sequences encoded at once (bounds memory)")
+    ap.add_argument("--gap-chars", default=GAP_CHARS.decode(), help="Characters treated as gaps")
+    args = ap.parse_args()
+
+    store = open_store(args.seed_file)
+    n = write_stats_tsv(store, Path(args.out), args.max_rows, args.gap_chars.encode("ascii"))
+    print(f"Wrote stats for {n} sequences in {len(store.families)} families to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Secondary-structure accuracy of predicted structures against the Rfam consensus.
+
+References come from the seed alignment: the family's #=GC SS_cons (WUSS) is
+turned into a column pair table once per family and mapped onto each human row
+through its alignment columns (a consensus pair is kept when both columns hold
+a residue of that row, and is renumbered to the row's ungapped positions).
+
+Predictions are CT files (RhoFold+ writes my_outputs/<URS>/ss.ct) or dot-bracket
+files (.dbn: optional ">name" line, sequence line, structure line), e.g.
+annotated from the FARFAR2 / AlphaFold3 models. A file called ss.ct/ss.dbn is
+named after its directory, any other file after its stem; names are matched to
+seed rows the way the FASTA headers were built (sanitize_id(seq_id) + "_" + family,
+e.g. URS0000759977_9606/1-71 in RF00144 -> URS0000759977_9606_1-71_RF00144).
+
+Both sides are pair tables (partner index per position, -1 unpaired). All
+structures of a run are concatenated and scored in one vectorized pass:
+
+  precision = TP / predicted pairs      recall = TP / reference pairs
+  f1        = 2 TP / (predicted + reference pairs)
+  mcc       over all L(L-1)/2 possible pairs of the sequence
+
+A predicted pair counts as TP only if it is exactly a reference pair (no slip).
+Values are left empty when undefined. Structures whose sequence differs from
+the ungapped seed row are reported with status sequence_mismatch and not scored.
+
+Writes one row per (structure, tool) to data/ss_accuracy.csv (next to
+fasta_mapping_with_length_updated.csv and the motif tables) and prints the
+mean F1 / MCC per tool.
+
+Usage:
+  python ss_compare.py --seed-file Rfam.seed --rhofold-root ../predictions/rhofold+/str/my_outputs
+  python ss_compare.py --seed-file Rfam.seed --rhofold-root ... --farfar-root farfar_ss --alphafold-root af3_ss
+"""
+
+import argparse
+import csv
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from fasta_stream import sanitize_id
+from seed_reader import HUMAN_TAG, map_families
+
+DEFAULT_OUT = Path(__file__).resolve().parent.parent / "data" / "ss_accuracy.csv"
+
+# Gap symbols of seed rows
+GAP_CHARS = b"-."
+
+# WUSS base-pair brackets; pseudoknots are Aa, Bb, ... (upper case opens)
+BRACKETS = [("(", ")"), ("<", ">"), ("[", "]"), ("{", "}")] + \
+           [(chr(c), chr(c + 32)) for c in range(ord("A"), ord("Z") + 1)]
+
+STRUCTURE_SUFFIXES = (".ct", ".dbn")
+
+HEADER = ["file_name", "tool", "family", "length", "ref_pairs", "pred_pairs", "tp",
+          "precision", "recall", "f1", "mcc", "status"]
+
+
+# ---- parsers ------------------------------------------------------------------------------
+
+def pairs_from_dotbracket(structure: str) -> np.ndarray:
+    """
+    Pair table of a dot-bracket / WUSS string. Each bracket type is matched
+    without a Python stack: the nesting level of every bracket (running sum of
+    +1/-1 over that type's brackets) is computed with cumsum, and at one level
+    opens and closes alternate in position order, so a stable sort by level
+    pairs each open bracket with the close bracket that follows it.
+    """
+    s = np.frombuffer(structure.encode("ascii"), dtype=np.uint8)
+    pt = np.full(len(s), -1, dtype=np.int32)
+    for open_c, close_c in BRACKETS:
+        is_open = s == ord(open_c)
+        is_close = s == ord(close_c)
+        pos = np.flatnonzero(is_open | is_close)
+        if not len(pos):
+            continue
+        step = np.where(is_open[pos], 1, -1)
+        depth = np.cumsum(step)
+        if depth.min() < 0 or depth[-1] != 0:
+            raise ValueError(f"unbalanced '{open_c}{close_c}' in structure")
+        level = np.where(step > 0, depth, depth + 1)
+        pairs = pos[np.lexsort((pos, level))].reshape(-1, 2)
+        pt[pairs[:, 0]] = pairs[:, 1]
+        pt[pairs[:, 1]] = pairs[:, 0]
+    return pt
+
+
+def read_ct(path: Path) -> Tuple[str, np.ndarray]:
+    """(sequence, pair table) of the first structure in a CT file."""
+    lines = Path(path).read_text().splitlines()
+    n = int(lines[0].split()[0])
+    fields = np.array(" ".join(lines[1:1 + n]).split()).reshape(n, -1)
+    partner = fields[:, 4].astype(np.int32) - 1
+    sequence = "".join(fields[:, 1])
+    idx = np.arange(n)
+    paired = partner >= 0
+    if (partner >= n).any() or (partner[partner[paired]] != idx[paired]).any():
+        raise ValueError(f"{path}: pairs are not symmetric")
+    return sequence, partner
+
+
+def read_dotbracket(path: Path) -> Tuple[str, np.ndarray]:
+    """(sequence, pair table) of a .dbn file; a trailing energy like ' (-12.3)' is ignored."""
+    lines = [l.strip() for l in Path(path).read_text().splitlines() if l.strip()]
+    if lines and lines[0].startswith(">"):
+        lines = lines[1:]
+    if len(lines) < 2:
+        raise ValueError(f"{path}: expected a sequence and a structure line")
+    sequence, structure = lines[0], lines[1].split()[0]
+    if len(structure) != len(sequence):
+        raise ValueError(f"{path}: structure length {len(structure)} != sequence length {len(sequence)}")
+    return sequence, pairs_from_dotbracket(structure)
+
+
+def read_structure(path: Path) -> Tuple[str, np.ndarray]:
+    return read_ct(path) if Path(path).suffix.lower() == ".ct" else read_dotbracket(path)
+
+
+def iter_structure_files(root: Path) -> Iterator[Tuple[str, Path]]:
+    """(structure name, file) of every .ct / .dbn file below root."""
+    for dirpath, _dirnames, filenames in os.walk(root):
+        d = Path(dirpath)
+        if d.name.startswith("."):
+            continue  # batch_inference.py's .partial-* directories
+        for fn in sorted(filenames):
+            p = d / fn
+            if p.suffix.lower() in STRUCTURE_SUFFIXES:
+                yield (d.name if p.stem == "ss" else p.stem), p
+
+
+# ---- references ---------------------------------------------------------------------------
+
+def map_consensus(column_pt: np.ndarray, aligned: str) -> Tuple[str, np.ndarray]:
+    """(ungapped sequence, pair table) of one seed row under the consensus column pair table."""
+    row = np.frombuffer(aligned.encode("ascii", errors="replace"), dtype=np.uint8)
+    if len(row) != len(column_pt):
+        raise ValueError(f"aligned length {len(row)} != SS_cons length {len(column_pt)}")
+    residue = ~np.isin(row, np.frombuffer(GAP_CHARS, dtype=np.uint8))
+    pos = np.cumsum(residue) - 1
+    partner = np.where(column_pt >= 0, column_pt, 0)
+    keep = residue & (column_pt >= 0) & residue[partner]
+    pt = np.full(int(residue.sum()), -1, dtype=np.int32)
+    pt[pos[keep]] = pos[column_pt[keep]]
+    return row[residue].tobytes().decode("ascii"), pt
+
+
+def family_references(family) -> Dict[str, Tuple[str, np.ndarray]]:
+    """Worker: {structure name: (ungapped sequence, reference pair table)} of a family's human rows."""
+    if not family.ss_cons:
+        return {}
+    column_pt = pairs_from_dotbracket(family.ss_cons)
+    refs = {}
+    for seq_id, aligned in family.sequences:
+        if HUMAN_TAG in seq_id:
+            refs[f"{sanitize_id(seq_id)}_{family.accession}"] = map_consensus(column_pt, aligned)
+    return refs
+
+
+def load_references(seed_file: Path, families: List[str], workers: int = 1) -> Dict[str, Tuple[str, np.ndarray]]:
+    refs = {}
+    for _acc, fam_refs in map_families(seed_file, family_references, workers=workers, include=families):
+        refs.update(fam_refs)
+    return refs
+
+
+# ---- scoring ------------------------------------------------------------------------------
+
+def batch_scores(refs: List[np.ndarray], preds: List[np.ndarray]) -> Dict[str, np.ndarray]:
+    """Per-structure TP / pair counts, precision, recall, F1 and MCC (NaN where undefined)."""
+    lengths = np.array([len(r) for r in refs], dtype=np.int64)
+    n = len(lengths)
+    if not n:
+        return {k: np.zeros(0) for k in ("tp", "ref_pairs", "pred_pairs", "precision", "recall", "f1", "mcc")}
+    ref = np.concatenate(refs)
+    pred = np.concatenate(preds)
+    seg = np.repeat(np.arange(n), lengths)
+    local = np.arange(len(ref)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+    # Each pair is counted once, at its 5' position
+    ref_pair = ref > local
+    pred_pair = pred > local
+    tp = np.bincount(seg, weights=pred_pair & (pred == ref), minlength=n)
+    n_ref = np.bincount(seg, weights=ref_pair, minlength=n)
+    n_pred = np.bincount(seg, weights=pred_pair, minlength=n)
+    fp = n_pred - tp
+    fn = n_ref - tp
+    tn = lengths * (lengths - 1) / 2 - tp - fp - fn
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = tp / n_pred
+        recall = tp / n_ref
+        f1 = 2 * tp / (n_pred + n_ref)
+        mcc = (tp * tn - fp * fn) / np.sqrt((tp + fp) * (tp + fn) * (tn + fp) * (tn + fn))
+    return {"tp": tp, "ref_pairs": n_ref, "pred_pairs": n_pred,
+            "precision": precision, "recall": recall, "f1": f1, "mcc": mcc}
+
+
+def _normalize(seq: str) -> str:
+    return seq.upper().replace("T", "U")
+
+
+def _fmt(x: float) -> str:
+    return "" if np.isnan(x) else f"{x:.4f}"
+
+
+def compare_tool(tool: str, root: Path, refs: Dict[str, Tuple[str, np.ndarray]]) -> List[list]:
+    """Output rows for every structure file of one tool."""
+    scored: List[Tuple[str, str]] = []
+    ref_pts, pred_pts = [], []
+    rows = []
+    for name, path in iter_structure_files(root):
+        family = name.rsplit("_", 1)[-1]
+        if name not in refs:
+            rows.append([name, tool, family, "", "", "", "", "", "", "", "", "not_in_seed"])
+            continue
+        ref_seq, ref_pt = refs[name]
+        try:
+            seq, pt = read_structure(path)
+        except (ValueError, IndexError, OSError) as e:
+            print(f"[WARN] {path}: {e}")
+            rows.append([name, tool, family, len(ref_seq), "", "", "", "", "", "", "", "unreadable"])
+            continue
+        if _normalize(seq) != _normalize(ref_seq):
+            rows.append([name, tool, family, len(ref_seq), "", "", "", "", "", "", "", "sequence_mismatch"])
+            continue
+        scored.append((name, family))
+        ref_pts.append(ref_pt)
+        pred_pts.append(pt)
+
+    scores = batch_scores(ref_pts, pred_pts)
+    for k, (name, family) in enumerate(scored):
+        rows.append([name, tool, family, len(ref_pts[k]), int(scores["ref_pairs"][k]),
+                     int(scores["pred_pairs"][k]), int(scores["tp"][k]),
+                     _fmt(scores["precision"][k]), _fmt(scores["recall"][k]),
+                     _fmt(scores["f1"][k]), _fmt(scores["mcc"][k]), "ok"])
+    return sorted(rows, key=lambda r: r[0])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Base-pair accuracy of predicted secondary structures vs Rfam SS_cons")
+    ap.add_argument("--seed-file", required=True, help="Path to Rfam.seed")
+    ap.add_argument("--farfar-root",    help="FARFAR2 secondary structures (.ct / .dbn)")
+    ap.add_argument("--rhofold-root",   help="RhoFold+ my_outputs directory (<URS>/ss.ct)")
+    ap.add_argument("--alphafold-root", help="AlphaFold3 secondary structures (.ct / .dbn)")
+    ap.add_argument("--workers", type=int, default=1, help="Worker processes for seed parsing (1 = serial)")
+    ap.add_argument("--out", default=str(DEFAULT_OUT), help="Output CSV")
+    args = ap.parse_args()
+
+    roots = {tool: Path(value) for tool, value in (("farfar2", args.farfar_root), ("rhofold", args.rhofold_root),
+                                                   ("alphafold3", args.alphafold_root)) if value}
+    if not roots:
+        raise SystemExit("[ERROR] give at least one of --farfar-root/--rhofold-root/--alphafold-root")
+
+    families = sorted({name.rsplit("_", 1)[-1] for root in roots.values()
+                       for name, _path in iter_structure_files(root)})
+    refs = load_references(Path(args.seed_file), families, workers=args.workers)
+    print(f"[INFO] {len(refs)} reference structure(s) from {len(families)} famil(ies)")
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    sums: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0.0, 0, 0])
+    n_rows = 0
+    with out.open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(HEADER)
+        for tool, root in roots.items():
+            for row in compare_tool(tool, root, refs):
+                w.writerow(row)
+                n_rows += 1
+                acc = sums[tool]
+                acc[3] += 1
+                if row[9] and row[10]:
+                    acc[0] += float(row[9])
+                    acc[1] += float(row[10])
+                    acc[2] += 1
+
+    for tool, (f1, mcc, n, total) in sums.items():
+        if n:
+            print(f"[INFO] {tool:<10} mean F1 {f1 / n:.3f}, mean MCC {mcc / n:.3f} over {n} of {total} structures")
+        else:
+            print(f"[INFO] {tool:<10} no scored structures ({total} found)")
+    print(f"[OK] Wrote {n_rows} rows to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Small taxid -> scientific name cache used by fam_species_stats.py.
+
+The cache is a two-column TSV (taxid, name) holding only the taxa that occur in
+the seed file, so it loads in milliseconds and needs no network. It is read
+lazily on the first lookup. Taxids missing from it are looked up in the local
+ete3 NCBI taxonomy database, which is opened only at that point (and only if
+it already exists on disk, unless allow_download=True); any names found there
+are appended to the cache for next time. If taxids are still missing and no DB
+can be opened, a [WARN] says how to fill the cache.
+
+Build it once, either from an NCBI taxdump (names.dmp) or from the ete3 DB:
+  python taxonomy_cache.py --seed-file Rfam.seed --names-dmp taxdump/names.dmp --out taxid_names.tsv
+  python taxonomy_cache.py --seed-file Rfam.seed --from-ete3 --out taxid_names.tsv
+"""
+
+import argparse
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set
+
+DEFAULT_CACHE = Path(__file__).resolve().parent.parent / "data" / "taxid_names.tsv"
+ETE3_DEFAULT_DB = Path.home() / ".etetoolkit" / "taxa.sqlite"
+
+
+def read_cache(path: Path) -> Dict[int, str]:
+    names = {}
+    if not path.is_file():
+        return names
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            taxid, name = line.rstrip("\n").split("\t", 1)
+            names[int(taxid)] = name
+    return names
+
+
+def append_cache(path: Path, names: Dict[int, str]):
+    if not names:
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    new_file = not path.is_file()
+    with path.open("a", encoding="utf-8") as f:
+        if new_file:
+            f.write("#taxid\tname\n")
+        for taxid in sorted(names):
+            f.write(f"{taxid}\t{names[taxid]}\n")
+
+
+def _open_ete3(dbfile: Optional[Path], allow_download: bool):
+    """Open the ete3 NCBITaxa DB, or return None if ete3 or the DB file is unavailable."""
+    dbfile = Path(dbfile) if dbfile else ETE3_DEFAULT_DB
+    if not dbfile.is_file() and not allow_download:
+        return None
+    try:
+        from ete3 import NCBITaxa
+    except ImportError:
+        return None
+    return NCBITaxa(dbfile=str(dbfile))
+
+
+class TaxonomyCache:
+    """Lazy taxid -> name lookup backed by the TSV cache, falling back to ete3 for misses."""
+
+    def __init__(self, path: Path = DEFAULT_CACHE, ete3_db: Optional[Path] = None,
+                 allow_download: bool = False):
+        self.path = Path(path)
+        self.ete3_db = ete3_db
+        self.allow_download = allow_download
+        self._names = None
+        self._ncbi = None
+        self._warned = False
+
+    def _load(self) -> Dict[int, str]:
+        if self._names is None:
+            self._names = read_cache(self.path)
+        return self._names
+
+    def translate(self, taxids: Iterable[int]) -> Dict[int, str]:
+        """Return {taxid: name} for every taxid that can be resolved."""
+        names = self._load()
+        wanted = set(int(t) for t in taxids)
+        misses = wanted - names.keys()
+
+        if misses:
+            if self._ncbi is None:
+                self._ncbi = _open_ete3(self.ete3_db, self.allow_download)
+            if self._ncbi is not None:
+                found = {int(t): n for t, n in self._ncbi.get_taxid_translator(sorted(misses)).items()}
+                names.update(found)
+                try:
+                    append_cache(self.path, found)
+                except OSError as e:
+                    print(f"[WARN] Could not update taxonomy cache {self.path}: {e}")
+            elif not self._warned:
+                # Neither the TSV nor a taxonomy DB knows these taxa: say so instead of returning silently
+                self._warned = True
+                print(f"[WARN] {len(misses)} tax ID(s) not in the taxonomy cache {self.path} and no ete3 taxonomy DB "
+                      f"is available ({Path(self.ete3_db) if self.ete3_db else ETE3_DEFAULT_DB}); they stay unresolved. "
+                      f"Fill the cache with `python taxonomy_cache.py --seed-file Rfam.seed --names-dmp names.dmp` "
+                      f"(or --from-ete3), or pass allow_download=True to let ete3 download the DB.")
+
+        return {t: names[t] for t in wanted if t in names}
+
+
+def names_from_taxdump(names_dmp: Path, taxids: Optional[Set[int]] = None) -> Dict[int, str]:
+    """Scientific names from an NCBI taxdump names.dmp, optionally restricted to taxids."""
+    names = {}
+    with open(names_dmp, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            parts = [p.strip() for p in line.split("|")]
+            if len(parts) < 4 or parts[3] != "scientific name":
+                continue
+            taxid = int(parts[0])
+            if taxids is None or taxid in taxids:
+                names[taxid] = parts[1]
+    return names
+
+
+def seed_taxids(seed_file) -> Set[int]:
+    """All tax IDs that occur in the seed file (via the columnar seed store)."""
+    import numpy as np
+    from seed_store import open_store
+
+    store = open_store(seed_file)
+    return set(int(t) for t in np.unique(store.tax_id) if t >= 0)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build the compact taxid -> name cache")
+    ap.add_argument("--seed-file", help="Restrict the cache to tax IDs present in this Rfam.seed")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--names-dmp", help="NCBI taxdump names.dmp")
+    src.add_argument("--from-ete3", action="store_true", help="Use the local ete3 taxonomy DB")
+    ap.add_argument("--ete3-db", help=f"ete3 taxa.sqlite (default: {ETE3_DEFAULT_DB})")
+    ap.add_argument("--out", default=str(DEFAULT_CACHE), help="Cache TSV to write")
+    args = ap.parse_args()
+
+    taxids = seed_taxids(args.seed_file) if args.seed_file else None
+    if args.names_dmp:
+        names = names_from_taxdump(Path(args.names_dmp), taxids)
+    else:
+        if taxids is None:
+            raise SystemExit("[ERROR] --from-ete3 needs --seed-file to know which tax IDs to cache")
+        ncbi = _open_ete3(Path(args.ete3_db) if args.ete3_db else None, allow_download=True)
+        if ncbi is None:
+            raise SystemExit("[ERROR] ete3 is not installed")
+        names = {int(t): n for t, n in ncbi.get_taxid_translator(sorted(taxids)).items()}
+
+    out = Path(args.out)
+    if out.exists():
+        os.remove(out)
+    append_cache(out, names)
+    missing = len(taxids - names.keys()) if taxids is not None else 0
+    print(f"Wrote {len(names)} taxa to {out}" + (f" ({missing} tax IDs not found)" if missing else ""))
+
+
+if __name__ == "__main__":
+    main()
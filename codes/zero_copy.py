@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Kernel-side file copies for re-normalizing large batches of model files.
+
+  link_unchanged()  puts an unchanged input at the output path without copying
+                    data: a hard link, or a reflink (FICLONE, copy-on-write
+                    clone on btrfs/XFS), falling back to an in-kernel copy.
+  write_patched()   writes a copy of a file with a few bytes changed: the
+                    unchanged stretches are copied by the kernel
+                    (copy_file_range, else sendfile) and only the patched
+                    stretches pass through user space.
+
+Outputs are written to a temporary name next to the destination and renamed
+into place, so an existing output (possibly a hard link to an input) is
+replaced, never modified. A hard-linked output IS the input file: editing one
+in place edits the other, which is why "reflink" and "copy" are offered too.
+"""
+
+import errno
+import fcntl
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+# ioctl number of FICLONE (_IOW(0x94, 9, int)) on Linux
+FICLONE = 0x40049409
+
+# Patches closer together than this are written as one user-space block
+PATCH_GAP = 64 * 1024
+
+LINK_MODES = ("hardlink", "reflink", "copy")
+
+
+def _tmp_path(dst: Path) -> Path:
+    return dst.with_name(f".{dst.name}.{os.getpid()}.tmp")
+
+
+def copy_range(src_fd: int, dst_fd: int, offset: int, count: int) -> None:
+    """Append src[offset:offset+count] at the current position of dst_fd, in the kernel where possible."""
+    while count > 0:
+        try:
+            n = os.copy_file_range(src_fd, dst_fd, count, offset)
+        except (AttributeError, OSError):
+            n = _sendfile_or_read(src_fd, dst_fd, offset, count)
+        if n == 0:
+            raise OSError(errno.EIO, "unexpected end of file while copying")
+        offset += n
+        count -= n
+
+
+def _sendfile_or_read(src_fd: int, dst_fd: int, offset: int, count: int) -> int:
+    try:
+        return os.sendfile(dst_fd, src_fd, offset, count)
+    except (AttributeError, OSError):
+        data = os.pread(src_fd, min(count, 1 << 20), offset)
+        _write_all(dst_fd, data)
+        return len(data)
+
+
+def _reflink(src: Path, dst: Path) -> bool:
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
+        try:
+            fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+            return True
+        except OSError:
+            copy_range(fin.fileno(), fout.fileno(), 0, os.fstat(fin.fileno()).st_size)
+            return False
+
+
+def link_unchanged(src: Path, dst: Path, mode: str = "hardlink") -> str:
+    """
+    Make dst have the content of src. mode is "hardlink", "reflink" or "copy";
+    returns what was actually done ("hardlink", "reflink" or "copy"), since hard
+    links fall back to a copy across filesystems and reflinks where unsupported.
+    """
+    if mode not in LINK_MODES:
+        raise ValueError(f"unknown link mode '{mode}' (choose from {', '.join(LINK_MODES)})")
+    src, dst = Path(src), Path(dst)
+    if mode == "hardlink" and dst.exists() and os.path.samefile(src, dst):
+        return "hardlink"
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _tmp_path(dst)
+    try:
+        done = "copy"
+        if mode == "hardlink":
+            try:
+                os.link(src, tmp)
+                done = "hardlink"
+            except OSError:
+                done = "reflink" if _reflink(src, tmp) else "copy"
+        elif mode == "reflink":
+            done = "reflink" if _reflink(src, tmp) else "copy"
+        else:
+            with open(src, "rb") as fin, open(tmp, "wb") as fout:
+                copy_range(fin.fileno(), fout.fileno(), 0, os.fstat(fin.fileno()).st_size)
+        if done != "hardlink":
+            shutil.copystat(src, tmp)
+        os.replace(tmp, dst)
+        return done
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def _write_all(fd: int, data) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def write_patched(src: Path, dst: Path, positions, values, gap: int = PATCH_GAP) -> int:
+    """
+    Write src to dst with byte positions[i] set to values[i] (positions sorted).
+    Returns the number of bytes that went through user space.
+    """
+    src, dst = Path(src), Path(dst)
+    positions = np.asarray(positions, dtype=np.int64)
+    values = np.asarray(values, dtype=np.uint8)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _tmp_path(dst)
+    through_user_space = 0
+    try:
+        with open(src, "rb") as fin, open(tmp, "wb") as fout:
+            in_fd, out_fd = fin.fileno(), fout.fileno()
+            done = 0
+            # Patches within `gap` of their neighbour form one block read, patched and written here
+            for group in np.split(np.arange(len(positions)), np.flatnonzero(np.diff(positions) > gap) + 1):
+                if not len(group):
+                    continue
+                lo, hi = int(positions[group[0]]), int(positions[group[-1]]) + 1
+                copy_range(in_fd, out_fd, done, lo - done)
+                block = np.frombuffer(bytearray(os.pread(in_fd, hi - lo, lo)), dtype=np.uint8)
+                block[positions[group] - lo] = values[group]
+                _write_all(out_fd, block)
+                through_user_space += len(block)
+                done = hi
+            copy_range(in_fd, out_fd, done, os.fstat(in_fd).st_size - done)
+        shutil.copystat(src, tmp)
+        os.replace(tmp, dst)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return through_user_space
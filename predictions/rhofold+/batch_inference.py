@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Long-lived RhoFold+ runner: the model is built and the checkpoint loaded once,
+then every sequence is predicted by the same process (run_cuda.sh used to start
+inference.py per FASTA, paying ~3 s of model construction + checkpoint loading
+before each ~6 s prediction).
+
+Sequences come either from split_fa/*.fasta (one record per file, as written by
+multi_to_single_fasta.py) or straight from a multi-FASTA through its offset index
+(codes/fasta_index.py). A reader thread puts them on a queue; the main thread
+groups them into length buckets (--bucket-width nt) and hands a bucket to the
+predictor once it holds --batch-size sequences (or when the queue runs dry), so
+consecutive predictions have similar shapes. RhoFold itself has no padding
+masks, so RhoFoldPredictor runs the sequences of a batch one after another;
+a predictor that can truly batch only needs to override predict_batch().
+
+Outputs keep the inference.py layout, one directory per record named after the
+header with '/' and '|' replaced by '_':
+
+  my_outputs/<URS>/unrelaxed_model.pdb, ss.ct, results.npz, log.txt,
+                   relaxed_<N>_model.pdb (Amber, --relax-steps N, default 1000 like
+                   inference.py; run_cuda.sh passes 0 and relaxes with relax_queue.py)
+
+Each directory is written under a temporary name and renamed when complete, and
+records whose directory already exists are skipped, so an interrupted run can
+simply be restarted.
+
+--predictor stub writes outputs of the same names, shapes and formats without
+torch or a checkpoint (an ideal A-form-like trace, no pairs), for testing the
+queueing, batching and layout on a CPU-only machine.
+
+Run from the RhoFold repository root (like inference.py):
+  python batch_inference.py --input-dir split_fa --output-dir my_outputs --device cuda:0 \\
+      --ckpt pretrained/RhoFold_pretrained.pt
+  python batch_inference.py --input-fas human_multi_fasta.fasta --output-dir my_outputs --predictor stub
+"""
+
+import argparse
+import logging
+import math
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "codes"))
+from fasta_index import FastaIndex
+from fasta_stream import iter_fasta, safe_filename
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s: %(message)s"
+OUTPUT_FILES = ("unrelaxed_model.pdb", "ss.ct", "results.npz")
+DIST_BINS = 40
+
+_DONE = object()
+
+
+class StructureJob:
+    """One sequence to predict and the directory its outputs go to."""
+
+    def __init__(self, header: str, seq: str, out_dir: Path, fasta_path: Optional[Path] = None):
+        self.header = header
+        self.seq = seq
+        self.out_dir = Path(out_dir)
+        self.fasta_path = fasta_path
+
+    @property
+    def name(self) -> str:
+        return self.out_dir.name
+
+    def __len__(self) -> int:
+        return len(self.seq)
+
+
+def is_done(out_dir: Path) -> bool:
+    return all((out_dir / f).is_file() for f in OUTPUT_FILES)
+
+
+def iter_jobs(args) -> Iterator[StructureJob]:
+    """Jobs from --input-dir (one FASTA per record) or --input-fas (indexed multi-FASTA), skipping finished ones."""
+    out_root = Path(args.output_dir)
+    if args.input_dir:
+        for fa in sorted(Path(args.input_dir).glob("*.fasta")):
+            for header, lines in iter_fasta(fa):
+                yield StructureJob(header, "".join(l.strip() for l in lines),
+                                   out_root / safe_filename(header), fasta_path=fa)
+                break  # one record per file, like inference.py reads it
+    else:
+        idx = FastaIndex(Path(args.input_fas))
+        for name in idx.names():
+            yield StructureJob(name, idx.sequence(name), out_root / safe_filename(name))
+
+
+def feed_queue(jobs: Iterator[StructureJob], q: queue.Queue, skip_done: bool, counts: Dict[str, int],
+               errors: List[BaseException]):
+    """Reader thread: put pending jobs on the queue, then the end marker; a read error is kept in `errors`."""
+    try:
+        for job in jobs:
+            if skip_done and is_done(job.out_dir):
+                counts["skipped"] += 1
+                continue
+            q.put(job)
+    except BaseException as e:
+        errors.append(e)
+    finally:
+        q.put(_DONE)
+
+
+def length_batches(q: queue.Queue, bucket_width: int, batch_size: int,
+                   max_wait: float) -> Iterator[List[StructureJob]]:
+    """
+    Group queued jobs into batches of similar length: jobs go to bucket
+    len // bucket_width; a bucket is emitted once it holds batch_size jobs. When
+    nothing arrives for max_wait seconds the fullest bucket is emitted, and at
+    the end the remaining buckets are emitted shortest first.
+    """
+    buckets: Dict[int, List[StructureJob]] = {}
+    while True:
+        try:
+            job = q.get(timeout=max_wait)
+        except queue.Empty:
+            if buckets:
+                key = max(buckets, key=lambda k: (len(buckets[k]), -k))
+                yield buckets.pop(key)
+            continue
+        if job is _DONE:
+            break
+        bucket = buckets.setdefault(len(job) // bucket_width, [])
+        bucket.append(job)
+        if len(bucket) >= batch_size:
+            yield buckets.pop(len(job) // bucket_width)
+    for key in sorted(buckets):
+        yield buckets[key]
+
+
+class Predictor:
+    """Builds its model once in load(), then predicts batches of jobs into the given directories."""
+
+    name = "base"
+
+    def load(self, log: logging.Logger):
+        pass
+
+    def predict_batch(self, jobs: List[StructureJob], out_dirs: List[Path],
+                      logs: List[logging.Logger]) -> List[Optional[str]]:
+        """Predict every job of a batch; the error message of each job, or None when it succeeded."""
+        errors: List[Optional[str]] = []
+        for job, out_dir, log in zip(jobs, out_dirs, logs):
+            log.info("Started RhoFold Inference")
+            t0 = time.perf_counter()
+            try:
+                self.predict(job, out_dir, log)
+            except Exception as e:
+                log.error(f"Inference failed: {e}")
+                errors.append(str(e) or type(e).__name__)
+                continue
+            log.info(f"Finished RhoFold Inference in {time.perf_counter() - t0:.3f} seconds")
+            errors.append(None)
+        return errors
+
+    def predict(self, job: StructureJob, out_dir: Path, log: logging.Logger):
+        raise NotImplementedError
+
+
+class RhoFoldPredictor(Predictor):
+    """RhoFold+ single-sequence prediction, as inference.py --single_seq_pred True does it."""
+
+    name = "rhofold"
+
+    def __init__(self, ckpt: Path, device: str, relax_steps: int = 0):
+        self.ckpt = Path(ckpt)
+        self.device = device
+        self.relax_steps = relax_steps
+        self.model = None
+
+    def load(self, log: logging.Logger):
+        import torch
+        from rhofold.config import rhofold_config
+        from rhofold.rhofold import RhoFold
+
+        if self.device.startswith("cuda") and not torch.cuda.is_available():
+            log.warning(f"    {self.device} not available, using cpu")
+            self.device = "cpu"
+        log.info("Constructing RhoFold")
+        self.model = RhoFold(rhofold_config)
+        log.info(f"    loading {self.ckpt}")
+        self.model.load_state_dict(torch.load(self.ckpt, map_location=torch.device("cpu"))["model"])
+        self.model.eval()
+        self.model.to(self.device)
+
+    def predict(self, job: StructureJob, out_dir: Path, log: logging.Logger):
+        import torch
+        from rhofold.utils import save_ss2ct
+        from rhofold.utils.alphabet import get_features
+
+        with tempfile.TemporaryDirectory() as tmp:
+            fasta = job.fasta_path
+            if fasta is None:
+                fasta = Path(tmp) / "input.fasta"
+                fasta.write_text(f">{job.header}\n{job.seq}\n")
+            log.info(f"Input_fas {fasta}")
+            log.info("Input_a3m is None, the modeling will run using single sequence only (input_fas)")
+            with torch.no_grad():
+                data_dict = get_features(str(fasta), str(fasta))
+                outputs = self.model(tokens=data_dict["tokens"].to(self.device),
+                                     rna_fm_tokens=data_dict["rna_fm_tokens"].to(self.device),
+                                     seq=data_dict["seq"])
+            output = outputs[-1]
+
+        # Secondary structure, .ct format
+        ss_prob_map = torch.sigmoid(output["ss"][0, 0]).data.cpu().numpy()
+        save_ss2ct(ss_prob_map, data_dict["seq"], str(out_dir / "ss.ct"), threshold=0.5)
+        # Distance and secondary structure probability maps, .npz format
+        np.savez_compressed(out_dir / "results.npz",
+                            dist_n=torch.softmax(output["n"].squeeze(0), dim=0).data.cpu().numpy(),
+                            dist_p=torch.softmax(output["p"].squeeze(0), dim=0).data.cpu().numpy(),
+                            dist_c=torch.softmax(output["c4_"].squeeze(0), dim=0).data.cpu().numpy(),
+                            ss_prob_map=ss_prob_map,
+                            plddt=output["plddt"][0].data.cpu().numpy())
+        unrelaxed = out_dir / "unrelaxed_model.pdb"
+        node_cords_pred = output["cord_tns_pred"][-1].squeeze(0)
+        self.model.structure_module.converter.export_pdb_file(
+            data_dict["seq"], node_cords_pred.data.cpu().numpy(), path=str(unrelaxed), chain_id=None,
+            confidence=output["plddt"][0].data.cpu().numpy(), logger=log)
+
+        if self.relax_steps > 0:
+            from rhofold.relax.relax import AmberRelaxation
+            log.info(f"Started Amber Relaxation : {self.relax_steps} iterations")
+            amber_relax = AmberRelaxation(max_iterations=self.relax_steps, logger=log)
+            amber_relax.process(str(unrelaxed), str(out_dir / f"relaxed_{self.relax_steps}_model.pdb"))
+
+
+class StubPredictor(Predictor):
+    """
+    Writes RhoFold-shaped outputs without a model: an ideal helical trace (P and
+    C4' per residue), an unpaired ss.ct and flat probability maps; the "relaxed"
+    model is the same trace with chain A. `delay` seconds per 100 nt simulate
+    inference time.
+    """
+
+    name = "stub"
+
+    def __init__(self, delay: float = 0.0, relax_steps: int = 0):
+        self.delay = delay
+        self.relax_steps = relax_steps
+
+    def load(self, log: logging.Logger):
+        log.info("Constructing stub predictor (no model, no checkpoint)")
+
+    def predict(self, job: StructureJob, out_dir: Path, log: logging.Logger):
+        L = len(job.seq)
+        if self.delay:
+            time.sleep(self.delay * L / 100)
+        with open(out_dir / "ss.ct", "w") as f:
+            f.write(f"{L}\n")
+            for i, base in enumerate(job.seq, start=1):
+                f.write(f"{i}\t{base}\t{i - 1}\t{i + 1 if i < L else 0}\t0\t{i}\n")
+        ss = np.zeros((L, L), dtype=np.float32)
+        dist = np.full((DIST_BINS, L, L), 1.0 / DIST_BINS, dtype=np.float32)
+        plddt = np.full((1, L), 50.0, dtype=np.float32)
+        np.savez_compressed(out_dir / "results.npz", dist_n=dist, dist_p=dist, dist_c=dist,
+                            ss_prob_map=ss, plddt=plddt)
+        lines = []
+        serial = 0
+        for i, base in enumerate(job.seq, start=1):
+            # A-form-like helix: 32.7 degrees and 2.8 A rise per residue
+            angle = math.radians(32.7 * i)
+            for atom, radius, dz in (("P", 8.9, 0.0), ("C4'", 7.8, 1.0)):
+                serial += 1
+                x, y, z = radius * math.cos(angle), radius * math.sin(angle), 2.8 * i + dz
+                lines.append(f"ATOM  {serial:>5} {' ' + atom:<4} {base:>3} 0{i:>4}    "
+                             f"{x:>8.3f}{y:>8.3f}{z:>8.3f}{1.0:>6.2f}{50.0:>6.2f}           {atom[0]}  \n")
+        (out_dir / "unrelaxed_model.pdb").write_text("".join(lines) + "TER\nEND\n")
+        log.info(f"    Export PDB file to {out_dir / 'unrelaxed_model.pdb'}")
+        if self.relax_steps > 0:
+            relaxed = "".join(l[:21] + "A" + l[22:] for l in lines)
+            (out_dir / f"relaxed_{self.relax_steps}_model.pdb").write_text(relaxed + "TER\nEND\n")
+
+
+def job_logger(log_path: Path) -> logging.Logger:
+    """Logger writing one structure's log.txt (and the console), in inference.py's format."""
+    log = logging.getLogger(f"rhofold_batch.{log_path.parent.name}")
+    log.setLevel(logging.INFO)
+    log.propagate = True
+    handler = logging.FileHandler(log_path)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    log.addHandler(handler)
+    return log
+
+
+def close_logger(log: logging.Logger):
+    for handler in list(log.handlers):
+        handler.close()
+        log.removeHandler(handler)
+
+
+def run_batch(predictor: Predictor, batch: List[StructureJob], load_info: str,
+              main_log: logging.Logger) -> int:
+    """Predict one batch into temporary directories and move the finished ones into place; returns failures."""
+    partial = []
+    logs = []
+    for job in batch:
+        tmp_dir = job.out_dir.with_name(f".partial-{job.name}")
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir(parents=True)
+        partial.append(tmp_dir)
+        log = job_logger(tmp_dir / "log.txt")
+        log.info(load_info)
+        logs.append(log)
+
+    t0 = time.perf_counter()
+    try:
+        errors = predictor.predict_batch(batch, partial, logs)
+    finally:
+        for log in logs:
+            close_logger(log)
+
+    failed = 0
+    for job, tmp_dir, error in zip(batch, partial, errors):
+        if error is not None:
+            main_log.error(f"{job.name}: {error} (partial outputs left in {tmp_dir})")
+            failed += 1
+            continue
+        if job.out_dir.exists():
+            shutil.rmtree(job.out_dir)
+        tmp_dir.rename(job.out_dir)
+    main_log.info(f"[batch] {len(batch)} structure(s) of {min(map(len, batch))}-{max(map(len, batch))} nt "
+                  f"in {time.perf_counter() - t0:.1f}s, {failed} failed")
+    return failed
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Batched RhoFold+ inference with the model loaded once")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--input-dir", help="Directory of single-record *.fasta files (split_fa)")
+    src.add_argument("--input-fas", help="Multi-FASTA, read through its offset index")
+    ap.add_argument("--output-dir", default="my_outputs", help="One <header>/ directory per record")
+    ap.add_argument("--predictor", choices=["rhofold", "stub"], default="rhofold")
+    ap.add_argument("--ckpt", default="pretrained/RhoFold_pretrained.pt")
+    ap.add_argument("--device", default="cuda:0", help="cuda:N or cpu (falls back to cpu without CUDA)")
+    ap.add_argument("--relax-steps", type=int, default=1000,
+                    help="Amber relaxation iterations run after each prediction, as inference.py does (0 = none)")
+    ap.add_argument("--bucket-width", type=int, default=20, help="Sequence-length bucket width (nt)")
+    ap.add_argument("--batch-size", type=int, default=8, help="Sequences per batch")
+    ap.add_argument("--queue-size", type=int, default=256, help="Most sequences read ahead")
+    ap.add_argument("--max-wait", type=float, default=2.0,
+                    help="Seconds without new sequences before a partial bucket is run")
+    ap.add_argument("--stub-delay", type=float, default=0.0, help="Stub predictor: seconds per 100 nt")
+    ap.add_argument("--force", action="store_true", help="Redo records whose outputs already exist")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    main_log = logging.getLogger("rhofold_batch")
+
+    # Fail before loading the model if there is nothing to read (e.g. started outside the RhoFold root)
+    if args.input_dir and not any(Path(args.input_dir).glob("*.fasta")):
+        raise SystemExit(f"[ERROR] no *.fasta files in --input-dir {args.input_dir}")
+    if args.input_fas and not Path(args.input_fas).is_file():
+        raise SystemExit(f"[ERROR] --input-fas {args.input_fas} not found")
+
+    if args.predictor == "stub":
+        predictor: Predictor = StubPredictor(delay=args.stub_delay, relax_steps=args.relax_steps)
+    else:
+        predictor = RhoFoldPredictor(Path(args.ckpt), args.device, relax_steps=args.relax_steps)
+    t0 = time.perf_counter()
+    try:
+        predictor.load(main_log)
+    except ImportError as e:
+        raise SystemExit(f"[ERROR] {e}: run from the RhoFold repository in its environment, or use --predictor stub")
+    load_s = time.perf_counter() - t0
+    load_info = f"Using the {predictor.name} model loaded once for this run ({load_s:.3f} seconds)"
+    main_log.info(f"[load] {predictor.name} model ready in {load_s:.1f}s")
+
+    Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+    counts = {"skipped": 0}
+    reader_errors: List[BaseException] = []
+    q: queue.Queue = queue.Queue(maxsize=max(1, args.queue_size))
+    reader = threading.Thread(target=feed_queue, args=(iter_jobs(args), q, not args.force, counts, reader_errors),
+                              daemon=True)
+    reader.start()
+
+    done = failed = 0
+    t0 = time.perf_counter()
+    for batch in length_batches(q, max(1, args.bucket_width), max(1, args.batch_size), args.max_wait):
+        failed += run_batch(predictor, batch, load_info, main_log)
+        done += len(batch)
+    reader.join()
+    wall = time.perf_counter() - t0
+    main_log.info(f"All done: {done - failed} predicted, {failed} failed, {counts['skipped']} already done, "
+                  f"{wall:.1f}s after a single {load_s:.1f}s model load. Outputs under: {args.output_dir}")
+    if reader_errors:
+        main_log.error(f"Reading the input failed, not every record was queued: "
+                       f"{type(reader_errors[0]).__name__}: {reader_errors[0]}")
+    if failed or reader_errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
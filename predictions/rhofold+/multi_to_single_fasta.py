@@ -1,23 +1,12 @@
+import sys
 from pathlib import Path
-import re
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "codes"))
+from fasta_stream import iter_fasta, write_per_record
 
 in_path = Path("human_sequences.fasta")  # change to your multi-FASTA
 outdir = Path("split_fa")
-outdir.mkdir(parents=True, exist_ok=True)
-
-with in_path.open() as fh:
-    out = None
-    for line in fh:
-        if line.startswith(">"):
-            if out and not out.closed:
-                out.close()
-            header = line[1:].strip()             # drop ">"
-            safe = re.sub(r"[\/|]", "_", header)  # replace / and |
-            out = (outdir / f"{safe}.fasta").open("w")
-            out.write(line)                       # write header as-is
-        else:
-            if out:
-                out.write(line)
-    if out and not out.closed:
-        out.close()
 
+# One <header with / and | replaced by _>.fasta per record, header and sequence lines as is
+n = write_per_record(iter_fasta(in_path), outdir)
+print(f"{n} records written to {outdir}")
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Amber relaxation of RhoFold+ models as a separate CPU stage.
+
+Inference takes ~6 s per structure on the GPU but 1000 iterations of Amber
+relaxation take ~730 s, so run_cuda.sh now predicts with --relax-steps 0 and
+this script relaxes my_outputs/<URS>/unrelaxed_model.pdb into
+relaxed_<N>_model.pdb (N = --iterations, default 1000) with a pool of worker
+processes, one structure per worker.
+
+Structures are dispatched longest first (residue count of the unrelaxed model),
+re-sorted whenever a worker becomes free, so the largest relaxations do not end
+up in the tail. Structures that already have relaxed_<N>_model.pdb are skipped;
+outputs are written under a temporary name and renamed, so reruns pick up
+exactly the missing ones. With --follow the output tree is rescanned every
+--poll seconds while inference is still producing models (until --wait-pid
+exits), so relaxation overlaps inference.
+
+Each finished structure appends a row to the timing TSV (default
+my_outputs/relax_timings.tsv): name, residues, atoms, iterations, seconds,
+worker pid, status, start/end time. The summary gives throughput and pool
+efficiency (busy worker-seconds / (workers x wall)), for scaling runs with
+different --workers / --threads-per-worker.
+
+--relaxer stub copies the model (chain A, as Amber's output has) after a
+length-proportional sleep, to test the queue without OpenMM.
+
+Usage (RhoFold repository root):
+  python relax_queue.py --output-dir my_outputs --workers 16 --iterations 1000
+  python relax_queue.py --output-dir my_outputs --follow --wait-pid <batch_inference pid>
+"""
+
+import argparse
+import heapq
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "codes"))
+from pdb_array import read_pdb
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s: %(message)s"
+UNRELAXED = "unrelaxed_model.pdb"
+TIMING_HEADER = ["name", "residues", "atoms", "iterations", "seconds", "worker_pid", "status",
+                 "started", "finished", "error"]
+
+
+def relaxed_name(iterations: int) -> str:
+    return f"relaxed_{iterations}_model.pdb"
+
+
+def model_size(pdb_path: Path) -> Tuple[int, int]:
+    """(residues, atoms) of a PDB model."""
+    atoms = read_pdb(pdb_path)
+    if not len(atoms):
+        return 0, 0
+    residues = set(zip(atoms["model"].tolist(), atoms["chain"].tolist(), atoms["resseq"].tolist(),
+                       atoms["icode"].tolist()))
+    return len(residues), len(atoms)
+
+
+def pending_structures(out_root: Path, iterations: int, seen: Set[str]) -> List[Path]:
+    """Structure directories with an unrelaxed model but no relaxed one, not yet in `seen`."""
+    found = []
+    for unrelaxed in sorted(out_root.glob(f"*/{UNRELAXED}")):
+        d = unrelaxed.parent
+        if d.name.startswith(".") or d.name in seen:
+            continue  # .partial-* directories are still being written by batch_inference.py
+        if (d / relaxed_name(iterations)).is_file():
+            continue
+        found.append(d)
+    return found
+
+
+def _init_worker(threads: int):
+    # OpenMM's CPU platform reads this when the context is created
+    os.environ["OPENMM_CPU_THREADS"] = str(threads)
+
+
+def _structure_logger(struct_dir: Path) -> logging.Logger:
+    """Appends to the structure's log.txt, next to the inference lines."""
+    log = logging.getLogger(f"relax_queue.{struct_dir.name}")
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    handler = logging.FileHandler(struct_dir / "log.txt")
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    log.addHandler(handler)
+    return log
+
+
+def relax_structure(struct_dir: Path, iterations: int, relaxer: str, stub_delay: float) -> dict:
+    """Relax one structure (runs in a worker process); returns its timing row."""
+    struct_dir = Path(struct_dir)
+    unrelaxed = struct_dir / UNRELAXED
+    out = struct_dir / relaxed_name(iterations)
+    tmp = struct_dir / f".{out.name}.{os.getpid()}.tmp"
+    row = {"name": struct_dir.name, "iterations": iterations, "worker_pid": os.getpid()}
+    try:
+        row["residues"], row["atoms"] = model_size(unrelaxed)
+    except Exception:
+        row["residues"], row["atoms"] = 0, 0
+    log = _structure_logger(struct_dir)
+    started = time.time()
+    t0 = time.perf_counter()
+    try:
+        log.info(f"Started Amber Relaxation : {iterations} iterations")
+        if relaxer == "stub":
+            time.sleep(stub_delay * row["residues"] / 100)
+            lines = unrelaxed.read_text().splitlines(True)
+            tmp.write_text("".join(l[:21] + "A" + l[22:] if l.startswith(("ATOM", "HETATM")) else l
+                                   for l in lines))
+        else:
+            from rhofold.relax.relax import AmberRelaxation
+            AmberRelaxation(max_iterations=iterations, logger=log).process(str(unrelaxed), str(tmp))
+        tmp.replace(out)
+        seconds = time.perf_counter() - t0
+        log.info(f"Finished Amber Relaxation : {iterations} iterations in {seconds:.3f} seconds")
+        row.update(status="ok", error="")
+    except Exception as e:
+        seconds = time.perf_counter() - t0
+        log.error(f"Amber Relaxation failed: {e}")
+        row.update(status="error", error=str(e).replace("\t", " ").replace("\n", " "))
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+        for handler in list(log.handlers):
+            handler.close()
+            log.removeHandler(handler)
+    row.update(seconds=round(seconds, 3), started=time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(started)),
+               finished=time.strftime("%Y-%m-%d %H:%M:%S"))
+    return row
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def default_workers() -> int:
+    return int(os.environ.get("SLURM_CPUS_PER_TASK") or os.cpu_count() or 1)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Longest-first Amber relaxation of RhoFold+ models on a CPU process pool")
+    ap.add_argument("--output-dir", default="my_outputs", help="RhoFold+ output tree (<URS>/unrelaxed_model.pdb)")
+    ap.add_argument("--iterations", type=int, default=1000, help="Amber iteration budget (relaxed_<N>_model.pdb)")
+    ap.add_argument("--workers", type=int, default=default_workers(),
+                    help="Worker processes (default $SLURM_CPUS_PER_TASK or all cores)")
+    ap.add_argument("--threads-per-worker", type=int, default=1, help="OpenMM CPU threads per worker")
+    ap.add_argument("--timings", help="Timing TSV (default <output-dir>/relax_timings.tsv, appended)")
+    ap.add_argument("--follow", action="store_true", help="Keep picking up new models while inference runs")
+    ap.add_argument("--wait-pid", type=int, help="With --follow: stop once this process has exited")
+    ap.add_argument("--poll", type=float, default=30.0, help="Seconds between rescans with --follow")
+    ap.add_argument("--relaxer", choices=["amber", "stub"], default="amber")
+    ap.add_argument("--stub-delay", type=float, default=0.0, help="Stub relaxer: seconds per 100 residues")
+    args = ap.parse_args()
+
+    out_root = Path(args.output_dir)
+    workers = max(1, args.workers)
+    out_root.mkdir(parents=True, exist_ok=True)  # with --follow, inference may not have created it yet
+    timings = Path(args.timings) if args.timings else out_root / "relax_timings.tsv"
+    new_file = not timings.exists()
+    tsv = timings.open("a", encoding="utf-8")
+    if new_file:
+        tsv.write("\t".join(TIMING_HEADER) + "\n")
+
+    seen: Set[str] = set()
+    heap: List[Tuple[int, str, str]] = []  # (-residues, name, dir): longest first
+
+    def rescan():
+        for d in pending_structures(out_root, args.iterations, seen):
+            seen.add(d.name)
+            try:
+                residues, _atoms = model_size(d / UNRELAXED)
+            except Exception:
+                residues = 0
+            heapq.heappush(heap, (-residues, d.name, str(d)))
+
+    rescan()
+    print(f"[relax] {len(heap)} structure(s) to relax with {workers} worker(s) x {args.threads_per_worker} thread(s), "
+          f"{args.iterations} iterations{' (following new outputs)' if args.follow else ''}", flush=True)
+
+    counts: Dict[str, int] = {"ok": 0, "error": 0}
+    busy = 0.0
+    t0 = time.perf_counter()
+    next_scan = t0 + args.poll
+
+    def new_pool() -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(args.threads_per_worker,))
+
+    ex = new_pool()
+    try:
+        running: Dict = {}  # future -> structure dir (failed futures are reported by structure)
+        while True:
+            # Dispatch only into free workers, so the longest pending structure is always next
+            while heap and len(running) < workers:
+                _neg, _name, d = heapq.heappop(heap)
+                running[ex.submit(relax_structure, Path(d), args.iterations, args.relaxer, args.stub_delay)] = d
+            following = args.follow and (args.wait_pid is None or pid_alive(args.wait_pid))
+            if not running and not heap:
+                if not following:
+                    rescan()  # last pass: models finished after the previous scan
+                    if not heap:
+                        break
+                    continue
+                time.sleep(max(0.0, next_scan - time.perf_counter()))
+            if running:
+                finished, _ = wait(running, timeout=max(0.1, next_scan - time.perf_counter())
+                                   if following else None, return_when=FIRST_COMPLETED)
+                broken = False
+                for fut in finished:
+                    d = Path(running.pop(fut))
+                    try:
+                        row = fut.result()
+                    except Exception as e:
+                        # A worker died (e.g. OpenMM segfault or OOM): every in-flight structure fails with it
+                        broken = broken or isinstance(e, BrokenProcessPool)
+                        row = {"name": d.name, "residues": 0, "atoms": 0, "iterations": args.iterations,
+                               "seconds": 0.0, "worker_pid": "", "status": "error",
+                               "error": f"{type(e).__name__}: {e}".replace("\t", " ").replace("\n", " "),
+                               "started": "", "finished": time.strftime("%Y-%m-%d %H:%M:%S")}
+                    counts[row["status"]] = counts.get(row["status"], 0) + 1
+                    busy += row["seconds"]
+                    tsv.write("\t".join(str(row.get(k, "")) for k in TIMING_HEADER) + "\n")
+                    tsv.flush()
+                    print(f"[relax] {row['name']}: {row['status']} ({row['residues']} nt, {row['seconds']:.1f}s)"
+                          + (f" {row['error']}" if row["error"] else ""), flush=True)
+                if broken:
+                    print("[relax] a worker process died; restarting the pool", flush=True)
+                    ex.shutdown(wait=False, cancel_futures=True)
+                    ex = new_pool()
+            if following and time.perf_counter() >= next_scan:
+                rescan()
+                next_scan = time.perf_counter() + args.poll
+    finally:
+        ex.shutdown(wait=True, cancel_futures=True)
+        tsv.close()
+
+    wall = time.perf_counter() - t0
+    done = counts["ok"]
+    rate = 3600 * done / wall if wall > 0 else 0.0
+    efficiency = busy / (workers * wall) if wall > 0 else 0.0
+    print(f"[relax] done: {done} relaxed, {counts['error']} failed in {wall:.1f}s "
+          f"({rate:.1f} structures/h, pool efficiency {100 * efficiency:.1f}%). Timings: {timings}")
+    if counts["error"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
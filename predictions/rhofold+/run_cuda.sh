@@ -1,18 +1,42 @@
-for fa in split_fa/*.fasta; do
-  # extract first header without ">"
-  header=$(head -n1 "$fa" | sed 's/^>//')
-  # replace / and | with _
-  clean_name=$(echo "$header" | tr '/|' '_')
+#!/bin/bash
+# RhoFold+ predictions for every split_fa/*.fasta into my_outputs/<header with / and | -> _>/.
+# Run from the RhoFold repository root. The model is loaded once for the whole set
+# (batch_inference.py); finished structures are skipped, so the script can be rerun.
+# Amber relaxation (relaxed_1000_model.pdb, ~100x the inference time) runs as its own
+# CPU stage (relax_queue.py), picking up models while the GPU keeps predicting.
+# RELAX_WORKERS defaults to $SLURM_CPUS_PER_TASK or all cores.
+#
+# Former per-file loop, for reference (rebuilds RhoFold and reloads the checkpoint every time):
+#   for fa in split_fa/*.fasta; do
+#     python inference.py --input_fas "$fa" --device cuda:0 --single_seq_pred True \
+#       --output_dir "my_outputs/$(head -n1 "$fa" | sed 's/^>//' | tr '/|' '_')" --ckpt pretrained/RhoFold_pretrained.pt
+#   done
 
-  # output dir based on header
-  out="my_outputs/$clean_name"
-  mkdir -p "$out"
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 
-  # run inference (input stays as original file)
-  python inference.py \
-    --input_fas "$fa" \
-    --device cuda:0 \
-    --single_seq_pred True \
-    --output_dir "$out" \
-    --ckpt pretrained/RhoFold_pretrained.pt
-done
+RELAX_STEPS="${RELAX_STEPS:-1000}"
+RELAX_WORKERS="${RELAX_WORKERS:-${SLURM_CPUS_PER_TASK:-$(nproc)}}"
+
+python "${SCRIPT_DIR}/batch_inference.py" \
+  --input-dir split_fa \
+  --output-dir my_outputs \
+  --device cuda:0 \
+  --ckpt pretrained/RhoFold_pretrained.pt \
+  --batch-size 8 \
+  --bucket-width 20 \
+  --relax-steps 0 &
+INFER_PID=$!
+
+python "${SCRIPT_DIR}/relax_queue.py" \
+  --output-dir my_outputs \
+  --iterations "${RELAX_STEPS}" \
+  --workers "${RELAX_WORKERS}" \
+  --follow --wait-pid "${INFER_PID}"
+RELAX_STATUS=$?
+
+wait "${INFER_PID}"
+INFER_STATUS=$?
+if [ "${INFER_STATUS}" -ne 0 ] || [ "${RELAX_STATUS}" -ne 0 ]; then
+  echo "inference exit ${INFER_STATUS}, relaxation exit ${RELAX_STATUS}" >&2
+  exit 1
+fi
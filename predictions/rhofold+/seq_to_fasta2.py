@@ -1,26 +1,13 @@
-input_file = "human_remaining_final.txt"
-output_file = "human_multi_fasta.fasta"
-
-fasta_entries = []
-current_family = None
+import sys
+from pathlib import Path
 
-with open(input_file, "r") as f:
-    for line in f:
-        line = line.strip()
-        if not line:
-            continue
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "codes"))
+from fasta_stream import pipe_records, write_fasta
 
-        if line.startswith("Family:"):
-            current_family = line.split()[1].strip(",")
-            continue
-
-        parts = line.split()
-        if len(parts) == 2 and current_family:
-            seq_id, seq = parts
-            seq = seq.replace("-", "")   # remove gaps
-            fasta_entries.append(f">{seq_id}|{current_family}\n{seq}")
+input_file = "human_remaining_final.txt"
+output_file = "human_multi_fasta.fasta"
 
-with open(output_file, "w") as f:
-    f.write("\n".join(fasta_entries))
+# ">seq_id|family" records with gaps removed, streamed to the output
+write_fasta(pipe_records(Path(input_file)), Path(output_file))
 
 print(f"Multi-FASTA written to {output_file}")